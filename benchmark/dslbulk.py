@@ -0,0 +1,56 @@
+'''
+Throughput of `motiondsl.motiondsl.posesSpecsFromFiles()`, which loads many
+MotionDSL documents with a pool of processes, for an increasing number of
+workers, compared to loading the same documents one after the other in the
+calling process. The script also checks that the merged poses models are the
+same.
+
+The documents are generated like in `dslparse.py`, and written to a temporary
+folder.
+
+Usage: python benchmark/dslbulk.py [files count] [lines per file]
+'''
+
+import os, sys, random, tempfile, time
+
+import motiondsl.motiondsl as motdsl
+from dslparse import randomDocument, sameModel
+
+
+def sequential(files):
+    dsl = motdsl.MotionDSL(parser=motdsl.Parser.fast)
+    models = [ motdsl.toPosesSpecification(dsl.modelFromFile(f)) for f in files ]
+    merged = models[0]
+    for model in models[1:] :
+        merged = merged.mergeModel(model)
+    return merged
+
+
+def timed(what):
+    start = time.perf_counter()
+    result = what()
+    return time.perf_counter() - start, result
+
+
+if __name__ == '__main__':
+    filesCount = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    linesCount = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    cpus = os.cpu_count() or 1
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as folder :
+        files = []
+        for i in range(filesCount) :
+            files.append( os.path.join(folder, 'model{0}.motdsl'.format(i)) )
+            with open(files[-1], 'w') as f :
+                f.write( randomDocument(linesCount).replace('generated', 'm' + str(i)) )
+        print('{0} files of {1} lines, {2} processors'.format(filesCount, linesCount, cpus))
+        t0, expected = timed( lambda: sequential(files) )
+        print('  sequential : {0:8.3f} s  {1:9.0f} lines/s'.format(t0, filesCount*linesCount/t0))
+        workers = 1
+        while True :
+            t, merged = timed( lambda: motdsl.posesSpecsFromFiles(files, merge=True, maxWorkers=workers) )
+            print('  {0:2d} workers : {1:8.3f} s  {2:9.0f} lines/s  speedup {3:4.2f}  same model: {4}'.format(
+                  workers, t, filesCount*linesCount/t, t0/t, sameModel(merged, expected)))
+            if workers >= max(cpus, 2) :
+                break
+            workers = min(2*workers, max(cpus, 2))
@@ -0,0 +1,72 @@
+'''
+Throughput of the MotionDSL parsers, textX and the hand-written one, on large
+generated documents. The script also checks that both yield the same poses
+model.
+
+Two documents are used, with and without references to constants (e.g.
+`c:len0`); textX resolves each reference by visiting the whole model, thus its
+time is quadratic in the size of the first document.
+
+Usage: python benchmark/dslparse.py [lines count] [fast]
+With `fast`, only the hand-written parser is measured.
+'''
+
+import sys, random, time
+
+import motiondsl.motiondsl as motdsl
+
+
+def randomDocument(linesCount, references=True):
+    def amount():
+        r = random.random()
+        if r < 0.3 :
+            return '{0:.4f}'.format(random.uniform(-1, 1))
+        if r < 0.5 :
+            return random.choice(['q', '-q', '2 * q', 'q/2']).replace('q', 'q' + str(random.randrange(20)))
+        if r < 0.7 :
+            return random.choice(['PI/2', '-PI/2', 'pi', '0.5 * pi'])
+        if r < 0.85 or not references :
+            return 'p:p{0}[{1:.3f}]'.format(random.randrange(20), random.random())
+        return random.choice(['c:len0', '-c:len1', 'c:len1/2'])
+    lines = ['Model generated', '', 'Convention = currentFrame', '',
+             'f0 -> f1 : trx(c:len0:0.1) try(c:len1:0.25)']
+    for i in range(1, linesCount) :
+        steps = ' '.join('{0}({1})'.format(random.choice(['trx', 'try', 'trz', 'rotx', 'roty', 'rotz']), amount())
+                          for _ in range(random.randint(1, 4)))
+        lines.append('f{0} -> f{1} : {2}'.format(random.randrange(i), i + 1, steps))
+    return '\n'.join(lines) + '\n'
+
+
+def parse(dsl, text):
+    start = time.perf_counter()
+    poses = motdsl.toPosesSpecification( dsl.modelFromText(text) )
+    return time.perf_counter() - start, poses
+
+
+def sameModel(poses1, poses2):
+    if len(poses1.poses) != len(poses2.poses) :
+        return False
+    for p1, p2 in zip(poses1.poses, poses2.poses) :
+        if (p1.pose != p2.pose) or (p1.name != p2.name) :
+            return False
+        for s1, s2 in zip(p1.motion.sequences, p2.motion.sequences) :
+            if (s1.mode != s2.mode) or (s1.steps != s2.steps) :
+                return False
+    return True
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    fastOnly = len(sys.argv) > 2 and sys.argv[2] == 'fast'
+    for references in [True, False] :
+        random.seed(0)
+        text = randomDocument(count, references)
+        print('{0} lines, {1:.1f} kB, {2} references to constants'.format(
+              count, len(text)/1e3, 'with' if references else 'without'))
+        t2, poses2 = parse(motdsl.MotionDSL(parser=motdsl.Parser.fast), text)
+        if not fastOnly :
+            t1, poses1 = parse(motdsl.MotionDSL(parser=motdsl.Parser.textX), text)
+            print('  textX : {0:8.3f} s  {1:9.0f} lines/s'.format(t1, count/t1))
+        print('  fast  : {0:8.3f} s  {1:9.0f} lines/s'.format(t2, count/t2))
+        if not fastOnly :
+            print('  same poses model:', sameModel(poses1, poses2))
@@ -0,0 +1,39 @@
+'''
+Start-up cost of the MotionDSL: the time to import `motiondsl.motiondsl` and
+the time of the first parse of a document, each measured in a fresh
+interpreter.
+
+Usage: python benchmark/dslstartup.py [document]
+'''
+
+import os, sys, subprocess
+
+here = os.path.dirname(os.path.abspath(__file__))
+defaultDocument = os.path.join(here, '..', 'sample', 'motiondsl', 'model.motdsl')
+
+script = '''
+import time
+start = time.perf_counter()
+import motiondsl.motiondsl as motdsl
+t1 = time.perf_counter()
+motdsl.toPosesSpecification( motdsl.dsl.modelFromFile({0!r}) )
+t2 = time.perf_counter()
+print(t1 - start, t2 - t1)
+'''
+
+def startup(document, repeat=5):
+    best = None
+    for _ in range(repeat) :
+        out = subprocess.run([sys.executable, '-c', script.format(document)],
+                             check=True, capture_output=True, text=True).stdout.split()
+        t = (float(out[0]), float(out[1]))
+        best = t if best is None else (min(best[0], t[0]), min(best[1], t[1]))
+    return best
+
+
+if __name__ == '__main__':
+    document = sys.argv[1] if len(sys.argv) > 1 else defaultDocument
+    imp, parse = startup(document)
+    print('import      : {0:7.3f} s'.format(imp))
+    print('first parse : {0:7.3f} s'.format(parse))
+    print('total       : {0:7.3f} s'.format(imp + parse))
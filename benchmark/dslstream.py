@@ -0,0 +1,59 @@
+'''
+Batch vs streaming loading of a large, generated MotionDSL document: time to
+the first coordinate transform, total time and peak memory, for a pipeline
+which converts each pose to a coordinate transform and then drops it.
+
+The document is the one of `dslparse.py`, without references to constants.
+
+Usage: python benchmark/dslstream.py [lines count]
+'''
+
+import os, sys, random, tempfile, time, tracemalloc
+
+import motiondsl.motiondsl as motdsl
+from kgprim.ct.frommotions import toCoordinateTransform
+from dslparse import randomDocument
+
+
+def batch(dsl, file):
+    model = motdsl.toPosesSpecification( dsl.modelFromFile(file) )
+    for poseSpec in model.poses :
+        yield poseSpec
+
+def stream(dsl, file):
+    yield from dsl.poseSpecsFromFile(file)
+
+
+def run(loader, file):
+    dsl = motdsl.MotionDSL(parser=motdsl.Parser.fast)
+    start = time.perf_counter()
+    first = None
+    for poseSpec in loader(dsl, file) :
+        toCoordinateTransform(poseSpec)
+        if first is None :
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+def peakMemory(loader, file):
+    dsl = motdsl.MotionDSL(parser=motdsl.Parser.fast)
+    tracemalloc.start()
+    for poseSpec in loader(dsl, file) :
+        toCoordinateTransform(poseSpec)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as folder :
+        file = os.path.join(folder, 'generated.motdsl')
+        with open(file, 'w') as f :
+            f.write( randomDocument(count, references=False) )
+        print('{0} lines, {1:.1f} kB'.format(count, os.path.getsize(file)/1e3))
+        for name, loader in [('batch', batch), ('stream', stream)] :
+            first, total = run(loader, file)
+            peak = peakMemory(loader, file)
+            print('{0:6s}: first transform {1:8.4f} s, total {2:7.3f} s, peak memory {3:7.1f} MB'.format(
+                  name, first, total, peak/1e6))
@@ -0,0 +1,44 @@
+'''
+Import time of the main modules of the package, each measured in a fresh
+interpreter, and which of the heavy third party dependencies gets loaded as a
+side effect.
+
+Usage: python benchmark/importtime.py [module ...]
+'''
+
+import sys, subprocess
+
+modules = [
+    'kgprim.values',
+    'kgprim.motions',
+    'kgprim.ct.frommotions',
+    'kgprim.ct.repr.mxrepr',
+    'kgprim.ct.backend.numeric',
+    'kgprim.ct.backend.symbolic',
+    'motiondsl.motiondsl',
+]
+
+heavy = ['numpy', 'sympy', 'networkx', 'textx']
+
+script = '''
+import sys, time
+start = time.perf_counter()
+import {0}
+t = time.perf_counter() - start
+print(t, ' '.join(m for m in {1} if m in sys.modules))
+'''
+
+def importTime(module, repeat=5):
+    best = None
+    for _ in range(repeat) :
+        out = subprocess.run([sys.executable, '-c', script.format(module, heavy)],
+                             check=True, capture_output=True, text=True).stdout.split()
+        t = float(out[0])
+        best = t if best is None else min(best, t)
+    return best, out[1:]
+
+
+if __name__ == '__main__':
+    for module in (sys.argv[1:] or modules) :
+        t, loaded = importTime(module)
+        print('{0:28s} {1:7.3f} s   {2}'.format(module, t, ' '.join(loaded)))
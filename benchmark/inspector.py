@@ -0,0 +1,59 @@
+'''
+Construction time and memory of `kgprim.motions.ConnectedFramesInspector`, and
+the cost of materializing all the reverse motions of the graph (which is what
+an eager construction would pay upfront).
+
+Usage: python benchmark/inspector.py [frames count]
+'''
+
+import sys, random, time, tracemalloc
+
+from kgprim.core import Frame, Pose
+import kgprim.motions as motions
+from kgprim.motions import MotionStep, MotionSequence, PoseSpec, PosesSpec
+
+
+def randomModel(framesCount, stepsCount=3):
+    frames = [ Frame('f' + str(i)) for i in range(framesCount) ]
+    poses = []
+    for i in range(1, framesCount) :
+        steps = [ MotionStep(random.choice(list(MotionStep.Kind)), random.choice(list(motions.Axis)), random.random())
+                  for _ in range(stepsCount) ]
+        pose = Pose(target=frames[i], reference=frames[random.randrange(i)])
+        poses.append( PoseSpec(pose=pose, motion=MotionSequence(steps, MotionSequence.Mode.currentFrame)) )
+    return PosesSpec('random', poses)
+
+
+def elapsed(what):
+    start = time.perf_counter()
+    what()
+    return time.perf_counter() - start
+
+def allocated(what):
+    '''The memory allocated by `what()` and still in use after it returns'''
+    tracemalloc.start()
+    result = what()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return memory, result
+
+
+def materialize(inspector):
+    for v1, v2 in inspector.graph.edges :
+        inspector.edgeMotion(v1, v2)
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    random.seed(0)
+    model = randomModel(count)
+
+    # time and memory are measured separately, as tracing slows down the code
+    inspector = motions.ConnectedFramesInspector(model)
+    t1 = elapsed( lambda: motions.ConnectedFramesInspector(model) )
+    t2 = elapsed( lambda: materialize(inspector) )
+    m1, inspector = allocated( lambda: motions.ConnectedFramesInspector(model) )
+    m2, _ = allocated( lambda: materialize(inspector) )
+    print('{0} frames'.format(count))
+    print('construction          : {0:7.3f} s  {1:7.1f} MB'.format(t1, m1/1e6))
+    print('all reverse motions   : {0:7.3f} s  {1:7.1f} MB'.format(t2, m2/1e6))
@@ -0,0 +1,57 @@
+'''
+Memory footprint of a large, generated poses model, and of its coordinate
+transforms, plus the time to build the graph of the frames (which hashes and
+compares the frames heavily).
+
+The frames are created like the MotionDSL loader does, i.e. one `Frame` object
+for each end of each motion, obtained with `Frame.get()`.
+
+Usage: python benchmark/memory.py [frames count]
+'''
+
+import sys, random, time, tracemalloc
+
+from kgprim.core import Frame, Pose
+import kgprim.motions as motions
+import kgprim.values as numeric_argument
+from kgprim.motions import MotionStep, MotionSequence, PoseSpec, PosesSpec
+from kgprim.ct.frommotions import toCoordinateTransform
+
+
+def randomModel(framesCount, stepsCount=3):
+    variables = [ numeric_argument.Variable('q' + str(i)) for i in range(10) ]
+    poses = []
+    for i in range(1, framesCount) :
+        steps = []
+        for _ in range(stepsCount) :
+            if random.random() < 0.2 :
+                amount = numeric_argument.Expression( random.choice(variables) )
+            else :
+                amount = random.random()
+            steps.append( MotionStep(random.choice(list(MotionStep.Kind)), random.choice(list(motions.Axis)), amount) )
+        pose = Pose(target=Frame.get('f' + str(i)), reference=Frame.get('f' + str(random.randrange(i))))
+        poses.append( PoseSpec(pose=pose, motion=MotionSequence(steps, MotionSequence.Mode.currentFrame)) )
+    return PosesSpec('random', poses)
+
+
+def allocated(what):
+    '''The memory allocated by `what()` and still in use after it returns'''
+    tracemalloc.start()
+    result = what()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return memory, result
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    random.seed(0)
+    m1, model = allocated( lambda: randomModel(count) )
+    m2, _ = allocated( lambda: [ toCoordinateTransform(p) for p in model.poses ] )
+    start = time.perf_counter()
+    motions.ConnectedFramesInspector(model)
+    t = time.perf_counter() - start
+    print('{0} frames'.format(count))
+    print('model                 : {0:7.1f} MB'.format(m1/1e6))
+    print('coordinate transforms : {0:7.1f} MB'.format(m2/1e6))
+    print('graph construction    : {0:7.3f} s'.format(t))
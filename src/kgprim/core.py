@@ -4,8 +4,13 @@ Core primitives like `RigidBody` or Cartesian `Frame`.
 All the classes are nothing more than named entities, and are meant to be used
 as symbolic models. For example, a `Pose` is represented simply by two instances
 of `Frame`, with two different names.
+
+The most common classes use `__slots__`, to keep small the memory footprint of
+large models.
 '''
 
+import weakref
+
 class RigidBody():
     def __init__(self, n):
         '''
@@ -25,11 +30,15 @@ class RigidBody():
 
 
 class Attachable():
+    __slots__ = ()
+
     def __init__(self):
         None
 
 
 class Point(Attachable):
+    __slots__ = ('_name',)
+
     def __init__(self, n):
         super().__init__()
         self._name = n
@@ -46,8 +55,15 @@ class Point(Attachable):
 class Frame(Attachable):
     '''
     A Cartesian coordinate frame.
+
+    Frames with the same name compare equal. `Frame.get()` returns a shared
+    instance for each name, which saves memory in large models and makes the
+    comparison between such instances a mere identity check.
     '''
 
+    __slots__ = ('_name', '__weakref__')
+    _registry = weakref.WeakValueDictionary()
+
     def __init__(self, n):
         '''
         Constructor arguments:
@@ -55,14 +71,29 @@ class Frame(Attachable):
         '''
         self._name = n
 
+    @staticmethod
+    def get(n):
+        '''
+        The frame with name `n`, which is the same object for all the calls
+        with the same name, as long as the object is referenced somewhere.
+        '''
+        frame = Frame._registry.get(n)
+        if frame is None :
+            frame = Frame(n)
+            Frame._registry[n] = frame
+        return frame
+
     @property
     def name(self): return self._name
 
     def __eq__(self, rhs):
-        return isinstance(rhs, Frame) and self._name == rhs._name
+        return self is rhs or (isinstance(rhs, Frame) and self._name == rhs._name)
 
     def __hash__(self):
-        return 97 * hash(self._name)
+        return 97 * hash(self._name) # the hash of the string is cached by Python
+
+    def __reduce__(self):
+        return (Frame.get, (self._name,))
 
     def __str__(self):
         return self.name
@@ -73,17 +104,27 @@ class Pose:
     The relative pose of `target` with respect to `reference`.
 
     Both `target` and `reference` should be two instances of `Frame`.
+
+    Instances are immutable, and their hash is computed at construction.
     '''
 
+    __slots__ = ('target', 'reference', '_hash')
+
     def __init__(self, target, reference):
-        self.target    = target
-        self.reference = reference
+        object.__setattr__(self, 'target'   , target)
+        object.__setattr__(self, 'reference', reference)
+        object.__setattr__(self, '_hash', 43*hash(target) + 11*hash(reference))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("'Pose' objects are immutable")
+    def __reduce__(self):
+        return (Pose, (self.target, self.reference))
 
     def __eq__(self, rhs):
-        return isinstance(rhs, Pose) and self.target==rhs.target and self.reference==rhs.reference
+        return self is rhs or (isinstance(rhs, Pose) and self.target==rhs.target and self.reference==rhs.reference)
 
     def __hash__(self):
-        return 43*hash(self.target) + 11*hash(self.reference)
+        return self._hash
 
     def __str__(self):
         return self.target.name + " wrt " + self.reference.name
@@ -8,6 +8,11 @@ allow to get the concrete matrix representation of a transform.
 The module `kgprim.ct.frommotions` allows to compute the coordinate transform(s)
 associated with a rigid motion model from the module `kgprim.motions`.
 
+The module `kgprim.ct.partialeval` precomputes the constant parts of a
+transform, before getting its matrix representation. The module
+`kgprim.ct.forwardkin` computes numerically the poses of all the frames of a
+model relative to a root frame.
+
 See the file `sample/kgprim/ct/sample.py`:
 
 ```python
@@ -0,0 +1,201 @@
+'''
+A numeric backend based on forward-mode automatic differentiation.
+
+The backend computes the matrix representation of a transform together with
+its directional derivatives, in a single pass and without building any symbolic
+matrix; thus, its cost grows only linearly with the length of the transform.
+The derivatives are propagated with dual numbers, i.e. pairs of a
+value and a stack of derivatives, one for each _seed_ direction.
+
+The seeds give the derivative of each argument of the transform (variables or
+parameters) along each direction. By default, there is one direction for each
+variable of the transform, so that the derivatives are the partial derivatives
+with respect to the variables.
+'''
+
+import functools, math
+import numpy as np
+
+import kgprim.values as myexpr
+from kgprim.motions import MotionStep
+from kgprim.ct.models import ConstantCTransform
+from kgprim.ct.metadata import symbolicArgumentsOf
+from kgprim.ct.backend.numeric import NumericMixin, amountValue
+
+
+class DualArray:
+    '''
+    A NumPy array (or a scalar) with the stack of its derivatives along K
+    directions.
+
+    Attributes:
+      - `value`: the value, a scalar or an array of any shape S
+      - `derivatives`: an array of shape `(K,) + S`
+
+    Instances support the few operations required by the matrix setters of the
+    representation mixins: indexing, assignment of items or sub-blocks, negation,
+    addition, multiplication by scalars and matrix multiplication.
+    '''
+
+    def __init__(self, value, derivatives):
+        self.value = value
+        self.derivatives = derivatives
+
+    @property
+    def directions(self):
+        '''The number K of seed directions'''
+        return self.derivatives.shape[0]
+
+    @property
+    def shape(self):
+        return np.shape(self.value)
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple) :
+            key = (key,)
+        return DualArray(self.value[key], self.derivatives[(slice(None),) + key])
+
+    def __setitem__(self, key, item):
+        if not isinstance(key, tuple) :
+            key = (key,)
+        if isinstance(item, DualArray) :
+            self.value[key] = item.value
+            self.derivatives[(slice(None),) + key] = item.derivatives
+        else :
+            self.value[key] = item
+            self.derivatives[(slice(None),) + key] = 0.0
+
+    def __neg__(self):
+        return DualArray(-self.value, -self.derivatives)
+
+    def __add__(self, rhs):
+        if isinstance(rhs, DualArray) :
+            return DualArray(self.value + rhs.value, self.derivatives + rhs.derivatives)
+        return DualArray(self.value + rhs, self.derivatives)
+
+    def __sub__(self, rhs):
+        return self + (-rhs)
+
+    def __rsub__(self, lhs):
+        return (-self) + lhs
+
+    def __mul__(self, rhs):
+        if isinstance(rhs, DualArray) :
+            return DualArray(self.value * rhs.value,
+                             self.derivatives * rhs.value + self.value * rhs.derivatives)
+        return DualArray(self.value * rhs, self.derivatives * rhs)
+
+    def __matmul__(self, rhs):
+        if isinstance(rhs, DualArray) :
+            return DualArray(self.value @ rhs.value,
+                             self.derivatives @ rhs.value + self.value @ rhs.derivatives)
+        return DualArray(self.value @ rhs, self.derivatives @ rhs)
+
+    def __rmatmul__(self, lhs):
+        return DualArray(lhs @ self.value, lhs @ self.derivatives)
+
+    __radd__ = __add__
+    __rmul__ = __mul__
+
+    def __repr__(self):
+        return 'DualArray({0}, {1})'.format(repr(self.value), repr(self.derivatives))
+
+
+@functools.lru_cache(maxsize=1024)
+def _derivative(amount):
+    # The derivative of the non-linear expression `amount` with respect to its
+    # argument. The cache is bounded, since the module-level functors live as
+    # long as the process
+    import sympy as sym
+    return myexpr.Expression(amount.arg, sym.diff(amount.expr, amount.arg.symbol))
+
+
+class DualNumericMixin:
+    '''
+    A backend producing the matrix representation of a transform as a
+    `DualArray`, i.e. the numeric matrix and its derivatives along the given
+    seed directions.
+
+    `matrix_repr()` requires the value of the arguments of the transform, since
+    these are not constant in general; see its documentation.
+
+    Sympy is required only for the amounts which are not linear in their
+    argument (i.e. an `Expression` whose `coefficient` is None), whose
+    derivative is computed symbolically; the derivatives are kept in a
+    bounded cache, shared by all the instances.
+    '''
+
+    def sin(self, arg):
+        return DualArray(math.sin(arg.value), math.cos(arg.value) * arg.derivatives)
+
+    def cos(self, arg):
+        return DualArray(math.cos(arg.value), -math.sin(arg.value) * arg.derivatives)
+
+    def identity(self, directions=1):
+        n = self.matrixSize
+        return DualArray(np.identity(n), np.zeros((directions, n, n)))
+
+    def constant_matrix(self, constantCT):
+        '''The numeric matrix of a `kgprim.ct.models.ConstantCTransform`'''
+        return NumericMixin.constant_matrix(self, constantCT)
+
+    def defaultSeeds(self, ct):
+        '''
+        The seeds for the partial derivatives with respect to the variables of
+        `ct`, in the order of `kgprim.ct.metadata.symbolicArgumentsOf()`.
+        '''
+        variables = list( symbolicArgumentsOf(ct)[0] )
+        identity  = np.identity( len(variables) )
+        return { var : identity[i] for i, var in enumerate(variables) }
+
+    def matrix_repr(self, ct, values, seeds=None):
+        '''
+        The matrix representation of `ct` and its directional derivatives, as a
+        `DualArray`.
+
+        `values` is a dictionary with the float value of the variables and
+        parameters of the transform; parameters missing from the dictionary
+        take their default value.
+        `seeds` is a dictionary keyed by some arguments of the transform, with
+        1-D arrays of the same length K; entry k of the array is the derivative
+        of the argument along the k-th direction. Arguments missing from the
+        dictionary are held fixed. If `seeds` is None, `defaultSeeds(ct)` is
+        used.
+
+        The `derivatives` of the returned value have shape `(K, n, n)`.
+        '''
+        if seeds is None :
+            seeds = self.defaultSeeds(ct)
+        seeds = { arg : np.asarray(s, dtype=np.float64) for arg, s in seeds.items() }
+        directions = 0
+        for s in seeds.values() :
+            directions = s.shape[0]
+        zero = np.zeros(directions)
+
+        mx = self.identity(directions)
+        for p in ct.primitives :
+            if isinstance(p, ConstantCTransform) :
+                mx = mx @ self.constant_matrix(p)
+                continue
+            amount = DualArray( float(amountValue(p.amount, values, ct)), zero )
+            if isinstance(p.amount, myexpr.Expression) and p.amount.arg in seeds :
+                amount.derivatives = self._slope(p.amount, values, ct) * seeds[p.amount.arg]
+            prim = self.identity(directions)
+            if p.kind == MotionStep.Kind.Rotation :
+                self.setRotation(p.axis, p.polarity, prim, self.sin(amount), self.cos(amount))
+            else :
+                self.setTranslation(p.axis, p.polarity, prim, amount)
+            mx = mx @ prim
+        return mx
+
+    def _slope(self, amount, values, ct):
+        '''
+        The derivative of the expression `amount` with respect to its argument,
+        for the value given in `values`
+        '''
+        if amount.coefficient is not None :
+            return float(amount.coefficient)
+        slope = _derivative(amount)
+        if len(slope.expr.free_symbols) == 0 :
+            return float(slope.expr)
+        return float( amountValue(slope, values, ct) )
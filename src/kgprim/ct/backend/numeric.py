@@ -1,6 +1,8 @@
 import math
 import numpy as np
 import kgprim.values as myexpr
+from kgprim.motions import MotionStep, Axis
+from kgprim.ct.models import TransformPolarity, ConstantCTransform
 
 class NumericMixin:
     def sin(self, arg):
@@ -12,16 +14,200 @@ class NumericMixin:
     def identity(self):
         return np.identity( self.matrixSize )
 
+    def constant_matrix(self, constantCT):
+        '''The matrix of a `kgprim.ct.models.ConstantCTransform`'''
+        mx = self.identity()
+        self.setRigidTransform(mx, np.array(constantCT.rotation), constantCT.translation)
+        return mx
+
     def matrix_repr(self, ct):
         mx = self.identity()
         for p in ct.primitives :
-            amount = p.amount
-            if isinstance(amount, myexpr.Expression) :
-                try:
-                    amount = amount.evalf()
-                except RuntimeError as e:
-                    raise RuntimeError('Could not compute the numeric matrix representation of the transform') from e
-            mx = mx @ self.matrix[p.kind](p.axis, p.polarity, amount)
+            if isinstance(p, ConstantCTransform) :
+                mx = mx @ self.constant_matrix(p)
+                continue
+            mx = mx @ self.matrix[p.kind](p.axis, p.polarity, _floatAmount(p.amount))
         return mx
     # self.matrix comes from the MatrixRepresentationMixin
 
+    def batch_matrix_repr(self, ct, values):
+        '''
+        The matrix representations of `ct` for N configurations, stacked in an
+        array of shape `(N, n, n)`.
+
+        `values` is a dictionary keyed by the `kgprim.values.Variable`s and
+        `kgprim.values.Parameter`s of the transform; the values are 1-D arrays
+        of length N (scalars are broadcast). A parameter missing from the
+        dictionary takes its default value. Entries for arguments that do not
+        appear in `ct` are ignored.
+        '''
+        count, amounts = self._batch_amounts(ct, values)
+        mx = self.identity()
+        for p, amount in zip(ct.primitives, amounts) :
+            if isinstance(p, ConstantCTransform) :
+                mx = mx @ self.constant_matrix(p)
+            elif np.ndim(amount) == 0 :
+                mx = mx @ self.matrix[p.kind](p.axis, p.polarity, amount)
+            else :
+                mx = mx @ self._stacked_primitive(p, amount)
+        return np.broadcast_to(mx, (count, self.matrixSize, self.matrixSize)).copy()
+
+    def _stacked_primitive(self, p, amount):
+        # The matrix setters of the representation mixins only address the
+        # first two indices, so we let the batch run along the last axis and
+        # move it to the front at the end
+        mx = np.repeat(self.identity()[:, :, np.newaxis], amount.size, axis=2)
+        if p.kind == MotionStep.Kind.Rotation :
+            self.setRotation(p.axis, p.polarity, mx, np.sin(amount), np.cos(amount))
+        else :
+            self.setTranslation(p.axis, p.polarity, mx, amount)
+        return np.moveaxis(mx, 2, 0)
+
+    def _batch_amounts(self, ct, values):
+        values = { arg : np.asarray(v, dtype=np.float64) for arg, v in values.items() }
+        count  = 1
+        if len(values) > 0 :
+            shape = np.broadcast_shapes( *(v.shape for v in values.values()) )
+            if len(shape) > 1 :
+                raise ValueError('The values of the arguments must be 1-D arrays')
+            count = shape[0] if len(shape) == 1 else 1
+        amounts = []
+        for p in ct.primitives :
+            if isinstance(p, ConstantCTransform) :
+                amounts.append(None)
+            else :
+                amounts.append( amountValue(p.amount, values, ct) )
+        return count, amounts
+
+
+
+class ClosedFormNumericMixin(NumericMixin):
+    '''
+    A numeric backend that composes the rotation matrix and the translation
+    vector of the transform directly, rather than multiplying the full matrix
+    representation of each primitive transform.
+
+    Each rotation primitive only updates two columns of the 3x3 rotation, and
+    each translation only updates the 3-vector. The actual matrix
+    representation is assembled once, at the end. The results are the same as
+    the ones of `NumericMixin`, up to rounding.
+    '''
+
+    def matrix_repr(self, ct):
+        amounts = []
+        for p in ct.primitives :
+            if isinstance(p, ConstantCTransform) :
+                amounts.append(None)
+                continue
+            amounts.append( _floatAmount(p.amount) )
+        R, p = composeFloats([[1.0,0.0,0.0], [0.0,1.0,0.0], [0.0,0.0,1.0]], [0.0,0.0,0.0],
+                             ct.primitives, amounts)
+        mx = self.identity()
+        self.setRigidTransform(mx, np.array(R), p)
+        return mx
+
+    def batch_matrix_repr(self, ct, values):
+        count, amounts = self._batch_amounts(ct, values)
+        R = np.repeat(np.identity(3)[:, :, np.newaxis], count, axis=2)
+        p = np.zeros((3, count))
+        R, p = compose(R, p, ct.primitives, amounts, np)
+        mx = np.repeat(self.identity()[:, :, np.newaxis], count, axis=2)
+        self.setRigidTransform(mx, R, p)
+        return np.ascontiguousarray( np.moveaxis(mx, 2, 0) )
+
+
+# The columns of a 3x3 rotation matrix affected by an elementary rotation about
+# each axis, in the order (cosine-sine, minus-sine-cosine)
+_rotation_columns = {
+    Axis.X : (1, 2),
+    Axis.Y : (2, 0),
+    Axis.Z : (0, 1)
+}
+
+def compose(R, p, primitives, amounts, trig=math):
+    '''
+    Right-multiply in place the rigid transform (R, p) by the given primitive
+    transforms, with the given numeric amounts.
+
+    `R` and `p` may have an additional, trailing batch dimension, i.e. shape
+    (3,3,N) and (3,N); in this case the amounts may be arrays of length N.
+    `trig` must provide the `sin` and `cos` functions (e.g. `math` or `numpy`).
+
+    Return the updated `R` and `p`.
+
+    The primitives may include `kgprim.ct.models.ConstantCTransform`s, whose
+    amount is ignored.
+    '''
+    for prim, amount in zip(primitives, amounts) :
+        if isinstance(prim, ConstantCTransform) :
+            p += np.einsum('ik...,k->i...', R, prim.translation)
+            R[...] = np.einsum('ik...,kj->ij...', R, prim.rotation)
+            continue
+        if prim.polarity == TransformPolarity.movedFrameOnTheLeft :
+            amount = - amount
+        if prim.kind == MotionStep.Kind.Rotation :
+            i, j = _rotation_columns[prim.axis]
+            c = trig.cos(amount)
+            s = trig.sin(amount)
+            Ri = R[:, i] * c + R[:, j] * s
+            R[:, j] = R[:, j] * c - R[:, i] * s
+            R[:, i] = Ri
+        else :
+            p += R[:, prim.axis.value] * amount
+    return R, p
+
+def composeFloats(R, p, primitives, amounts):
+    '''
+    Same as `compose()`, for plain float amounts, with `R` and `p` being
+    respectively a list of three rows, and a list of three floats.
+
+    This function avoids any NumPy overhead, which is significant for 3x3
+    matrices.
+    '''
+    for prim, amount in zip(primitives, amounts) :
+        if isinstance(prim, ConstantCTransform) :
+            pc = prim.translation
+            Rc = prim.rotation
+            for i, row in enumerate(R) :
+                p[i] += row[0]*pc[0] + row[1]*pc[1] + row[2]*pc[2]
+                R[i] = [ row[0]*Rc[0][j] + row[1]*Rc[1][j] + row[2]*Rc[2][j] for j in range(3) ]
+            continue
+        if prim.polarity == TransformPolarity.movedFrameOnTheLeft :
+            amount = - amount
+        if prim.kind == MotionStep.Kind.Rotation :
+            i, j = _rotation_columns[prim.axis]
+            c = math.cos(amount)
+            s = math.sin(amount)
+            for row in R :
+                ri = row[i]
+                row[i] = ri * c + row[j] * s
+                row[j] = row[j] * c - ri * s
+        else :
+            k = prim.axis.value
+            p[0] += R[0][k] * amount
+            p[1] += R[1][k] * amount
+            p[2] += R[2][k] * amount
+    return R, p
+
+
+def _floatAmount(amount):
+    try:
+        return myexpr.toFloat(amount)
+    except RuntimeError as e:
+        raise RuntimeError('Could not compute the numeric matrix representation of the transform') from e
+
+def amountValue(amount, values, ct):
+    '''
+    The numeric value of the `amount` of a primitive transform of `ct`, for the
+    given values of the arguments (see `NumericMixin.batch_matrix_repr()`).
+    '''
+    if not isinstance(amount, myexpr.Expression) :
+        return amount
+    if amount.constant() :
+        return amount.evalf()
+    arg = amount.arg
+    if arg in values :
+        return amount.evaluate( values[arg] )
+    if isinstance(arg, myexpr.Parameter) and arg.defaultValue is not None :
+        return amount.evaluate( arg.defaultValue )
+    raise RuntimeError("No value given for argument '{0}' of transform '{1}'".format(arg.name, str(ct)))
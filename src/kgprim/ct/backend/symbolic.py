@@ -4,6 +4,7 @@ import sympy as sym
 
 import kgprim.values as numeric_argument
 import kgprim.ct.metadata as metadata
+from kgprim.ct.models import ConstantCTransform
 
 logger = logging.getLogger(__name__)
 
@@ -18,10 +19,24 @@ class SymbolicMixin:
     def identity(self):
         return sym.eye( self.matrixSize )
 
+    def constant_matrix(self, constantCT):
+        '''
+        The matrix of a `kgprim.ct.models.ConstantCTransform`; the coefficients
+        with an integer value are exact
+        '''
+        exact = lambda x : sym.Integer(int(x)) if x.is_integer() else sym.Float(x)
+        R = sym.Matrix( [[exact(x) for x in row] for row in constantCT.rotation] )
+        p = [ exact(x) for x in constantCT.translation ]
+        mx = self.identity()
+        self.setRigidTransform(mx, R, p)
+        return mx
+
     def matrix_repr(self, ct):
         mx = self.identity()
         for p in ct.primitives :
-            if isinstance(p.amount, float) :
+            if isinstance(p, ConstantCTransform) :
+                mx = mx @ self.constant_matrix(p)
+            elif isinstance(p.amount, float) :
                 mx = mx @ self.matrix[p.kind](p.axis, p.polarity, p.amount)
             else:
                 if not isinstance(p.amount, numeric_argument.Expression) :
@@ -33,6 +48,15 @@ class SymbolicMixin:
 
 
 class MyMx:
+    '''
+    A symbolic matrix representation of a coordinate transform, which can also
+    be evaluated numerically.
+
+    The Sympy matrix is compiled into a numeric function of both the variables
+    and the parameters, the first time it is evaluated. Setting the value of
+    the parameters does not require any recompilation.
+    '''
+
     def __init__(self, ctr, mx):
         self.mx  = mx
         self.ctr = ctr
@@ -41,27 +65,97 @@ class MyMx:
         self.parameters= pars
         self.constants = consts
 
+        self._function = None
+        self._parValues = numpy.zeros( len(self.parameters) )
         self.setParametersValue( {p : (p.defaultValue or 0) for p in self.parameters } )
 
     def setParametersValue(self, values):
+        '''
+        Set the value of the parameters, which will be used in any subsequent
+        numerical evaluation of the matrix.
+
+        `values` is a dictionary keyed by `kgprim.values.Parameter`; parameters
+        missing from the dictionary retain their current value.
+        '''
         if len(values.keys()) != len(self.parameters) :
             logger.warn("The count of given values does not match the count of parameters")
-        subs = { par.symbol : values[par] for par in values.keys() }
-        self.mxNoParams = self.mx.subs( subs )
-        self.eval = sym.lambdify([v.symbol for v in self.variables if v is not None], self.mxNoParams, 'numpy')
+        for i, par in enumerate(self.parameters) :
+            if par in values :
+                self._parValues[i] = values[par]
+
+    @property
+    def parametersValue(self):
+        '''A dictionary with the current value of each parameter'''
+        return { par : self._parValues[i] for i, par in enumerate(self.parameters) }
+
+    @property
+    def mxNoParams(self):
+        '''The Sympy matrix with the parameters replaced by their current value'''
+        subs = { par.symbol : value for par, value in self.parametersValue.items() }
+        return self.mx.subs( subs )
+
+    def _evaluator(self):
+        if self._function is None :
+            # Only the entries without free symbols are constant numbers; others,
+            # like sin(q)**2 + cos(q)**2, are constant for Sympy but cannot be
+            # converted to float, and are evaluated like the variable ones
+            entries = [ (r, c) for r in range(self.mx.rows) for c in range(self.mx.cols) ]
+            self._constantEntries = [ (rc, float(self.mx[rc])) for rc in entries if len(self.mx[rc].free_symbols) == 0 ]
+            self._variableEntries = [ rc for rc in entries if len(self.mx[rc].free_symbols) > 0 ]
+            self._function = sym.lambdify(
+                ([v.symbol for v in self.variables], [p.symbol for p in self.parameters]),
+                [self.mx[rc] for rc in self._variableEntries], 'numpy')
+        return self._function
+
+    def _evaluate(self, values, shape=()):
+        function = self._evaluator()
+        values = [numpy.asarray(v, dtype=numpy.float64) for v in values]
+        shape  = numpy.broadcast_shapes( shape, *(v.shape for v in values) )
+        ret = numpy.empty( shape + self.mx.shape )
+        # The constant coefficients are computed once, and simply broadcast
+        for (r, c), value in self._constantEntries :
+            ret[..., r, c] = value
+        for (r, c), value in zip(self._variableEntries, function(values, self._parValues)) :
+            ret[..., r, c] = value
+        return ret
+
+    def eval(self, *values):
+        '''
+        The numeric value of the matrix, for the given values of the variables
+        (in the same order as `self.variables`) and the current value of the
+        parameters.
+
+        The values may also be 1-D arrays of length N, in which case the return
+        value is an array of N matrices, with shape `(N, rows, cols)`.
+        '''
+        return self._evaluate(values)
 
     def setVariablesValue(self, **kwargs):
+        '''
+        The numeric value of the matrix for the given values of the variables.
+
+        Keyword arguments (pass only one):
+          - `valueslist`: the values of the variables, in the same order as
+            `self.variables`; a 2-D array with shape `(N, len(self.variables))`
+            gives N matrices
+          - `valuesdict`: a dictionary keyed by the variables, whose values
+            are scalars, or 1-D arrays of length N to get N matrices
+
+        The return value is a float array with shape `(rows, cols)`, or
+        `(N, rows, cols)` for N configurations.
+        '''
         if 'valueslist' in kwargs:
-            values = kwargs['valueslist']
-            if len(values) != len(self.variables) :
+            values = numpy.asarray(kwargs['valueslist'], dtype=numpy.float64)
+            if values.shape[-1:] != (len(self.variables),) :
                 logger.warning("The length of the values list does not match the variables list")
-            return self.eval( *values )
+            if values.ndim == 2 :
+                return self._evaluate( values.T, values.shape[:1] )
+            return self._evaluate( values )
         elif 'valuesdict' in kwargs:
             values = kwargs['valuesdict']
             if values.keys() != self.variables.keys() :
                 logger.warning("The given values do not account for all the variables of this matrix")
-            replacements = { var.symbol : values[var] for var in values }
-            return sym.matrix2numpy(self.mxNoParams.evalf( subs=replacements ), dtype=numpy.float64)
+            return self._evaluate( [values[var] for var in self.variables] )
         else:
             logger.warning("Unrecognized parameter, skipping")
 
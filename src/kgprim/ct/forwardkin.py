@@ -0,0 +1,157 @@
+'''
+Numeric forward kinematics over a whole pose specification model.
+
+The class `ForwardKinematics` compiles a `kgprim.motions.PosesSpec` into a tree
+of frames, rooted at a given frame and ordered such that every frame comes
+after its parent. Then, for given values of the variables, it computes the
+pose of every frame relative to the root in a single pass, by composing the
+result of the parent with the transform of the edge.
+
+The transforms of the edges are simplified beforehand, by folding their
+constant parts (see `kgprim.ct.partialeval`), and they are composed in closed
+form (see `kgprim.ct.backend.numeric.compose()`).
+
+For example:
+
+```python
+fk = ForwardKinematics(posesModel, Frame('base'))
+poses = fk.compute( [0.1, 0.2] )   # one value for each of fk.variables
+H = poses[Frame('tool')]           # a 4x4 array, base_X_tool
+```
+'''
+
+import numpy as np
+
+import kgprim.values as numeric_argument
+from kgprim.core import Pose
+from kgprim.motions import ConnectedFramesInspector, PoseSpec
+from kgprim.ct.frommotions import toCoordinateTransform
+from kgprim.ct.metadata import symbolicArgumentsOf
+from kgprim.ct.partialeval import foldConstants
+from kgprim.ct.backend.numeric import compose, composeFloats, amountValue
+
+
+class ForwardKinematics:
+    '''
+    Computes the homogeneous coordinate transforms `root_X_frame` for all the
+    frames connected to `root` in the given `kgprim.motions.PosesSpec`.
+
+    If the frames do not form a tree, the transform of each frame is computed
+    along one shortest path from the root; this is consistent only if the
+    model is consistent.
+
+    Attributes:
+      - `root`: the root frame
+      - `frames`: the list of the frames, starting with the root, such that
+        every frame comes after its parent
+      - `parents`: the list of the indices in `frames` of the parent of each
+        frame (-1 for the root)
+      - `transforms`: the list of the `kgprim.ct.models.CoordinateTransform`
+        `parent_X_frame` of each frame except the root, after constant folding
+      - `variables`: the list of the `kgprim.values.Variable`s of the model, in
+        the order of their first occurrence along `frames`
+      - `parameters`: the list of the `kgprim.values.Parameter`s of the model;
+        they take their default value, unless otherwise specified
+    '''
+
+    def __init__(self, posesModel, root):
+        import networkx as nx
+        inspector = ConnectedFramesInspector(posesModel)
+        if root not in inspector.graph :
+            raise RuntimeError("Frame '{0}' not found in the model '{1}'".format(root, posesModel.name))
+        self.root    = root
+        self.frames  = [root]
+        self.parents = [-1]
+        self.transforms = []
+        index = { root : 0 }
+        variables  = {}
+        parameters = {}
+        for parent, child in nx.bfs_edges(inspector.graph, root) :
+            pose = Pose(target=child, reference=parent)
+            poseSpec = PoseSpec(pose, inspector.edgeMotion(parent, child))
+            ct = foldConstants( toCoordinateTransform(poseSpec) )
+            varss, pars, _ = symbolicArgumentsOf(ct)
+            variables.update( dict.fromkeys(varss) )
+            parameters.update( dict.fromkeys(pars) )
+            index[child] = len(self.frames)
+            self.frames.append(child)
+            self.parents.append(index[parent])
+            self.transforms.append(ct)
+        self.variables  = list(variables)
+        self.parameters = list(parameters)
+        self._parValues = {}
+
+    def setParametersValue(self, values):
+        '''
+        Set the value of some parameters, for the subsequent computations.
+
+        `values` is a dictionary keyed by `kgprim.values.Parameter`; the other
+        parameters retain their current value (initially the default one).
+        '''
+        self._parValues.update(values)
+
+    def compute(self, values):
+        '''
+        The homogeneous coordinate transforms `root_X_frame` of all the frames,
+        in a dictionary keyed by frame.
+
+        `values` gives the value of the variables, either as a dictionary keyed
+        by `kgprim.values.Variable`, or as a sequence ordered like
+        `self.variables`. In the latter case, a 2-D array with shape
+        `(N, len(self.variables))` gives N configurations; with a dictionary,
+        1-D arrays of length N do the same.
+
+        The transforms are 4x4 arrays, or `(N,4,4)` arrays for N configurations.
+        '''
+        if not isinstance(values, dict) :
+            values = np.asarray(values, dtype=np.float64)
+            if values.shape[-1:] != (len(self.variables),) or values.ndim > 2 :
+                raise ValueError('Expected {0} values for the variables'.format(len(self.variables)))
+            values = { v : values[..., i] for i, v in enumerate(self.variables) }
+        values = { **self._parValues, **values }
+        count = None
+        for value in values.values() :
+            if np.ndim(value) > 0 :
+                count = np.shape(value)[0]
+
+        if count is None :
+            return self._computeFloats(values)
+        return self._computeBatch(values, count)
+
+    def _amounts(self, ct, values):
+        amounts = []
+        for p in ct.primitives :
+            amount = getattr(p, 'amount', None) # None for constant elements
+            if isinstance(amount, numeric_argument.Expression) :
+                amount = amountValue(amount, values, ct)
+            amounts.append(amount)
+        return amounts
+
+    def _computeFloats(self, values):
+        poses = [ ([[1.0,0.0,0.0], [0.0,1.0,0.0], [0.0,0.0,1.0]], [0.0,0.0,0.0]) ]
+        for parent, ct in zip(self.parents[1:], self.transforms) :
+            R, p = poses[parent]
+            R = [ list(row) for row in R ]
+            p = list(p)
+            poses.append( composeFloats(R, p, ct.primitives, self._amounts(ct, values)) )
+        ret = {}
+        for frame, (R, p) in zip(self.frames, poses) :
+            mx = np.identity(4)
+            mx[0:3,0:3] = R
+            mx[0:3,3]   = p
+            ret[frame] = mx
+        return ret
+
+    def _computeBatch(self, values, count):
+        poses = [ (np.repeat(np.identity(3)[:, :, np.newaxis], count, axis=2), np.zeros((3, count))) ]
+        for parent, ct in zip(self.parents[1:], self.transforms) :
+            R, p = poses[parent]
+            poses.append( compose(R.copy(), p.copy(), ct.primitives, self._amounts(ct, values), np) )
+        ret = {}
+        for frame, (R, p) in zip(self.frames, poses) :
+            mx = np.zeros((count, 4, 4))
+            mx[:, 0:3, 0:3] = np.moveaxis(R, 2, 0)
+            mx[:, 0:3, 3]   = p.T
+            mx[:, 3, 3]     = 1.0
+            ret[frame] = mx
+        return ret
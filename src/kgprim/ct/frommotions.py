@@ -121,7 +121,8 @@ def motionsToCoordinateTransforms(
         posesModel,
         whichTransforms=None,
         retModelName=None,
-        primitivesPolarity=ctOnRight):
+        primitivesPolarity=ctOnRight,
+        simplifyMotions=False):
     '''
     Create a model with the requested coordinate transforms, from a pose
     specification model.
@@ -136,6 +137,9 @@ def motionsToCoordinateTransforms(
         same name of the input model
       - `primitivesPolarity`: one of `kgprim.ct.models.TransformPolarity`;
         ignore if in doubt
+      - `simplifyMotions`: whether to simplify the motions before the
+        conversion (see `kgprim.motions.simplify()`), which yields transforms
+        with fewer primitives
 
     Return a `CTransformsModel` object, whose field `transforms` is a list
     ordered like the input list `whichTransforms`. If `whichTransforms` is
@@ -145,14 +149,27 @@ def motionsToCoordinateTransforms(
     '''
     retModelName = retModelName or posesModel.name
     if whichTransforms is None :
-        return __convertModel(posesModel, retModelName)
-    transforms = []
+        return __convertModel(posesModel, retModelName, simplifyMotions=simplifyMotions)
+    whichTransforms = list(whichTransforms)
     inspector = mot.ConnectedFramesInspector(posesModel)
-    for whichone in whichTransforms :
-        poseSpec = inspector.getPoseSpec(targetFrame=whichone.leftFrame, referenceFrame=whichone.rightFrame)
+
+    # Resolve all the requests with the same reference frame at once
+    byReference = {}
+    for i, whichone in enumerate(whichTransforms) :
+        byReference.setdefault(whichone.rightFrame, []).append(i)
+    poseSpecs = [None] * len(whichTransforms)
+    for reference, indices in byReference.items() :
+        targets = [ whichTransforms[i].leftFrame for i in indices ]
+        for i, poseSpec in zip(indices, inspector.getPoseSpecs(targets, reference)) :
+            poseSpecs[i] = poseSpec
+
+    transforms = []
+    for whichone, poseSpec in zip(whichTransforms, poseSpecs) :
         if poseSpec is None :
             logger.warning("Could not determine relative pose between '{0}' and '{1}'".format(whichone.leftFrame, whichone.rightFrame))
         else :
+            if simplifyMotions :
+                poseSpec = mot.PoseSpec(poseSpec.pose, mot.simplify(poseSpec.motion))
             myct = toCoordinateTransform(poseSpec, right_frame=whichone.rightFrame, primitives_polarity=primitivesPolarity)
             transforms.append(myct)
     return ct.CTransformsModel(retModelName, transforms)
@@ -161,7 +178,8 @@ def motionsToCoordinateTransforms(
 def __convertModel(
         posesModel, retModelName,
         mode=ctOnRight,
-        primitivesPolarity=ctOnRight):
+        primitivesPolarity=ctOnRight,
+        simplifyMotions=False):
     '''
     Create the default coordinate transforms model from a pose specification
     model.
@@ -174,6 +192,8 @@ def __convertModel(
 
     transforms = []
     for pose in posesModel.poses :
+        if simplifyMotions :
+            pose = mot.PoseSpec(pose.pose, mot.simplify(pose.motion), pose.name)
         transforms.append(
             toCoordinateTransform(pose, None, mode, primitives_polarity=primitivesPolarity) )
 
@@ -0,0 +1,121 @@
+'''
+Analytic derivatives of the matrix representation of coordinate transforms,
+with respect to their variables.
+
+The class `TransformDerivatives` differentiates symbolically the matrix of a
+`kgprim.ct.models.CoordinateTransform`, with respect to each of its
+`kgprim.values.Variable`s (i.e. the ones of
+`kgprim.ct.metadata.TransformMetadata.variables`). The matrix and all its
+derivatives are compiled into a single numeric function, with common
+subexpression elimination; thus, one evaluation costs roughly as much as a few
+evaluations of the matrix alone, rather than the 2N evaluations of central
+finite differences.
+
+For the homogeneous coordinates representation, `geometricJacobian()` gives
+the 6xN Jacobian of the pose of the right frame of the transform, relative to
+the left frame and in left frame coordinates, with the angular part on top.
+
+For example:
+
+```python
+d = TransformDerivatives(ct)
+H, dH = d.evaluate( [0.1, 0.2] ) # dH[i] is the derivative wrt d.variables[i]
+J = d.geometricJacobian( [0.1, 0.2] )
+```
+'''
+
+import numpy as np
+import sympy as sym
+
+from kgprim.ct.repr import mxrepr
+
+
+class TransformDerivatives:
+    '''
+    The matrix representation of a coordinate transform and its derivatives
+    with respect to the variables, compiled into a numeric evaluator.
+
+    Arguments:
+      - `ct`: the `kgprim.ct.models.CoordinateTransform`
+      - `reprKind`: one of `kgprim.ct.repr.mxrepr.MatrixRepresentation`
+
+    Attributes `variables` and `parameters` list the arguments of the
+    transform, in the same order as in `kgprim.ct.backend.symbolic.MyMx`.
+    The parameters take their default value (or zero), unless set with
+    `setParametersValue()`.
+    '''
+
+    def __init__(self, ct, reprKind=mxrepr.MatrixRepresentation.homogeneous):
+        symbolic = mxrepr.symbolic[reprKind](ct)
+        self.ct = ct
+        self.reprKind   = reprKind
+        self.variables  = list(symbolic.variables)
+        self.parameters = list(symbolic.parameters)
+        self.rows, self.cols = symbolic.mx.shape
+
+        matrices = [ symbolic.mx ] + [ symbolic.mx.diff(v.symbol) for v in self.variables ]
+        entries  = [ e for mx in matrices for e in mx ] # row-major
+        self._constantEntries = [ (k, float(e)) for k, e in enumerate(entries) if len(e.free_symbols) == 0 ]
+        self._variableEntries = [ k for k, e in enumerate(entries) if len(e.free_symbols) > 0 ]
+        self._size = len(entries)
+        self._function = sym.lambdify(
+            ([v.symbol for v in self.variables], [p.symbol for p in self.parameters]),
+            [ entries[k] for k in self._variableEntries ], 'numpy', cse=True)
+
+        self._parValues = np.array( [float(p.defaultValue or 0.0) for p in self.parameters] )
+
+    def setParametersValue(self, values):
+        '''
+        Set the value of the parameters, for the subsequent evaluations.
+
+        `values` is a dictionary keyed by `kgprim.values.Parameter`; parameters
+        missing from the dictionary retain their current value.
+        '''
+        for i, par in enumerate(self.parameters) :
+            if par in values :
+                self._parValues[i] = values[par]
+
+    def evaluate(self, values):
+        '''
+        The matrix and its derivatives, for the given values of the variables
+        (ordered like `self.variables`).
+
+        Return a tuple of two arrays, the matrix with shape `(rows, cols)` and
+        the derivatives with shape `(len(self.variables), rows, cols)`. If
+        `values` is a 2-D array with shape `(N, len(self.variables))`, both
+        arrays have an additional leading dimension of size N.
+        '''
+        values = np.asarray(values, dtype=np.float64)
+        if values.shape[-1:] != (len(self.variables),) or values.ndim > 2 :
+            raise ValueError('Expected {0} values for the variables'.format(len(self.variables)))
+        shape = values.shape[:-1]
+        out = np.empty( shape + (self._size,) )
+        for k, value in self._constantEntries :
+            out[..., k] = value
+        args = [ values[..., i] for i in range(len(self.variables)) ]
+        for k, value in zip(self._variableEntries, self._function(args, self._parValues)) :
+            out[..., k] = value
+        out = out.reshape( shape + (len(self.variables)+1, self.rows, self.cols) )
+        return out[..., 0, :, :], out[..., 1:, :, :]
+
+    def geometricJacobian(self, values):
+        '''
+        The 6xN geometric Jacobian of the transform, for the given values of the
+        variables (N being the number of variables). Only available for the
+        homogeneous coordinates representation.
+
+        The columns are the angular and linear velocity (in this order) of the
+        right frame relative to the left frame, in left frame coordinates, for
+        a unit rate of change of each variable.
+
+        As in `evaluate()`, `values` may be a 2-D array, for N configurations.
+        '''
+        if self.reprKind != mxrepr.MatrixRepresentation.homogeneous :
+            raise RuntimeError('The geometric Jacobian requires the homogeneous coordinates representation')
+        H, dH = self.evaluate(values)
+        R  = H[..., np.newaxis, 0:3, 0:3]
+        dR = dH[..., 0:3, 0:3]
+        W  = dR @ np.swapaxes(R, -1, -2) # skew-symmetric
+        omega = np.stack( [W[..., 2, 1], W[..., 0, 2], W[..., 1, 0]], axis=-2 )
+        v = np.swapaxes( dH[..., 0:3, 3], -1, -2 )
+        return np.concatenate( [omega, v], axis=-2 )
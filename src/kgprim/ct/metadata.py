@@ -1,6 +1,7 @@
 from collections import OrderedDict
 
 from kgprim.motions import MotionStep
+from kgprim.ct.models import ConstantCTransform
 import kgprim.values as numeric_argument
 
 
@@ -164,21 +165,18 @@ class UniqueExpression:
         try:
             src_expr = arg.amount # works for both PrimitiveCTransform and MotionStep
 
-            # Sympy specifics here... might not be very robust...
-            # Essentially we want to isolate the same Expression but without any
-            # '-' in front
-            # We rely on the fact that the sympy epressions coming from an input
-            # geometry model are not more complicated than 'coefficient * symbol'.
-            # Explicitly passing 'symbol' makes it work also when the
-            # coefficient is a float rather than rational (e.g. "0.5*pi" as
-            # opposed to "pi/2").
-
-            (mult, rest) = src_expr.expr.as_coeff_mul( src_expr.arg.symbol )
-            if len(rest) > 1 :
-                raise RuntimeError("Could not separate the coefficient in expression {}".format(src_expr.expr))
-            # we assume there is only one term other than the multiplier
-            sympynew = abs(mult) * rest[0]
-            expression = numeric_argument.Expression(argument=src_expr.arg, sympyExpr=sympynew)
+            if src_expr.coefficient is not None :
+                expression = numeric_argument.Expression(src_expr.arg, coefficient=abs(src_expr.coefficient))
+            else :
+                # Sympy specifics here... might not be very robust...
+                # Essentially we want to isolate the same Expression but without
+                # any '-' in front
+                (mult, rest) = src_expr.expr.as_coeff_mul( src_expr.arg.symbol )
+                if len(rest) > 1 :
+                    raise RuntimeError("Could not separate the coefficient in expression {}".format(src_expr.expr))
+                # we assume there is only one term other than the multiplier
+                sympynew = abs(mult) * rest[0]
+                expression = numeric_argument.Expression(argument=src_expr.arg, sympyExpr=sympynew)
 
             self.expression = expression
             self.rotation   = (arg.kind == MotionStep.Kind.Rotation)
@@ -193,6 +191,8 @@ class UniqueExpression:
     def isRotation(self): return self.rotation
 
     def isIdentity(self):
+        if self.expression.coefficient is not None :
+            return self.expression.coefficient == 1
         return (self.expression.arg.symbol == self.expression.expr)
 
     def __eq__(self, rhs):
@@ -212,7 +212,8 @@ def symbolicArgumentsOf(coordinateTransform):
     respectively the variables, parameters and constants of the given transform
     (`kgprim.values.Variable`, `kgprim.values.Parameter`, and
     `kgprim.values.Constant`). Occurrences of pi and raw floating point values
-    are never included.
+    are never included, nor are the constants folded into a
+    `kgprim.ct.models.ConstantCTransform`.
     The keys are stored in the same order as they appear in the transform (e.g.
     if the transform is a rotation of r radians followed by a translation of t
     meters, r will appear before t).
@@ -227,6 +228,8 @@ def symbolicArgumentsOf(coordinateTransform):
     pars  = OrderedDict()
     consts= OrderedDict()
     for pct in coordinateTransform.primitives :
+        if isinstance(pct, ConstantCTransform) :
+            continue # no arguments, as it has a numeric value
         if isinstance(pct.amount, numeric_argument.Expression) :
             arg = pct.amount.arg
             rtexpr = UniqueExpression(pct)
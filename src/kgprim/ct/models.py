@@ -14,12 +14,20 @@ class CoordinateTransform:
     '''
     A model of the transform from `rightFrame` coordinates to `leftFrame`
     coordinates.
+
+    Instances are immutable, and their hash is computed once, at construction;
+    thus they are cheap to use as dictionary keys. The `primitives` are stored
+    as a tuple; passing a tuple to the constructor avoids any copy.
     '''
 
+    __slots__ = ('leftF', 'rightF', '_primitives', '_hash')
+
     def __init__(self, leftFrame, rightFrame, primitives):
-        self.rightF = rightFrame
-        self.leftF  = leftFrame
-        self._primitives = primitives
+        primitives = tuple(primitives)
+        object.__setattr__(self, 'rightF', rightFrame)
+        object.__setattr__(self, 'leftF' , leftFrame)
+        object.__setattr__(self, '_primitives', primitives)
+        object.__setattr__(self, '_hash', 3*hash(leftFrame) + 93*hash(rightFrame) + 31*hash(primitives))
 
     @property
     def leftFrame(self): return self.leftF
@@ -27,18 +35,26 @@ class CoordinateTransform:
     def rightFrame(self): return self.rightF
     @property
     def primitives(self):
-        '''The list of `PrimitiveCTransform` this instance is comprised of.'''
+        '''The tuple of `PrimitiveCTransform` this instance is comprised of.'''
         return self._primitives
 
+    def __setattr__(self, name, value):
+        raise AttributeError("'CoordinateTransform' objects are immutable")
+    def __reduce__(self):
+        return (CoordinateTransform, (self.leftF, self.rightF, self._primitives))
+
     def __str__(self): return self.leftFrame.name + "_X_" + self.rightFrame.name
     def __repr__(self): return self.__str__()
     def __eq__(self, rhs):
+        if self is rhs :
+            return True
         return (isinstance(rhs, CoordinateTransform)
+               and self._hash == rhs._hash
                and self.leftF == rhs.leftF
                and self.rightF == rhs.rightF
                and self._primitives == rhs._primitives) # TODO this is too strict: I could have a different sequence which leads to the same transform
     def __hash__(self):
-        return 3*hash(self.leftF) + 93*hash(self.rightF) + 31*hash(tuple(self.primitives))
+        return self._hash
 
 class TransformPolarity(Enum):
     '''
@@ -78,9 +94,12 @@ class PrimitiveCTransform:
         TransformPolarity.movedFrameOnTheLeft  : "L"
     }
 
+    __slots__ = ('motion', 'polarity_', '_hash')
+
     def __init__(self, motion_step, polarity):
-        self.motion   = motion_step
-        self.polarity_= polarity
+        object.__setattr__(self, 'motion'   , motion_step)
+        object.__setattr__(self, 'polarity_', polarity)
+        object.__setattr__(self, '_hash', hash(motion_step) + 111*hash(polarity))
 
     @property
     def kind(self): return self.motion.kind
@@ -94,11 +113,16 @@ class PrimitiveCTransform:
     @property
     def primitives(self):
         '''
-        A list with the self element only.
+        A tuple with the self element only.
 
         This method is implemented to emulate the behaviour of `CoordinateTransform`.
         '''
-        return [self]
+        return (self,)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("'PrimitiveCTransform' objects are immutable")
+    def __reduce__(self):
+        return (PrimitiveCTransform, (self.motion, self.polarity_))
 
     def __str__(self):
         return 'ct_{pol}_{motion}'.format(
@@ -107,11 +131,59 @@ class PrimitiveCTransform:
     def __repr__(self):
         return self.__str__()
     def __eq__(self, rhs):
-        return (isinstance(rhs, PrimitiveCTransform)
+        return self is rhs or (isinstance(rhs, PrimitiveCTransform)
+               and self._hash == rhs._hash
                and self.motion == rhs.motion
                and self.polarity == rhs.polarity)
     def __hash__(self):
-        return hash(self.motion) + 111*hash(self.polarity)
+        return self._hash
+
+
+class ConstantCTransform:
+    '''
+    A coordinate transform with a constant numeric value, which stands for a
+    sequence of constant primitive transforms, see `kgprim.ct.partialeval`.
+
+    The value is stored as a rotation matrix `rotation` (a tuple of three rows)
+    and a translation vector `translation` (a tuple of three floats), such that
+    the matrix of the transform in homogeneous coordinates is [[R, p], [0, 1]].
+    The replaced primitives are available as `folded`.
+    '''
+
+    __slots__ = ('rotation', 'translation', 'folded', '_hash')
+
+    def __init__(self, rotation, translation, folded):
+        rotation    = tuple( tuple(float(x) for x in row) for row in rotation )
+        translation = tuple( float(x) for x in translation )
+        object.__setattr__(self, 'rotation'   , rotation)
+        object.__setattr__(self, 'translation', translation)
+        object.__setattr__(self, 'folded'     , tuple(folded))
+        object.__setattr__(self, '_hash', 37*hash(rotation) + 59*hash(translation))
+
+    @property
+    def primitives(self):
+        '''
+        A tuple with the self element only.
+
+        This method is implemented to emulate the behaviour of `CoordinateTransform`.
+        '''
+        return (self,)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("'ConstantCTransform' objects are immutable")
+    def __reduce__(self):
+        return (ConstantCTransform, (self.rotation, self.translation, self.folded))
+
+    def __str__(self):
+        return 'ct_const({0})'.format(' '.join(str(p) for p in self.folded))
+    def __repr__(self):
+        return self.__str__()
+    def __eq__(self, rhs):
+        return (isinstance(rhs, ConstantCTransform)
+               and self.rotation == rhs.rotation
+               and self.translation == rhs.translation)
+    def __hash__(self):
+        return self._hash
 
 
 class CTransformsModel:
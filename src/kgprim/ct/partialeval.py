@@ -0,0 +1,109 @@
+'''
+Partial evaluation of coordinate transforms.
+
+In typical models, most of the primitive transforms of a
+`kgprim.ct.models.CoordinateTransform` have a constant amount (a float, or a
+constant `kgprim.values.Expression`), and only a few depend on a variable or a
+parameter. `foldConstants()` replaces each run of consecutive constant
+primitives with a single `kgprim.ct.models.ConstantCTransform`, whose value is
+computed once, here.
+
+The backends of `kgprim.ct.repr.mxrepr` accept the resulting transforms: the
+numeric ones perform fewer matrix products, while the symbolic ones yield
+smaller expressions, with one constant matrix in place of a product of many
+sines and cosines.
+
+For example:
+
+```python
+import kgprim.ct.partialeval as partialeval
+import kgprim.ct.repr.mxrepr as mxrepr
+
+folded = partialeval.foldConstants(ct)
+H = mxrepr.hCoordinatesSymbolic(folded)
+```
+
+Note that the folded constants (i.e. `kgprim.values.Constant`s) are no longer
+among the arguments of the transform (see
+`kgprim.ct.metadata.symbolicArgumentsOf()`).
+'''
+
+import numbers
+
+import kgprim.values as numeric_argument
+from kgprim.ct import models
+from kgprim.ct.backend.numeric import composeFloats
+
+
+def isConstant(primitive):
+    '''Whether the given element of a coordinate transform has a constant value'''
+    if isinstance(primitive, models.ConstantCTransform) :
+        return True
+    amount = primitive.amount
+    if isinstance(amount, numeric_argument.Expression) :
+        return amount.constant()
+    return isinstance(amount, numbers.Real)
+
+
+def _snap(x, tolerance=1e-12):
+    # Round to the nearest integer the values which differ only because of
+    # rounding errors, such as cos(pi/2), to keep the symbolic matrices tidy
+    r = round(x)
+    return float(r) if abs(x - r) < tolerance else x
+
+
+def constantValue(primitives):
+    '''
+    The rotation matrix and the translation vector (lists of floats) of the
+    composition of the given constant primitive transforms.
+    '''
+    R = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]
+    p = [0.0, 0.0, 0.0]
+    # the amount of the folded primitives is ignored by composeFloats()
+    amounts = [ None if isinstance(prim, models.ConstantCTransform) else numeric_argument.toFloat(prim.amount)
+                for prim in primitives ]
+    composeFloats(R, p, primitives, amounts)
+    R = [ [_snap(x) for x in row] for row in R ]
+    p = [ _snap(x) for x in p ]
+    return R, p
+
+
+def foldConstants(ct, minLength=2):
+    '''
+    A `kgprim.ct.models.CoordinateTransform` equivalent to the given one, with
+    each run of at least `minLength` consecutive constant primitives replaced by
+    a `kgprim.ct.models.ConstantCTransform`.
+
+    Shorter runs are left as they are, as a single primitive transform already
+    has a simpler representation than a generic constant matrix.
+    '''
+    primitives = []
+    run = []
+    def flush():
+        if len(run) >= minLength :
+            folded = []
+            for prim in run :
+                folded.extend( prim.folded if isinstance(prim, models.ConstantCTransform) else [prim] )
+            R, p = constantValue(run)
+            primitives.append( models.ConstantCTransform(R, p, folded) )
+        else :
+            primitives.extend(run)
+        run.clear()
+
+    for prim in ct.primitives :
+        if isConstant(prim) :
+            run.append(prim)
+        else :
+            flush()
+            primitives.append(prim)
+    flush()
+    return models.CoordinateTransform(ct.leftFrame, ct.rightFrame, primitives)
+
+
+def foldModelConstants(ctModel, minLength=2):
+    '''
+    A new `kgprim.ct.models.CTransformsModel` with the same name, whose
+    transforms are the ones of the given model after `foldConstants()`.
+    '''
+    transforms = [ foldConstants(ct, minLength) for ct in ctModel.transforms ]
+    return models.CTransformsModel(ctModel.name, transforms)
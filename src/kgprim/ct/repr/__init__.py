@@ -4,6 +4,8 @@ Concrete representations of coordinate transforms.
 A concrete representation is typically a matrix, like a 4x4 matrix for
 homogeneous coordinate vectors.
 
-Please refer to the docs of the module `kgprim.ct.repr.mxrepr`; the other
-modules are for internal use.
+Please refer to the docs of the module `kgprim.ct.repr.mxrepr`. The modules
+`kgprim.ct.repr.codegen` and `kgprim.ct.repr.ccode` generate source code (Python
+and C, respectively) to compute the matrices. The other modules are for
+internal use.
 '''
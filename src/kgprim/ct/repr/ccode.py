@@ -0,0 +1,272 @@
+'''
+Generation of C99 code that computes the matrix representation of coordinate
+transforms.
+
+`cSources()` returns the text of a header/source pair. For each transform `T`
+of the model, two functions are generated:
+
+```c
+void T_init(double* mx);
+void T_update(double q0, ..., double p0, ..., double* mx);
+```
+
+Both write into a caller-provided buffer of `rows*cols` doubles, with the
+coefficients stored in row-major order. `T_init()` writes the constant
+coefficients, and shall be called once; `T_update()` then computes only the
+coefficients that depend on the variables and parameters (which are its
+arguments, in the same order as in the `kgprim.ct.metadata.TransformMetadata`).
+The same preprocessing of `kgprim.ct.repr.codegen.TransformCode` applies, i.e.
+one sine/cosine per unique angle and common subexpression elimination.
+
+The class `CHarness` compiles the generated code with the system C compiler,
+and loads it with `ctypes`, to check it against the numeric functors of
+`kgprim.ct.repr.mxrepr` and to compare the throughput.
+'''
+
+import ctypes, os, subprocess, tempfile, timeit
+import numpy as np
+from sympy.printing.c import C99CodePrinter
+
+from kgprim.ct.metadata import TransformsModelMetadata
+from kgprim.ct.repr import mxrepr
+from kgprim.ct.repr import codegen
+
+
+def _signature(code, kind):
+    if kind == 'init' :
+        return 'void {0}_init(double* mx)'.format(code.name)
+    args = [ 'double ' + s.name for s in code.arguments ] + ['double* mx']
+    return 'void {0}_update({1})'.format(code.name, ', '.join(args))
+
+
+def _updateBody(code, printer):
+    lines = []
+    for s, c, angle in code.trigonometry :
+        a = printer.doprint(angle)
+        lines.append( '    const double {0} = sin({1});'.format(s.name, a) )
+        lines.append( '    const double {0} = cos({1});'.format(c.name, a) )
+    for t, expr in code.temporaries :
+        lines.append( '    const double {0} = {1};'.format(t.name, printer.doprint(expr)) )
+    for (r, c), expr in code.entries :
+        lines.append( '    mx[{0}] = {1};'.format(r*code.cols + c, printer.doprint(expr)) )
+    if len(code.entries) == 0 :
+        lines.append( '    (void)mx;' )
+    return lines
+
+
+def cSources(ctModel, modelMetadata=None,
+             reprKind=mxrepr.MatrixRepresentation.homogeneous, baseName=None):
+    '''
+    The C99 header and source code (a tuple of two strings) for the
+    transforms of the given model.
+
+    Arguments:
+      - `ctModel`: a `kgprim.ct.models.CTransformsModel`
+      - `modelMetadata`: the corresponding
+        `kgprim.ct.metadata.TransformsModelMetadata`; it is computed if None
+      - `reprKind`: one of `kgprim.ct.repr.mxrepr.MatrixRepresentation`
+      - `baseName`: the name of the header file without extension, which the
+        source includes; defaults to the name of the model
+
+    A `ValueError` is raised if two transforms have the same identifier, see
+    `kgprim.ct.repr.codegen.transformCodes()`.
+    '''
+    modelMetadata = modelMetadata or TransformsModelMetadata(ctModel)
+    codes = codegen.transformCodes(modelMetadata, reprKind)
+    baseName = baseName or codegen.identifier(ctModel.name)
+    guard = codegen.identifier(baseName).upper() + '_H'
+    printer = C99CodePrinter()
+
+    h = []
+    h.append( '/*' )
+    h.append( ' * Coordinate transforms of the model \'{0}\', {1} representation.'.format(ctModel.name, reprKind.name) )
+    h.append( ' * Generated by kgprim.ct.repr.ccode' )
+    h.append( ' *' )
+    h.append( ' * Matrices are stored in row-major order in caller-provided buffers.' )
+    h.append( ' * Call <transform>_init() once on a buffer, then <transform>_update()' )
+    h.append( ' * to compute the non-constant coefficients.' )
+    h.append( ' */' )
+    h.append( '#ifndef ' + guard )
+    h.append( '#define ' + guard )
+    h.append( '' )
+    for code in codes :
+        h.append( '/* {0}, {1}x{2} */'.format(code.metadata.name, code.rows, code.cols) )
+        h.append( _signature(code, 'init') + ';' )
+        h.append( _signature(code, 'update') + ';' )
+        h.append( '' )
+    h.append( '#endif' )
+
+    c = []
+    c.append( '/* Generated by kgprim.ct.repr.ccode */' )
+    c.append( '#include <math.h>' )
+    c.append( '#include "{0}.h"'.format(baseName) )
+    for code in codes :
+        c.append( '' )
+        c.append( _signature(code, 'init') )
+        c.append( '{' )
+        for (r, col), value in code.constants :
+            c.append( '    mx[{0}] = {1!r};'.format(r*code.cols + col, value) )
+        if len(code.constants) == 0 :
+            c.append( '    (void)mx;' )
+        c.append( '}' )
+        c.append( '' )
+        c.append( _signature(code, 'update') )
+        c.append( '{' )
+        c.extend( _updateBody(code, printer) )
+        c.append( '}' )
+    return '\n'.join(h) + '\n', '\n'.join(c) + '\n'
+
+
+def _batchFunctions(code):
+    # Loops over many samples, only used by the harness: `_batch_init` is
+    # called once on the output buffers, and `_batch_update` for each
+    # evaluation; `args` is a row-major n x len(code.arguments) array
+    nargs = len(code.arguments)
+    size  = code.rows * code.cols
+    args  = [ 'args[i*{0}+{1}]'.format(nargs, k) for k in range(nargs) ] + [ 'mx + i*{0}'.format(size) ]
+    return '\n'.join([
+        'void {0}_batch_init(int n, double* mx)'.format(code.name),
+        '{',
+        '    for(int i=0; i<n; i++) {',
+        '        {0}_init(mx + i*{1});'.format(code.name, size),
+        '    }',
+        '}',
+        '',
+        'void {0}_batch_update(int n, const double* args, double* mx)'.format(code.name),
+        '{',
+        '    for(int i=0; i<n; i++) {',
+        '        {0}_update({1});'.format(code.name, ', '.join(args)),
+        '    }',
+        '}'
+    ])
+
+
+class CHarness:
+    '''
+    Compiles the C code generated for a transforms model into a shared
+    library, loaded with `ctypes`.
+
+    Arguments:
+      - `ctModel`: a `kgprim.ct.models.CTransformsModel`
+      - `reprKind`: one of `kgprim.ct.repr.mxrepr.MatrixRepresentation`
+      - `compiler`: the C compiler command; defaults to the `CC` environment
+        variable, or `cc`
+      - `directory`: where to write the sources and the library; defaults to a
+        new temporary directory
+
+    The temporary directory is removed by `close()`; the harness can also be
+    used as a context manager, which calls `close()` on exit.
+    '''
+
+    def __init__(self, ctModel, reprKind=mxrepr.MatrixRepresentation.homogeneous,
+                 compiler=None, directory=None):
+        self.ctModel  = ctModel
+        self.reprKind = reprKind
+        self.metadata = TransformsModelMetadata(ctModel)
+        self.codes    = { code.metadata.name : code for code in codegen.transformCodes(self.metadata, reprKind) }
+
+        self._tempDir = None
+        if directory is None :
+            self._tempDir = tempfile.TemporaryDirectory(prefix='kgprim_')
+            directory = self._tempDir.name
+        self.directory = directory
+        try :
+            self._build(compiler)
+        except BaseException :
+            self.close()
+            raise
+
+    def _build(self, compiler):
+        baseName = codegen.identifier(self.ctModel.name)
+        header, source = cSources(self.ctModel, self.metadata, self.reprKind, baseName)
+        source += '\n' + '\n\n'.join( _batchFunctions(code) for code in self.codes.values() ) + '\n'
+        with open(os.path.join(self.directory, baseName + '.h'), 'w') as f :
+            f.write(header)
+        sourceFile = os.path.join(self.directory, baseName + '.c')
+        with open(sourceFile, 'w') as f :
+            f.write(source)
+
+        compiler = compiler or os.environ.get('CC', 'cc')
+        libFile = os.path.join(self.directory, 'lib' + baseName + '.so')
+        subprocess.run([compiler, '-std=c99', '-O2', '-shared', '-fPIC', '-o', libFile, sourceFile, '-lm'],
+                       check=True, capture_output=True)
+        self.lib = ctypes.CDLL(libFile)
+
+        doublep = ctypes.POINTER(ctypes.c_double)
+        for code in self.codes.values() :
+            getattr(self.lib, code.name + '_init'  ).argtypes = [doublep]
+            getattr(self.lib, code.name + '_update').argtypes = [ctypes.c_double]*len(code.arguments) + [doublep]
+            getattr(self.lib, code.name + '_batch_init'  ).argtypes = [ctypes.c_int, doublep]
+            getattr(self.lib, code.name + '_batch_update').argtypes = [ctypes.c_int, doublep, doublep]
+
+    def close(self):
+        '''Remove the temporary directory with the sources and the library, if any'''
+        if self._tempDir is not None :
+            self._tempDir.cleanup()
+            self._tempDir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _buffers(self, code, count):
+        # An array for `count` matrices, with the constant coefficients set
+        out = np.empty( (count, code.rows, code.cols) )
+        getattr(self.lib, code.name + '_batch_init')(count, out.ctypes.data_as(ctypes.POINTER(ctypes.c_double)))
+        return out
+
+    def _update(self, code, values, out):
+        doublep = ctypes.POINTER(ctypes.c_double)
+        getattr(self.lib, code.name + '_batch_update')(values.shape[0],
+                    values.ctypes.data_as(doublep), out.ctypes.data_as(doublep))
+
+    def evaluate(self, name, values):
+        '''
+        Evaluate the transform with the given name for N samples.
+
+        `values` is a 2-D array with shape `(N, len(arguments))`, with the
+        values of the variables followed by the values of the parameters.
+        Return an array with shape `(N, rows, cols)`.
+        '''
+        code = self.codes[name]
+        values = np.ascontiguousarray(values, dtype=np.float64)
+        if values.ndim != 2 or values.shape[1] != len(code.arguments) :
+            raise ValueError("Expected an array of shape (N, {0}) for '{1}'".format(len(code.arguments), name))
+        out = self._buffers(code, values.shape[0])
+        self._update(code, values, out)
+        return out
+
+    def check(self, samples=1000, repeat=3):
+        '''
+        Compare the compiled code with the corresponding numeric functor of
+        `kgprim.ct.repr.mxrepr`, for random values of the variables and the
+        default values of the parameters.
+
+        Return a dictionary keyed by transform name, whose values are
+        dictionaries with the maximum absolute error (`'error'`) and the time
+        per sample in seconds of the C code (`'c'`) and of the batched
+        numeric functor (`'numeric'`). As in the intended use of the
+        generated code, the output buffers of the C code are initialized once,
+        and only the `_update()` functions are timed.
+        '''
+        functor = mxrepr.numeric[self.reprKind]
+        report = {}
+        for name, code in self.codes.items() :
+            qs = np.random.uniform(-np.pi, np.pi, (samples, len(code.variables)))
+            ps = [ float(p.defaultValue or 0.0) for p, _ in code.parameters ]
+            args = np.ascontiguousarray( np.hstack([qs, np.tile(ps, (samples, 1))]) )
+            values = { v : qs[:, i] for i, (v, _) in enumerate(code.variables) }
+            values.update( { p : ps[i] for i, (p, _) in enumerate(code.parameters) } )
+
+            actual = self._buffers(code, samples)
+            self._update(code, args, actual)
+            expected = functor.batch_matrix_repr(code.metadata.ct, values)
+            report[name] = {
+                'error'   : float(np.max(np.abs(actual - expected))),
+                'c'       : min(timeit.repeat(lambda: self._update(code, args, actual), number=1, repeat=repeat)) / samples,
+                'numeric' : min(timeit.repeat(lambda: functor.batch_matrix_repr(code.metadata.ct, values), number=1, repeat=repeat)) / samples
+            }
+        return report
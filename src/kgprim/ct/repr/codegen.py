@@ -0,0 +1,242 @@
+'''
+Generation of source code that computes the matrix representation of
+coordinate transforms.
+
+The function `pythonModule()` generates a standalone Python module, with one
+function for each transform of a `kgprim.ct.models.CTransformsModel`. The
+generated code only depends on NumPy, thus it can be used in processes that
+cannot afford to import Sympy (or this package).
+
+For example:
+
+```python
+import kgprim.ct.repr.codegen as codegen
+
+text = codegen.pythonModule(ctModel)
+with open('transforms.py', 'w') as f:
+    f.write(text)
+```
+
+The class `TransformCode` contains the preprocessing which is common to any
+target language, see also the module `kgprim.ct.repr.ccode`.
+'''
+
+import keyword, re
+import sympy as sym
+from sympy.printing.numpy import NumPyPrinter
+
+from kgprim.ct.metadata import TransformsModelMetadata
+from kgprim.ct.repr import mxrepr
+
+
+_cKeywords = {
+    'auto', 'break', 'case', 'char', 'const', 'continue', 'default', 'do',
+    'double', 'else', 'enum', 'extern', 'float', 'for', 'goto', 'if', 'inline',
+    'int', 'long', 'register', 'restrict', 'return', 'short', 'signed',
+    'sizeof', 'static', 'struct', 'switch', 'typedef', 'union', 'unsigned',
+    'void', 'volatile', 'while', '_Bool', '_Complex', '_Imaginary'
+}
+
+# Names used by the generated code itself, which the arguments must not hide:
+# the output matrix, the NumPy module, and the C math functions and macros
+_reservedNames = {
+    'mx', 'numpy',
+    'sin', 'cos', 'tan', 'asin', 'acos', 'atan', 'atan2', 'sinh', 'cosh',
+    'tanh', 'exp', 'log', 'log10', 'pow', 'sqrt', 'cbrt', 'fabs', 'floor',
+    'ceil', 'fmod', 'fmin', 'fmax', 'hypot', 'M_PI', 'M_E'
+}
+
+def identifier(name):
+    '''A valid identifier (in Python as well as in C) derived from `name`'''
+    ident = re.sub(r'\W', '_', name)
+    if ident == '' or ident[0].isdigit() or keyword.iskeyword(ident) or ident in _cKeywords :
+        ident = '_' + ident
+    return ident
+
+
+class TransformCode:
+    '''
+    The matrix representation of a coordinate transform, preprocessed for code
+    generation.
+
+    The Sympy expressions of the non-constant coefficients of the matrix are
+    rewritten in terms of the following, ordered, intermediate quantities:
+      - the sine and cosine of each unique angle (see
+        `kgprim.ct.metadata.UniqueExpression`), computed only once
+      - the common subexpressions of the coefficients, found by `sympy.cse`
+
+    Numerical constants (including `kgprim.values.Constant`s) are hard-coded as
+    floats. The symbols in the expressions are named after the variables and
+    parameters of the transform, see `identifier()`; a `ValueError` is raised
+    if two arguments have the same identifier, or if an identifier clashes
+    with a name used by the generated code (e.g. `mx`, `numpy` or `sin`).
+
+    Attributes:
+      - `name`: the name of the transform, as an identifier
+      - `metadata`: the given `kgprim.ct.metadata.TransformMetadata`
+      - `rows`, `cols`: the size of the matrix
+      - `variables`, `parameters`: lists of pairs (argument, Sympy symbol)
+      - `constants`: list of pairs ((row,col), float value) for the constant
+        coefficients
+      - `trigonometry`: list of triplets (sine symbol, cosine symbol, angle)
+      - `temporaries`: list of pairs (symbol, expression) from the CSE
+      - `entries`: list of pairs ((row,col), expression), for the non-constant
+        coefficients
+    '''
+
+    sinePrefix   = '_s'
+    cosinePrefix = '_c'
+    tempPrefix   = '_x'
+
+    def __init__(self, tfMetadata, reprKind=mxrepr.MatrixRepresentation.homogeneous):
+        mx = mxrepr.symbolic[reprKind](tfMetadata.ct).mx
+        # Entries like sin(q)**2 + cos(q)**2 are constant for Sympy, but they
+        # are generated like the variable ones, as they have free symbols
+        entries   = [ (r, c) for r in range(mx.rows) for c in range(mx.cols) ]
+        constants = [ rc for rc in entries if len(mx[rc].free_symbols) == 0 ]
+        variables = [ rc for rc in entries if len(mx[rc].free_symbols) > 0 ]
+
+        self.metadata = tfMetadata
+        self.name = identifier(tfMetadata.name)
+        self.rows = mx.rows
+        self.cols = mx.cols
+        self.constants  = [ (rc, float(mx[rc])) for rc in constants ]
+        self.variables  = [ (v, sym.Symbol(identifier(v.name))) for v in tfMetadata.variables ]
+        self.parameters = [ (p, sym.Symbol(identifier(p.name))) for p in tfMetadata.parameters ]
+
+        rename = { arg.symbol : s for arg, s in self.variables + self.parameters }
+        reserved = re.compile( '|'.join([self.sinePrefix, self.cosinePrefix, self.tempPrefix]) + r'\d+$' )
+        names = set()
+        for arg, s in self.variables + self.parameters :
+            if reserved.match(s.name) or s.name in _reservedNames :
+                raise ValueError("The argument name '{0}' clashes with the names used in the generated code".format(s.name))
+            if s.name in names :
+                raise ValueError("Two arguments of '{0}' have the same identifier '{1}'".format(tfMetadata.name, s.name))
+            names.add(s.name)
+
+        # One sine and one cosine for each unique angle
+        trigsubs = {}
+        trigonometry = []
+        arguments = list(tfMetadata.variable_expressions.items()) + list(tfMetadata.parameter_expressions.items())
+        for arg, expressions in arguments :
+            for uexpr in expressions :
+                if uexpr.isRotation() :
+                    k = len(trigonometry)
+                    s = sym.Symbol(self.sinePrefix + str(k))
+                    c = sym.Symbol(self.cosinePrefix + str(k))
+                    angle = uexpr.symbolicExpr
+                    trigsubs[ sym.sin(angle) ] = s
+                    trigsubs[ sym.cos(angle) ] = c
+                    trigonometry.append( (s, c, angle.xreplace(rename).evalf()) )
+
+        expressions = [ mx[rc].xreplace(trigsubs).xreplace(rename).evalf() for rc in variables ]
+        used = set().union( *(e.free_symbols for e in expressions) )
+        self.trigonometry = [ t for t in trigonometry if t[0] in used or t[1] in used ]
+
+        temporaries, reduced = sym.cse(expressions, symbols=sym.numbered_symbols(self.tempPrefix))
+        self.temporaries = temporaries
+        self.entries = list( zip(variables, reduced) )
+
+    @property
+    def arguments(self):
+        '''The symbols of the variables followed by the ones of the parameters'''
+        return [ s for _, s in self.variables + self.parameters ]
+
+
+def transformCodes(modelMetadata, reprKind=mxrepr.MatrixRepresentation.homogeneous):
+    '''
+    The list of `TransformCode` for the transforms of the given
+    `kgprim.ct.metadata.TransformsModelMetadata`.
+
+    A `ValueError` is raised if two transforms have the same identifier, as
+    they would be generated as functions with the same name.
+    '''
+    codes = [ TransformCode(tf, reprKind) for tf in modelMetadata.transformsMetadata ]
+    names = {}
+    for code in codes :
+        other = names.setdefault(code.name, code)
+        if other is not code :
+            raise ValueError("The transforms '{0}' and '{1}' have the same identifier '{2}'".format(
+                             other.metadata.name, code.metadata.name, code.name))
+    return codes
+
+
+
+_representationNames = {
+    mxrepr.MatrixRepresentation.homogeneous    : 'homogeneous coordinates',
+    mxrepr.MatrixRepresentation.spatial_motion : 'spatial motion vectors',
+    mxrepr.MatrixRepresentation.spatial_force  : 'spatial force vectors',
+    mxrepr.MatrixRepresentation.pure_rotation  : 'rotation'
+}
+
+def pythonFunction(code, reprKind=mxrepr.MatrixRepresentation.homogeneous):
+    '''
+    The source code of a Python function computing the matrix of the given
+    `TransformCode`.
+
+    The function takes the variables as positional arguments, and the
+    parameters as keyword arguments, defaulting to their default value (or
+    zero). The arguments can be floats or NumPy arrays of the same shape S; in
+    the latter case the function returns an array of shape S + (rows, cols).
+    '''
+    printer = NumPyPrinter({'fully_qualified_modules' : True})
+    signature = [ s.name for s in code.arguments[:len(code.variables)] ]
+    if len(code.parameters) > 0 :
+        signature.append('*')
+        for p, s in code.parameters :
+            signature.append( '{0}={1!r}'.format(s.name, float(p.defaultValue or 0.0)) )
+
+    lines = []
+    lines.append( 'def {0}({1}):'.format(code.name, ', '.join(signature)) )
+    lines.append( "    '''The {0} matrix of {1}'''".format(_representationNames[reprKind], code.metadata.name) )
+    for s, c, angle in code.trigonometry :
+        a = printer.doprint(angle)
+        lines.append( '    {0} = numpy.sin({1})'.format(s.name, a) )
+        lines.append( '    {0} = numpy.cos({1})'.format(c.name, a) )
+    for t, expr in code.temporaries :
+        lines.append( '    {0} = {1}'.format(t.name, printer.doprint(expr)) )
+
+    shape = '({0}, {1})'.format(code.rows, code.cols)
+    if len(code.arguments) > 0 :
+        shape = 'numpy.broadcast({0}).shape + {1}'.format(', '.join(s.name for s in code.arguments), shape)
+    lines.append( '    mx = numpy.zeros({0})'.format(shape) )
+    for (r, c), value in code.constants :
+        if value != 0.0 :
+            lines.append( '    mx[..., {0}, {1}] = {2!r}'.format(r, c, value) )
+    for (r, c), expr in code.entries :
+        lines.append( '    mx[..., {0}, {1}] = {2}'.format(r, c, printer.doprint(expr)) )
+    lines.append( '    return mx' )
+    return '\n'.join(lines)
+
+
+def pythonModule(ctModel, modelMetadata=None,
+                 reprKind=mxrepr.MatrixRepresentation.homogeneous):
+    '''
+    The source code of a standalone Python module to compute the matrix
+    representation of all the transforms of the given model.
+
+    Arguments:
+      - `ctModel`: a `kgprim.ct.models.CTransformsModel`
+      - `modelMetadata`: the corresponding
+        `kgprim.ct.metadata.TransformsModelMetadata`; it is computed if None
+      - `reprKind`: one of `kgprim.ct.repr.mxrepr.MatrixRepresentation`
+
+    The module has one function for each transform (see `pythonFunction()`),
+    and a dictionary `transforms` with all of them, keyed by the name of the
+    transform.
+    '''
+    modelMetadata = modelMetadata or TransformsModelMetadata(ctModel)
+    codes = transformCodes(modelMetadata, reprKind)
+
+    text = "'''\n"
+    text+= "Coordinate transforms of the model '{0}', in the {1} representation.\n\n".format(
+                ctModel.name, _representationNames[reprKind])
+    text+= "This module was generated by `kgprim.ct.repr.codegen`.\n"
+    text+= "'''\n\nimport numpy\n\n"
+    for code in codes :
+        text += '\n' + pythonFunction(code, reprKind) + '\n\n'
+    text += '\ntransforms = {\n'
+    for code in codes :
+        text += "    {0!r} : {1},\n".format(code.metadata.name, code.name)
+    text += '}\n'
+    return text
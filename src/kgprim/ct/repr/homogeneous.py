@@ -12,6 +12,9 @@ class RotationMatrixMixin:
     def setTranslation(self, axis, polarity, mx, length):
         pass
 
+    def setRigidTransform(self, mx, R, p):
+        mx[0:3,0:3] = R
+
 class HCoordinatesMixin:
     @property
     def matrixSize(self):
@@ -21,4 +24,9 @@ class HCoordinatesMixin:
         common.setRot[axis][polarity](mx, s, c)
 
     def setTranslation(self, axis, polarity, mx, length):
-        common.setTr[axis][polarity](mx, length)
\ No newline at end of file
+        common.setTr[axis][polarity](mx, length)
+
+    def setRigidTransform(self, mx, R, p):
+        mx[0:3,0:3] = R
+        for i in range(3) :
+            mx[i,3] = p[i]
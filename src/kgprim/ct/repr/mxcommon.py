@@ -95,6 +95,15 @@ setTr = {
     },
 }
 
+def cross(a, b):
+    '''
+    The cross product a x b, for any pair of objects indexable with 0,1,2
+    '''
+    return (a[1]*b[2] - a[2]*b[1],
+            a[2]*b[0] - a[0]*b[2],
+            a[0]*b[1] - a[1]*b[0])
+
+
 ROT = MotionStep.Kind.Rotation
 TR  = MotionStep.Kind.Translation
 
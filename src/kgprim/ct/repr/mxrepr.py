@@ -11,7 +11,10 @@ representations are:
   - 6x6 matrix for spatial force vectors
 
 For any matrix, one can choose between two concrete backends for the matrix
-data: numeric and symbolic (using respectively Numpy and Sympy).
+data: numeric and symbolic (using respectively Numpy and Sympy). The
+`...ClosedForm` functors are an alternative numeric implementation, which
+composes the rotation and translation parts directly; it is faster for long
+chains of primitive transforms.
 The symbolic option is required whenever the coordinate transform depends on at
 least one non-constant argument, like a `kgprim.values.Variable` or a
 `kgprim.values.Parameter`.
@@ -26,15 +29,40 @@ R = mxrepr.rotationMatrixNumeric( ct )
 M = mxrepr.spatialMotionSymbolic( ct )
 ```
 
+The numeric functors can also evaluate a transform for many values of its
+variables and parameters at once, returning a stack of matrices:
+
+```python
+Hs = mxrepr.hCoordinatesNumeric.batch_matrix_repr( ct, {q0 : q0_values} ) # shape (N,4,4)
+```
+
+The `...Dual` functors (see also the `dual` dictionary) compute a numeric matrix
+together with its derivatives with respect to the variables, for given values
+of the arguments, without any symbolic differentiation:
+
+```python
+D = mxrepr.hCoordinatesDual( ct, {q0 : 0.1, q1 : 0.2} )
+D.value        # the 4x4 matrix
+D.derivatives  # shape (2,4,4), the derivatives wrt q0 and q1
+```
+
+The symbolic functors, and Sympy, are loaded only when first accessed.
+Building a symbolic representation is relatively expensive; memoization can
+be enabled with `enableSymbolicCache()`, or by giving a `MatrixReprCache` to any
+functor.
+
 Please see `test/ct/sample.py` in the project repository for a more complete
 example.
 '''
 
+from collections import OrderedDict
+
+from kgprim.values import Expression, Parameter
 from kgprim.ct.repr import mxcommon
 from kgprim.ct.repr import homogeneous
 from kgprim.ct.repr import spatial
-from kgprim.ct.backend.numeric  import NumericMixin
-from kgprim.ct.backend.symbolic import SymbolicMixin
+from kgprim.ct.backend.numeric  import NumericMixin, ClosedFormNumericMixin
+from kgprim.ct.backend.dual     import DualNumericMixin
 
 from enum import Enum
 
@@ -49,9 +77,72 @@ class MatrixRepresentation(Enum):
     pure_rotation = 3
 
 
+class MatrixReprCache:
+    '''
+    A bounded cache of matrix representations, with least-recently-used
+    eviction.
+
+    An instance can be given to the functors of this module (see the `cache`
+    attribute of `MatrixRepresentationMixin`), and can be shared among them.
+    Entries are keyed by the coordinate transform, the representation (i.e.
+    the type of the functor), the spatial coordinates convention, if any, and
+    the default values of the parameters of the transform (which are ignored
+    by the equality of the parameters, and thus of the transforms).
+    '''
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits    = 0
+        self.misses  = 0
+        self._data   = OrderedDict()
+
+    def get(self, key, compute):
+        '''
+        The cached value for `key`; if missing, call `compute()` and store the
+        result.
+        '''
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            value = compute()
+            self._data[key] = value
+            if len(self._data) > self.maxsize :
+                self._data.popitem(last=False)
+            return value
+        self.hits += 1
+        self._data.move_to_end(key)
+        return value
+
+    def clear(self):
+        '''Remove all the entries, and reset the statistics'''
+        self._data.clear()
+        self.hits   = 0
+        self.misses = 0
+
+    def info(self):
+        '''A dictionary with the statistics and the size of this cache'''
+        return { 'hits' : self.hits, 'misses' : self.misses,
+                 'size' : len(self._data), 'maxsize' : self.maxsize }
+
+    def __len__(self):
+        return len(self._data)
+
+
 class MatrixRepresentationMixin:
-    def __init__(self, **kwds):
+    '''
+    The base of the functors of this module.
+
+    The optional `cache` argument, a `MatrixReprCache`, enables memoization
+    of the representations returned by the functor. Note that with a cache,
+    repeated calls return the _same_ object; with the symbolic backend, this is
+    a `kgprim.ct.backend.symbolic.MyMx` whose parameters' value can be changed,
+    which would then affect all the users of the object.
+    '''
+
+    def __init__(self, cache=None, **kwds):
         super().__init__(**kwds)
+        self.cache = cache
         self.matrix = {
             mxcommon.ROT : self.rotation,
             mxcommon.TR  : self.translation
@@ -70,30 +161,51 @@ class MatrixRepresentationMixin:
         return mx
 
     # make the object look like a functor, returning the matrix representation
-    def __call__(self, ct):
-        return self.matrix_repr(ct) # this is defined in the backend mixins
+    def __call__(self, ct, *args, **kwds):
+        if self.cache is None or args or kwds :
+            return self.matrix_repr(ct, *args, **kwds) # this is defined in the backend mixins
+        key = (self.__class__, getattr(self, 'coordinatesConvention', None), ct, _parameterDefaults(ct))
+        return self.cache.get(key, lambda : self.matrix_repr(ct))
+
+
+def _parameterDefaults(ct):
+    # The default values of the parameters of `ct`, in order; the folded
+    # primitives (see `kgprim.ct.partialeval`) have no amount, nor parameters
+    amounts = ( getattr(p, 'amount', None) for p in ct.primitives )
+    return tuple( a.arg.defaultValue for a in amounts
+                  if isinstance(a, Expression) and isinstance(a.arg, Parameter) )
 
 
 # Compose the mixins to get concrete types that can produce a matrix
 # representation of a coordinate transform:
 
 class RotationMatrixNumeric (MatrixRepresentationMixin, NumericMixin , homogeneous.RotationMatrixMixin): pass
-class RotationMatrixSymbolic(MatrixRepresentationMixin, SymbolicMixin, homogeneous.RotationMatrixMixin): pass
 
 class HCoordinatesNumeric (MatrixRepresentationMixin, NumericMixin , homogeneous.HCoordinatesMixin): pass
-class HCoordinatesSymbolic(MatrixRepresentationMixin, SymbolicMixin, homogeneous.HCoordinatesMixin): pass
 
 class SpatialMotionNumeric (MatrixRepresentationMixin, NumericMixin , spatial.MotionVectorMixin): pass
-class SpatialMotionSymbolic(MatrixRepresentationMixin, SymbolicMixin, spatial.MotionVectorMixin): pass
 
 class SpatialForceNumeric (MatrixRepresentationMixin, NumericMixin , spatial.ForceVectorMixin): pass
-class SpatialForceSymbolic(MatrixRepresentationMixin, SymbolicMixin, spatial.ForceVectorMixin): pass
+
+# Numeric representations computed in closed form, see
+# `kgprim.ct.backend.numeric.ClosedFormNumericMixin`
+
+class RotationMatrixClosedForm(MatrixRepresentationMixin, ClosedFormNumericMixin, homogeneous.RotationMatrixMixin): pass
+class HCoordinatesClosedForm  (MatrixRepresentationMixin, ClosedFormNumericMixin, homogeneous.HCoordinatesMixin): pass
+class SpatialMotionClosedForm (MatrixRepresentationMixin, ClosedFormNumericMixin, spatial.MotionVectorMixin): pass
+class SpatialForceClosedForm  (MatrixRepresentationMixin, ClosedFormNumericMixin, spatial.ForceVectorMixin): pass
+
+# Numeric representations with their derivatives, see
+# `kgprim.ct.backend.dual.DualNumericMixin`
+
+class RotationMatrixDual(MatrixRepresentationMixin, DualNumericMixin, homogeneous.RotationMatrixMixin): pass
+class HCoordinatesDual  (MatrixRepresentationMixin, DualNumericMixin, homogeneous.HCoordinatesMixin): pass
+class SpatialMotionDual (MatrixRepresentationMixin, DualNumericMixin, spatial.MotionVectorMixin): pass
+class SpatialForceDual  (MatrixRepresentationMixin, DualNumericMixin, spatial.ForceVectorMixin): pass
 
 rotationMatrixNumeric  = RotationMatrixNumeric ()
-rotationMatrixSymbolic = RotationMatrixSymbolic()
 
 hCoordinatesNumeric    = HCoordinatesNumeric   ()
-hCoordinatesSymbolic   = HCoordinatesSymbolic  ()
 
 # The spatial motion representation defaults to the convention with rotational
 # coordinates on top of the matrix. To use the other convention, pass the
@@ -102,18 +214,88 @@ hCoordinatesSymbolic   = HCoordinatesSymbolic  ()
 # obj = SpatialMotionNumeric(spatialCoordinatesConvention = spatial.CoordinatesConvention.translationOnTop)
 
 spatialMotionNumeric   = SpatialMotionNumeric  ()
-spatialMotionSymbolic  = SpatialMotionSymbolic ()
 
 spatialForceNumeric    = SpatialForceNumeric   ()
-spatialForceSymbolic   = SpatialForceSymbolic  ()
 
-symbolic = {
-    MatrixRepresentation.homogeneous    : hCoordinatesSymbolic,
-    MatrixRepresentation.spatial_motion : spatialMotionSymbolic,
-    MatrixRepresentation.spatial_force  : spatialForceSymbolic,
-    MatrixRepresentation.pure_rotation  : rotationMatrixSymbolic
+rotationMatrixClosedForm = RotationMatrixClosedForm()
+hCoordinatesClosedForm   = HCoordinatesClosedForm  ()
+spatialMotionClosedForm  = SpatialMotionClosedForm ()
+spatialForceClosedForm   = SpatialForceClosedForm  ()
+
+rotationMatrixDual = RotationMatrixDual()
+hCoordinatesDual   = HCoordinatesDual  ()
+spatialMotionDual  = SpatialMotionDual ()
+spatialForceDual   = SpatialForceDual  ()
+
+numeric = {
+    MatrixRepresentation.homogeneous    : hCoordinatesNumeric,
+    MatrixRepresentation.spatial_motion : spatialMotionNumeric,
+    MatrixRepresentation.spatial_force  : spatialForceNumeric,
+    MatrixRepresentation.pure_rotation  : rotationMatrixNumeric
 }
 
+dual = {
+    MatrixRepresentation.homogeneous    : hCoordinatesDual,
+    MatrixRepresentation.spatial_motion : spatialMotionDual,
+    MatrixRepresentation.spatial_force  : spatialForceDual,
+    MatrixRepresentation.pure_rotation  : rotationMatrixDual
+}
+
+
+
+# The symbolic functors are defined on first access (see the module-level
+# __getattr__() below), as the symbolic backend requires Sympy, which is slow to
+# import and not needed by numeric-only users of this module
+
+_symbolicNames = (
+    'RotationMatrixSymbolic', 'HCoordinatesSymbolic', 'SpatialMotionSymbolic', 'SpatialForceSymbolic',
+    'rotationMatrixSymbolic', 'hCoordinatesSymbolic', 'spatialMotionSymbolic', 'spatialForceSymbolic',
+    'symbolic')
+
+def _defineSymbolicFunctors():
+    global RotationMatrixSymbolic, HCoordinatesSymbolic, SpatialMotionSymbolic, SpatialForceSymbolic
+    global rotationMatrixSymbolic, hCoordinatesSymbolic, spatialMotionSymbolic, spatialForceSymbolic
+    global symbolic
+    from kgprim.ct.backend.symbolic import SymbolicMixin
+
+    class RotationMatrixSymbolic(MatrixRepresentationMixin, SymbolicMixin, homogeneous.RotationMatrixMixin): pass
+    class HCoordinatesSymbolic  (MatrixRepresentationMixin, SymbolicMixin, homogeneous.HCoordinatesMixin): pass
+    class SpatialMotionSymbolic (MatrixRepresentationMixin, SymbolicMixin, spatial.MotionVectorMixin): pass
+    class SpatialForceSymbolic  (MatrixRepresentationMixin, SymbolicMixin, spatial.ForceVectorMixin): pass
+
+    rotationMatrixSymbolic = RotationMatrixSymbolic()
+    hCoordinatesSymbolic   = HCoordinatesSymbolic  ()
+    spatialMotionSymbolic  = SpatialMotionSymbolic ()
+    spatialForceSymbolic   = SpatialForceSymbolic  ()
+
+    symbolic = {
+        MatrixRepresentation.homogeneous    : hCoordinatesSymbolic,
+        MatrixRepresentation.spatial_motion : spatialMotionSymbolic,
+        MatrixRepresentation.spatial_force  : spatialForceSymbolic,
+        MatrixRepresentation.pure_rotation  : rotationMatrixSymbolic
+    }
+
+def __getattr__(name):
+    if name in _symbolicNames :
+        _defineSymbolicFunctors()
+        return globals()[name]
+    raise AttributeError("module '{0}' has no attribute '{1}'".format(__name__, name))
+
+
+def enableSymbolicCache(maxsize=128):
+    '''
+    Enable memoization for the symbolic functors of this module, with a
+    single, shared `MatrixReprCache`, which is returned.
+    '''
+    cache = MatrixReprCache(maxsize)
+    for functor in __getattr__('symbolic').values() :
+        functor.cache = cache
+    return cache
+
+def disableSymbolicCache():
+    '''Disable the memoization for the symbolic functors of this module.'''
+    for functor in __getattr__('symbolic').values() :
+        functor.cache = None
 
 
 def constantCoefficients(symbMatrix):
@@ -143,6 +325,9 @@ class MatrixReprMetadata:
         self.mx = matrixRepresentation
         self.representationKind = reprKind
         self.ctMetadata = coordinateTransformMetadata
+        # hashing the symbolic matrix is expensive; equal instances have the
+        # same transform and matrices of the same shape
+        self._hash = 31*hash(coordinateTransformMetadata.ct) + 93*hash(matrixRepresentation.shape)
 
     def rows(self):   return self.mx.rows
     def cols(self):   return self.mx.cols
@@ -153,5 +338,5 @@ class MatrixReprMetadata:
                 and (self.mx == rhs.mx))
 
     def __hash__(self) :
-        return 31*hash(self.ctMetadata.ct) + 93*hash(self.mx)
+        return self._hash
 
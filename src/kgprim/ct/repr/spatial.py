@@ -92,6 +92,10 @@ Y = common.Y
 Z = common.Z
 
 
+def _tr_block(coordinates_convention, vector_kind):
+    return __tr_block[coordinates_convention][vector_kind]
+
+
 def _tr_matrix_setters(coordinates_convention):
     def matrix_setters(vector_kind):
         matrix_block     = __tr_block[coordinates_convention][vector_kind]
@@ -145,11 +149,23 @@ class SpatialCoordinatesMixin:
     def setRotation(self, axis, polarity, mx, s, c):
         setRot[axis][polarity](mx, s, c)
 
+    def setRigidTransform(self, mx, R, p):
+        mx[block_top_left]     = R
+        mx[block_bottom_right] = R
+        # the translation block is skew(p) @ R, that is, each column is the
+        # cross product between p and the corresponding column of R
+        rows, cols = self.translation_block
+        for j in range(3) :
+            col = common.cross(p, R[:,j])
+            for i in range(3) :
+                mx[rows.start+i, cols.start+j] = col[i]
+
 
 class MotionVectorMixin(SpatialCoordinatesMixin):
     def __init__(self, **kwds):
         super().__init__(**kwds)
         self.translation_setters = self.tr_matrix_setters(VectorType.motion)
+        self.translation_block   = _tr_block(self.coordinatesConvention, VectorType.motion)
 
     def setTranslation(self, axis, polarity, mx, length):
         self.translation_setters[axis][polarity](mx, length)
@@ -159,6 +175,7 @@ class ForceVectorMixin(SpatialCoordinatesMixin):
     def __init__(self, **kwds):
         super().__init__(**kwds)
         self.translation_setters = self.tr_matrix_setters(VectorType.force)
+        self.translation_block   = _tr_block(self.coordinatesConvention, VectorType.force)
 
     def setTranslation(self, axis, polarity, mx, length):
         self.translation_setters[axis][polarity](mx, length)
@@ -18,9 +18,11 @@ The package `motiondsl` offers a simple textual format to conveniently load
 motion objects.
 '''
 
+import numbers
 from enum import Enum
 from kgprim.core import Frame
 from kgprim.core import Pose
+from kgprim.values import Expression
 
 
 class Axis(Enum):
@@ -41,6 +43,8 @@ class MotionStep:
         Rotation=0
         Translation=1
 
+    __slots__ = ('kind', 'axis', 'amount')
+
     def __init__(self, kind, axis, amount):
         self.kind   = kind
         self.axis   = axis
@@ -94,6 +98,8 @@ class MotionSequence:
         currentFrame = 0
         fixedFrame   = 1
 
+    __slots__ = ('steps', 'mode')
+
     def __init__(self, steps, mode=Mode.currentFrame):
         self.steps= steps
         self.mode = mode
@@ -181,6 +187,69 @@ def reverse(aMotion) :
     return MotionPath(inverseSequences)
 
 
+def simplify(aMotion) :
+    '''
+    An equivalent motion with possibly fewer steps, as a `MotionPath` with a
+    single sequence in `currentFrame` mode.
+
+    Sequences in `fixedFrame` mode are rewritten in `currentFrame` mode, and
+    then the steps are folded:
+      - steps with a zero amount are dropped
+      - consecutive rotations about the same axis are merged into one
+      - consecutive translations commute, so the ones along the same axis are
+        merged into one, regardless of the translations in between
+    and folding is repeated whenever a merged step cancels out.
+
+    The amounts of two steps are summed only if they are both numbers, or two
+    `kgprim.values.Expression`s with the same argument; otherwise the steps
+    are retained as they are.
+    '''
+    steps = []
+    for seq in aMotion.sequences :
+        if seq.mode == MotionSequence.Mode.currentFrame :
+            sequenceSteps = seq.steps
+        else :
+            sequenceSteps = seq.translations() + seq.rotations()[::-1]
+        for step in sequenceSteps :
+            _pushStep(steps, step)
+    return MotionPath([ MotionSequence(steps, MotionSequence.Mode.currentFrame) ])
+
+def _isZero(amount):
+    if isinstance(amount, Expression) :
+        if amount.coefficient is not None :
+            return amount.coefficient == 0
+        return amount.expr == 0
+    return amount == 0
+
+def _sumAmounts(a1, a2):
+    '''The sum of two amounts, or None if they cannot be summed'''
+    if isinstance(a1, numbers.Real) and isinstance(a2, numbers.Real) :
+        return a1 + a2
+    if isinstance(a1, Expression) and isinstance(a2, Expression) and a1.arg == a2.arg :
+        if a1.coefficient is not None and a2.coefficient is not None :
+            return Expression(a1.arg, coefficient=a1.coefficient + a2.coefficient)
+        return Expression(a1.arg, a1.expr + a2.expr)
+    return None
+
+def _pushStep(steps, step):
+    '''Append a step to a list of simplified steps, folding it if possible'''
+    if _isZero(step.amount) :
+        return
+    i = len(steps) - 1
+    if step.kind == MotionStep.Kind.Translation :
+        while i >= 0 and steps[i].kind == MotionStep.Kind.Translation and steps[i].axis != step.axis :
+            i -= 1
+    if i >= 0 and steps[i].kind == step.kind and steps[i].axis == step.axis :
+        amount = _sumAmounts(steps[i].amount, step.amount)
+        if amount is not None :
+            if _isZero(amount) :
+                del steps[i]
+            else :
+                steps[i] = MotionStep(step.kind, step.axis, amount)
+            return
+    steps.append(step)
+
+
 class PoseSpec:
     '''
     A relative Pose augmented with the corresponding motion description.
@@ -190,6 +259,8 @@ class PoseSpec:
     the pose of B relative to A.
     '''
 
+    __slots__ = ('_pose', '_motion', '_name')
+
     def __init__(self, pose, motion, name=None):
         '''
         Arguments:
@@ -249,7 +320,21 @@ class PosesSpec:
     #TODO operator[] and such, to make it act as the list
 
 
-import networkx as nx
+from collections import deque
+
+class _EdgeData(dict):
+    # The attributes of an edge of the graph of ConnectedFramesInspector. A
+    # back edge stores the motion of the pose as 'reverseOf'; its 'motion',
+    # the reverse, is computed and stored on the first access
+    __slots__ = ()
+
+    def __missing__(self, key):
+        if key == 'motion' and 'reverseOf' in self :
+            motion = reverse(self['reverseOf'])
+            self['motion'] = motion
+            return motion
+        raise KeyError(key)
+
 
 class ConnectedFramesInspector:
     '''
@@ -259,40 +344,305 @@ class ConnectedFramesInspector:
     For example, if the model contains the pose of A relative to B, and A
     relative to C, it is obviously possible to infer the relation between B and
     C.
+
+    The frames of the model and the poses among them form a graph, which in the
+    common case is a forest (i.e. there is a unique path between two connected
+    frames). The inspector indexes each connected component on demand, by
+    rooting it at an arbitrary frame and storing the parent and the depth of
+    every frame; queries are then answered by walking up to the lowest common
+    ancestor, with a cost proportional to the length of the path rather than to
+    the size of the graph. Components with cycles are not indexed, and queries
+    about them fall back to a breadth-first search of the graph.
+
+    Each edge of `graph` has the attribute `'motion'`, the motion from the
+    first frame to the second. For the back edges, i.e. the reverse of the
+    poses of the model, the motion is computed on the first access to the
+    attribute (e.g. `graph.edges[f1, f2]['motion']`, or `edgeMotion()`), and
+    it is not listed among the attributes of the edge until then.
+
+    The model can be edited with `addPoseSpec()`, `removePoseSpec()` and
+    `mergeModel()`, which update the graph and the index in place. The
+    `PosesSpec` given to the constructor is never modified: on the first edit,
+    the inspector makes its own copy, available as `posesModel`.
     '''
     def __init__(self, posesModel):
+        import networkx as nx
         self.posesModel = posesModel
-        graph = nx.DiGraph()
-
+        self.graph = nx.DiGraph()
+        self.graph.edge_attr_dict_factory = _EdgeData
         for poseSpec in posesModel.poses :
-            pose   = poseSpec.pose
-            motion = poseSpec.motion
-            tgt  = pose.target
-            ref  = pose.reference
-            graph.add_edge( ref, tgt, motion=motion )
-            graph.add_edge( tgt, ref, motion=reverse(motion) )
+            self._setEdges(poseSpec)
+
+        # The tree index, filled lazily by _indexComponent()
+        self._parent  = {}    # frame -> parent frame (None for the root)
+        self._depth   = {}    # frame -> distance from the root
+        self._root    = {}    # frame -> root of its component
+        self._members = {}    # root -> set of the frames of its component
+        self._cyclic  = set() # roots of the components which are not trees
+
+        # Whether self.posesModel is a private copy, see _ownModel()
+        self._ownsModel = False
+
+
+    def addPoseSpec(self, poseSpec):
+        '''
+        Add the given `PoseSpec` to the model of this inspector, updating the
+        graph and the index in place.
+
+        If the model already has a pose between the same frames, the motion
+        of the new one replaces it in the graph.
+        '''
+        self._ownModel()
+        self.posesModel.poses.append(poseSpec)
+        self._addEdges(poseSpec)
+
+    def removePoseSpec(self, poseSpec):
+        '''
+        Remove from the model of this inspector the first `PoseSpec` with the
+        same pose as the given one, updating the graph and the index in place.
+        Frames which are not part of any other pose are removed as well.
+        '''
+        pose  = poseSpec.pose
+        poses = self.posesModel.poses
+        index = next((i for i, p in enumerate(poses) if p is poseSpec), None)
+        if index is None :
+            index = next((i for i, p in enumerate(poses) if p.pose == pose), None)
+        if index is None :
+            raise RuntimeError("Pose '{0}' not found in the model".format(pose))
+        self._ownModel()
+        del self.posesModel.poses[index]
+
+        tgt = pose.target
+        ref = pose.reference
+        frames = {tgt, ref}
+        for other in reversed(self.posesModel.poses) :
+            if {other.pose.target, other.pose.reference} == frames :
+                self._setEdges(other) # another pose links the same frames
+                return
+
+        self.graph.remove_edge(ref, tgt)
+        if ref != tgt :
+            self.graph.remove_edge(tgt, ref)
+        self._unlinkIndex(ref, tgt)
+        for frame in frames :
+            if self.graph.degree(frame) == 0 :
+                self.graph.remove_node(frame)
+                if frame in self._root :
+                    self._invalidate(frame)
 
-        self.graph = graph
+    def mergeModel(self, otherModel, name=None):
+        '''
+        Add all the poses of another `PosesSpec` to this inspector, which
+        then refers to the model `self.posesModel.mergeModel(otherModel, name)`.
+        '''
+        self.posesModel = self.posesModel.mergeModel(otherModel, name)
+        self._ownsModel = True
+        for poseSpec in otherModel.poses :
+            self._addEdges(poseSpec)
+
+
+    def _ownModel(self):
+        # Do not modify the model given to the constructor, which is shared
+        # with the client code
+        if not self._ownsModel :
+            self.posesModel = PosesSpec(self.posesModel.name, list(self.posesModel.poses))
+            self._ownsModel = True
+
+    def _setEdges(self, poseSpec):
+        # The back edge only refers to the original motion; the reverse motion
+        # is computed on demand, see _EdgeData
+        tgt = poseSpec.pose.target
+        ref = poseSpec.pose.reference
+        self.graph.add_edge( ref, tgt )
+        self.graph.add_edge( tgt, ref )
+        forward = self.graph.edges[ref, tgt]
+        forward.clear()
+        forward['motion'] = poseSpec.motion
+        back = self.graph.edges[tgt, ref]
+        back.clear()
+        back['reverseOf'] = poseSpec.motion
+
+    def _addEdges(self, poseSpec):
+        tgt = poseSpec.pose.target
+        ref = poseSpec.pose.reference
+        new = not self.graph.has_edge(ref, tgt)
+        self._setEdges(poseSpec)
+        if new :
+            self._linkIndex(ref, tgt)
+
+    def _visit(self, top, parent, root):
+        '''
+        Visit breadth-first the frames reachable from `top` without passing
+        through `parent`, setting their parent, depth and root, so that `top`
+        hangs below `parent` (which may be None).
 
+        Return the set of the visited frames, and whether an edge not
+        belonging to the visit tree was found, i.e. whether there is a cycle.
+        '''
+        parents = self._parent
+        depth   = self._depth
+        roots   = self._root
+        parents[top] = parent
+        depth[top]   = 0 if parent is None else depth[parent] + 1
+        roots[top]   = root
+        visited = {top}
+        cyclic  = False
+        queue = deque([top])
+        while queue :
+            v = queue.popleft()
+            for w in self.graph.successors(v) :
+                if w == parents[v] :
+                    continue
+                if w in visited :
+                    cyclic = True
+                    continue
+                parents[w] = v
+                depth[w]   = depth[v] + 1
+                roots[w]   = root
+                visited.add(w)
+                queue.append(w)
+        return visited, cyclic
+
+    def _indexComponent(self, root):
+        '''
+        Index the component of `root`, rooting it at this frame. Flag the
+        component as cyclic if it is not a tree.
+        '''
+        visited, cyclic = self._visit(root, None, root)
+        self._members[root] = visited
+        if cyclic :
+            self._cyclic.add(root)
+
+    def _invalidate(self, root):
+        '''Drop the index of a component, which will be rebuilt on demand'''
+        for frame in self._members.pop(root) :
+            del self._parent[frame]
+            del self._depth[frame]
+            del self._root[frame]
+        self._cyclic.discard(root)
+
+    def _linkIndex(self, f1, f2):
+        '''Update the index after a new edge between `f1` and `f2`'''
+        if f2 in self._root and f1 not in self._root :
+            f1, f2 = f2, f1
+        if f1 not in self._root :
+            return # not indexed yet
+        r1 = self._root[f1]
+        if f2 in self._root :
+            r2 = self._root[f2]
+            if r1 == r2 :
+                self._cyclic.add(r1)
+            elif (r1 in self._cyclic) or (r2 in self._cyclic) :
+                self._invalidate(r1)
+                self._invalidate(r2)
+            else :
+                # Two trees become one: hang the smaller below the other
+                if len(self._members[r1]) < len(self._members[r2]) :
+                    f1, f2, r1, r2 = f2, f1, r2, r1
+                self._visit(f2, f1, r1)
+                self._members[r1] |= self._members.pop(r2)
+        elif self.graph.degree(f2) == 2 :
+            # f2 is a new frame, a leaf of the component of f1
+            self._parent[f2] = f1
+            self._depth[f2]  = self._depth[f1] + 1
+            self._root[f2]   = r1
+            self._members[r1].add(f2)
+        else :
+            self._invalidate(r1) # f2 brings a whole component not indexed yet
+
+    def _unlinkIndex(self, f1, f2):
+        '''Update the index after the removal of the edge between `f1` and `f2`'''
+        if f1 not in self._root :
+            return
+        root = self._root[f1]
+        if root in self._cyclic :
+            self._invalidate(root) # it might be a tree now
+            return
+        # In a tree, every edge connects a frame to its parent; removing it
+        # detaches the subtree of the child, which becomes a new component
+        child = f2 if self._parent[f2] == f1 else f1
+        visited, _ = self._visit(child, None, child)
+        self._members[root] -= visited
+        self._members[child] = visited
+
+    def _rootOf(self, frame):
+        if frame not in self._root :
+            self._indexComponent(frame)
+        return self._root[frame]
+
+    def _treePath(self, source, target):
+        '''
+        The list of frames from `source` to `target`, which must belong to the
+        same acyclic component.
+        '''
+        parent = self._parent
+        depth  = self._depth
+        up   = [source]  # from source to the common ancestor
+        down = [target]  # from target to the common ancestor
+        a, b = source, target
+        while depth[a] > depth[b] :
+            a = parent[a]
+            up.append(a)
+        while depth[b] > depth[a] :
+            b = parent[b]
+            down.append(b)
+        while a != b :
+            a = parent[a]
+            b = parent[b]
+            up.append(a)
+            down.append(b)
+        return up + down[-2::-1]
+
+    def edgeMotion(self, frame1, frame2):
+        '''
+        The motion from `frame1` to `frame2`, which must be adjacent in the
+        graph; i.e. the motion of a pose of the model, or its reverse.
+
+        Reverse motions are computed on the first request, and then stored in
+        the graph, as the `'motion'` attribute of the edge.
+        '''
+        return self.graph.edges[frame1, frame2]['motion']
 
     def hasRelativePose(self, frame1, frame2):
         if (frame1 not in self.graph) or (frame2 not in self.graph):
             return False
-        return nx.has_path(self.graph, frame1, frame2)
+        return self._rootOf(frame1) == self._rootOf(frame2)
 
     def getPoseSpec(self, targetFrame, referenceFrame):
         if not self.hasRelativePose(targetFrame, referenceFrame) :
             return None
-        path = nx.shortest_path(self.graph, target=targetFrame, source=referenceFrame)
-        if len(path) < 1:
-            return None
-        motions = []
-        for v1,v2 in zip(path, path[1:]) :
-            edgedata = self.graph.edges[v1,v2]
-            motions.append(edgedata['motion'])
-
-        pose = Pose(target=targetFrame, reference=referenceFrame)
-        return PoseSpec(pose=pose, motion=MotionPath(motions))
+        if self._root[referenceFrame] in self._cyclic :
+            import networkx as nx
+            path = nx.shortest_path(self.graph, target=targetFrame, source=referenceFrame)
+        else :
+            path = self._treePath(referenceFrame, targetFrame)
+        return self._poseSpecAlong(path)
         # TODO: return the original PoseSpec, if there is one that matches the
         # given frames, instead of recreating it
 
+    def getPoseSpecs(self, targetFrames, referenceFrame):
+        '''
+        The list of the `PoseSpec`s of each of the given target frames relative
+        to the same reference frame, with None for the frames that are not
+        connected to the reference.
+
+        Equivalent to calling `getPoseSpec()` for each target, but if the
+        reference belongs to a component with cycles, a single breadth-first
+        search serves all the targets.
+        '''
+        connected = [ self.hasRelativePose(target, referenceFrame) for target in targetFrames ]
+        if not any(connected) :
+            return [ None for _ in targetFrames ]
+        if self._root[referenceFrame] in self._cyclic :
+            import networkx as nx
+            paths = nx.single_source_shortest_path(self.graph, referenceFrame)
+            path = lambda target : paths[target]
+        else :
+            path = lambda target : self._treePath(referenceFrame, target)
+        return [ self._poseSpecAlong(path(target)) if ok else None
+                 for target, ok in zip(targetFrames, connected) ]
+
+    def _poseSpecAlong(self, path):
+        motions = [ self.edgeMotion(v1, v2) for v1, v2 in zip(path, path[1:]) ]
+        pose = Pose(target=path[-1], reference=path[0])
+        return PoseSpec(pose=pose, motion=MotionPath(motions))
@@ -14,9 +14,15 @@ Internally, a Sympy symbol is used, which is accessible via the `symbol`
 property. The `expr` property also returns the Sympy symbol; it is provided
 for uniformity with the `Expression` class, where `expr` resolves to the actual
 Sympy expression.
+
+Sympy is imported, and the symbols are created, only when first requested;
+thus purely numeric users of this module do not depend on Sympy at all.
 '''
 
-import sympy as sp
+import functools
+import math
+import numbers
+from fractions import Fraction
 
 class Variable:
     '''
@@ -27,16 +33,15 @@ class Variable:
 
     def __init__(self, name, symbol=None):
         self.name_ = name
-        if symbol is not None :
-            self.symbol_ = symbol
-        else :
-            self.symbol_ = sp.Symbol(name=name)
+        self.symbol_ = symbol
     @property
     def name(self):
         return self.name_
     @property
     def symbol(self):
         '''The Sympy symbol used internally'''
+        if self.symbol_ is None :
+            self.symbol_ = _symbol(self.name_)
         return self.symbol_
 
     @property
@@ -49,9 +54,9 @@ class Variable:
     def __eq__(self, rhs):
         return (isinstance(rhs, Variable)
                 and (self.name == rhs.name)
-                and (self.symbol  == rhs.symbol))
+                and _sameSymbol(self, rhs))
     def __hash__(self) :
-        return 47*hash(self.name) + 93*hash(self.symbol)
+        return 47*hash(self.name)
     def __str__(self):
         return "var:{n}".format(n=self.name)
     def __repr__(self):
@@ -71,7 +76,7 @@ class Parameter:
 
     def __init__(self, name, symbol=None, defValue=None):
         self.name_   = name
-        self.symbol_ = symbol or sp.Symbol(name=name)
+        self.symbol_ = symbol
         self.dvalue_ = defValue
 
     @property
@@ -81,6 +86,8 @@ class Parameter:
     @property
     def symbol(self):
         '''The Sympy symbol used internally'''
+        if self.symbol_ is None :
+            self.symbol_ = _symbol(self.name_)
         return self.symbol_
     @property
     def expr(self):
@@ -96,9 +103,9 @@ class Parameter:
     def __eq__(self, rhs):
         return (isinstance(rhs, Parameter)
                 and (self.name == rhs.name)
-                and (self.symbol  == rhs.symbol))
+                and _sameSymbol(self, rhs))
     def __hash__(self) :
-        return 101*hash(self.name) + 11*hash(self.symbol)
+        return 101*hash(self.name)
     def __str__(self):
         return "param:{n}".format(n=self.name)
     def __repr__(self):
@@ -106,33 +113,67 @@ class Parameter:
 
 
 
-class _ConstantSymbol(sp.NumberSymbol):
+def _symbol(name):
+    import sympy as sp
+    return sp.Symbol(name=name)
+
+def _sameSymbol(arg1, arg2):
+    # Default symbols are equal if and only if the names are, so Sympy is
+    # involved only if custom symbols were given
+    if arg1.symbol_ is None and arg2.symbol_ is None :
+        return True
+    return arg1.symbol == arg2.symbol
+
+
+@functools.lru_cache(maxsize=None)
+def _constantSymbolClass():
     # For internal use.
     # Inherit from sympy.NumberSymbol to create a generic symbol with a constant
     # value. Don't really know whether this is correct/complete, but it seems it
     # does the right thing. Not very much documentation out there about how to
     # create a custom constant symbol
+    # The class is created on first use, to defer the import of Sympy.
+    import sympy as sp
 
-    __slots__ = ['name', 'value']
+    class _ConstantSymbol(sp.NumberSymbol):
+        __slots__ = ['name', 'value']
 
-    def __new__(cls, name, value):
-        self = super().__new__(cls)
-        self.name  = name
-        self.value = sp.Float(value)
-        return self
+        def __new__(cls, name, value):
+            self = super().__new__(cls)
+            self.name  = name
+            self.value = sp.Float(value)
+            return self
 
-    def _as_mpf_val(self, prec):
-        return self.value._as_mpf_val(prec)
+        def _as_mpf_val(self, prec):
+            return self.value._as_mpf_val(prec)
 
-    def _sympystr(self, printer):
-        return printer.doprint(sp.Symbol(self.name))
+        def _sympystr(self, printer):
+            return printer.doprint(sp.Symbol(self.name))
 
-    def __eq__(self, rhs):
-        return (isinstance(rhs, _ConstantSymbol)
-                and (self.name  == rhs.name)
-                and (self.value == rhs.value))
-    def __hash__(self) :
-        return 113*hash(self.name) + 29*hash(self.value)
+        def __eq__(self, rhs):
+            return (isinstance(rhs, _ConstantSymbol)
+                    and (self.name  == rhs.name)
+                    and (self.value == rhs.value))
+        def __hash__(self) :
+            return 113*hash(self.name) + 29*hash(self.value)
+
+        def __reduce_ex__(self, protocol):
+            # the class is created at runtime, pickle the constructor arguments
+            return (_newConstantSymbol, (self.name, float(self.value)))
+
+    _ConstantSymbol.__module__   = __name__
+    _ConstantSymbol.__qualname__ = '_ConstantSymbol'
+    return _ConstantSymbol
+
+def _newConstantSymbol(name, value):
+    # For internal use, by the unpickling of `_ConstantSymbol` instances
+    return _constantSymbolClass()(name, value)
+
+def __getattr__(name):
+    # Module-level access to `_ConstantSymbol`, which is created lazily
+    if name == '_ConstantSymbol' :
+        return _constantSymbolClass()
+    raise AttributeError("module '{0}' has no attribute '{1}'".format(__name__, name))
 
 
 class Constant:
@@ -141,7 +182,7 @@ class Constant:
     '''
 
     def __init__(self, name, value):
-        self._symbol= _ConstantSymbol(name, value)
+        self._symbol= None
         self._name  = name
         self._value = value
 
@@ -151,6 +192,8 @@ class Constant:
     @property
     def symbol(self):
         '''The Sympy symbol used internally'''
+        if self._symbol is None :
+            self._symbol = _constantSymbolClass()(self._name, self._value)
         return self._symbol
     @property
     def expr(self):
@@ -168,6 +211,9 @@ class Constant:
                 and (self._value == rhs._value))
     def __hash__(self) :
         return 107*hash(self._name) + 13*hash(self._value)
+    def __reduce__(self):
+        # the Sympy symbol is not pickled, it is created again on demand
+        return (Constant, (self._name, self._value))
 
 class MyPI:
     '''
@@ -185,6 +231,7 @@ class MyPI:
     @property
     def symbol(self):
         '''The Sympy object used internally'''
+        import sympy as sp
         return sp.pi
     @property
     def expr(self):
@@ -194,7 +241,7 @@ class MyPI:
         return True
     @property
     def value(self):
-        return sp.pi.evalf()
+        return math.pi
 
     @staticmethod
     def instance():
@@ -202,81 +249,160 @@ class MyPI:
             MyPI.__inst = MyPI()
         return MyPI.__inst
 
+    def __reduce__(self):
+        # unpickling yields the singleton
+        return (MyPI.instance, ())
+
 class Expression:
     '''
     A wrapper of simple expressions involving either a `Variable`, `Parameter`
     or `Constant`. The expression can have only one argument.
 
-    The actual symbolic expression like '3 * var' or 'pi/2' is stored internally
-    as a Sympy expression.
+    Expressions like '3 * var' or 'pi/2', i.e. a numeric coefficient times the
+    argument, are stored as the coefficient and the argument only. The
+    corresponding Sympy expression is built only when requested, via `expr`,
+    and numeric evaluation is plain floating point arithmetic.
+    Any other expression is stored as a Sympy expression, and `coefficient` is
+    None.
+
+    The coefficient is an `int`, a `float` or a `fractions.Fraction`; dividing
+    an expression with an integer coefficient by an integer yields a
+    `Fraction`, so that, for example, 'pi/2' remains exact in Sympy.
     '''
 
-    def __init__(self, argument, sympyExpr=None):
+    __slots__ = ('argument', 'coefficient', '_factor', '_expression', '_evaluator', '_value')
+
+    def __init__(self, argument, sympyExpr=None, coefficient=1):
         '''
         Parameters:
           - `argument`: an instance of either `Variable`, `Parameter` or
             `Constant`, which is the argument of the expression.
           - `sympyExpr` : the actual, full, Sympy expression; if None, this
-             instance will represent the identity expression.
+             instance will represent the expression `coefficient * argument`.
+          - `coefficient`: the multiplier of the argument, used only when
+            `sympyExpr` is None.
         The only free symbol in the given `sympyExpr` must be the same as
         `argument.symbol`, otherwise a `RuntimeError` is raised.
         '''
+        self.argument = argument
+        self._evaluator = None
+        self._value = None
         if sympyExpr is not None :
             if len(sympyExpr.free_symbols) > 0: # ==0 only for pi or other constants
                 if sympyExpr.free_symbols.pop() != argument.symbol :
                     raise RuntimeError('Inconsistent arguments')
-            self.expression = sympyExpr
+            coefficient = _linearCoefficient(sympyExpr, argument.symbol)
+            self._expression = sympyExpr
         else :
-            self.expression = argument.expr
-        self.argument = argument
+            self._expression = None
+        self.coefficient = coefficient
+        self._factor = None if coefficient is None else float(coefficient)
 
     @property
     def expr(self):
         '''The underlying Sympy expression'''
-        return self.expression
+        if self._expression is None :
+            import sympy as sp
+            self._expression = sp.sympify(self.coefficient) * self.argument.expr
+        return self._expression
     @property
     def arg(self):
         '''The single argument of this expression.'''
         return self.argument
 
     def evalf(self):
-        '''The floating point value of this expression, if it is constant'''
-        if not self.constant() :
-            raise RuntimeError('Cannot evaluate to float a non constant expression')
-        return float( self.expression.evalf( subs={self.argument.symbol : self.argument.value}) )
+        '''
+        The floating point value of this expression, if it is constant.
+        The value is computed once, and cached.
+        '''
+        if self._value is None :
+            if not self.constant() :
+                raise RuntimeError('Cannot evaluate to float a non constant expression')
+            if self._factor is not None :
+                self._value = self._factor * float(self.argument.value)
+            else :
+                self._value = float( self.expr.evalf( subs={self.argument.symbol : self.argument.value}) )
+        return self._value
+
+    def evaluate(self, argumentValue):
+        '''
+        The value of this expression for the given value of the argument.
+
+        `argumentValue` may also be a NumPy array, in which case the expression
+        is evaluated element-wise.
+        '''
+        if self._factor is not None :
+            return self._factor * argumentValue
+        if self._evaluator is None :
+            import sympy as sp
+            self._evaluator = sp.lambdify(self.argument.symbol, self.expr, 'numpy')
+        return self._evaluator(argumentValue)
 
     def constant(self):
         '''Whether this expression has a constant value or not'''
         return self.argument.constant
 
     def __neg__(self):
+        if self.coefficient is not None :
+            return Expression(self.argument, coefficient=-self.coefficient)
         return Expression(self.argument, -self.expr)
 
     def __mul__(self, rhs):
+        if self.coefficient is not None and isinstance(rhs, numbers.Real) :
+            return Expression(self.argument, coefficient=self.coefficient*rhs)
         return Expression(self.argument, self.expr*rhs)
 
     def __truediv__(self, rhs):
+        if self.coefficient is not None and isinstance(rhs, numbers.Real) :
+            if isinstance(self.coefficient, numbers.Rational) and isinstance(rhs, numbers.Rational) :
+                return Expression(self.argument, coefficient=Fraction(self.coefficient, rhs))
+            return Expression(self.argument, coefficient=self.coefficient/rhs)
         return Expression(self.argument, self.expr/rhs)
 
     def __eq__(self, rhs):
-        return (isinstance(rhs, Expression)
-                and (self.arg == rhs.arg)
-                and (self.expr== rhs.expr))
+        if not isinstance(rhs, Expression) or self.arg != rhs.arg :
+            return False
+        if self.coefficient is not None or rhs.coefficient is not None :
+            return self.coefficient == rhs.coefficient
+        return self.expr == rhs.expr
     def __hash__(self) :
+        if self.coefficient is not None :
+            return 31*hash(self.arg) + 93*hash(self.coefficient)
         return 31*hash(self.arg) + 93*hash(self.expr)
     def __str__(self):
         return self.expr.__str__()
     def __repr__(self):
         return "expr:"+self.__str__()
+    def __reduce__(self):
+        # the cached value and evaluator (a lambdified function, which cannot
+        # be pickled) are not pickled
+        if self.coefficient is None :
+            return (Expression, (self.argument, self._expression))
+        return (Expression, (self.argument, None, self.coefficient))
 
     __rmul__ = __mul__
 
 
+def _linearCoefficient(sympyExpr, symbol):
+    '''
+    The coefficient `c` such that `sympyExpr` is `c * symbol`, as a Python
+    number, or None if the expression does not have such form
+    '''
+    (mult, rest) = sympyExpr.as_coeff_mul(symbol)
+    if rest != (symbol,) and not (len(rest) == 0 and mult.is_zero) :
+        return None
+    if mult.is_Integer :
+        return int(mult)
+    if mult.is_Rational :
+        return Fraction(int(mult.p), int(mult.q))
+    return float(mult)
 
-__evalf = {
-    Expression: lambda E: E.evalf(),
-    float:      lambda f: f
-}
 
 def toFloat(expr):
-    return __evalf[expr.__class__](expr)
+    '''
+    The float value of a constant `Expression`, or of a plain number (e.g. an
+    int, a float or a NumPy scalar)
+    '''
+    if isinstance(expr, Expression) :
+        return expr.evalf()
+    return float(expr)
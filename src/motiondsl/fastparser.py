@@ -0,0 +1,353 @@
+'''
+A hand-written parser of MotionDSL documents, alternative to the textX one.
+
+The parser mirrors the PEG grammar of `motiondsl.tx` -- including the textX
+base types, the ordered choices, the whitespace and the comments -- and calls
+the same object processors of `motiondsl.motiondsl.MotionDSL`, in the same
+order. Therefore, for any document it accepts, it yields the same objects as
+the textX parser.
+
+The returned model is a tree of plain objects with the same attributes as the
+textX model (e.g. `name`, `convention`, `motions`, `start`, `primitiveMotions`,
+`userName`); it does not have any of the textX specific attributes.
+
+The parser does not report errors. It raises `NoMatch` at the first input it
+does not handle, and the caller is expected to resort to textX (also in case
+of any other exception, e.g. from an object processor), which will
+either parse the document or report a proper error. The parser also gives up on
+references to a constant defined later in the document, which are valid but
+unusual, and references to a constant defined more than once, which textX
+rejects as ambiguous.
+
+`iterParse()` parses a document incrementally, from a text stream, yielding
+the motions as soon as they are parsed.
+'''
+
+import re
+
+
+class NoMatch(Exception):
+    '''The input is not handled by this parser; textX shall be used instead.'''
+    line = None # the line where the parser stopped, set by iterParse()
+
+
+class _NeedMore(Exception):
+    # The parser of a partial document reached the end of the available text
+    pass
+
+
+class _Node:
+    '''A model object, with the same attributes as the textX one'''
+    def __init__(self, **attrs):
+        self.__dict__.update(attrs)
+
+
+# Whitespace and comments, as skipped by textX (Arpeggio) before each match
+_skip = re.compile(r'[\t\n\r ]*(?://.*$[\t\n\r ]*)*', re.MULTILINE)
+_skipStart = ('\t', '\n', '\r', ' ', '//')
+
+# The textX base types used by the grammar, and the other regular expressions
+_id          = re.compile(r'[^\d\W]\w*\b')
+_int         = re.compile(r'[-+]?[0-9]+')
+_float       = re.compile(r'[+-]?(\d+(\.\d*)?|\.\d+)([eE][+-]?\d+)?(?<=[\w\.])(?![\w\.])')
+_strictFloat = re.compile(r'[+-]?(((\d+\.(\d*)?|\.\d+)([eE][+-]?\d+)?)|((\d+)([eE][+-]?\d+)))(?<=[\w\.])(?![\w\.])')
+_pi          = re.compile(r'[P|p][I|i]')
+_primitive   = re.compile(r'rotx|roty|rotz|trx|try|trz')
+
+_primitiveRules = {
+    'rotx' : 'Rotx', 'roty' : 'Roty', 'rotz' : 'Rotz',
+    'trx'  : 'Trx',  'try'  : 'Try',  'trz'  : 'Trz',
+}
+
+
+class _Parser:
+    def __init__(self, text, processors, final=True):
+        self.text   = text
+        self.pos    = 0
+        self.offset = 0     # the position of `text` in the document
+        self.final  = final # whether `text` is all the rest of the document
+        self.processors = processors
+        self.constants  = {}    # name -> (value, position) of the UserConstant
+        self.duplicates = set() # constants defined more than once
+        self.references = set() # constants referenced by a RefToConstant
+
+    def skip(self):
+        text = self.text
+        if text.startswith(_skipStart, self.pos) :
+            self.pos = _skip.match(text, self.pos).end()
+        # In a partial document, which always ends with a complete line, any
+        # token starting before the end is complete, since no token spans
+        # multiple lines; at the end, instead, more text is required
+        if self.pos == len(text) and not self.final :
+            raise _NeedMore()
+
+    def literal(self, string):
+        self.skip()
+        if self.text.startswith(string, self.pos) :
+            self.pos += len(string)
+            return True
+        return False
+
+    def expect(self, string):
+        if not self.literal(string) :
+            raise NoMatch()
+
+    def regex(self, rx):
+        self.skip()
+        match = rx.match(self.text, self.pos)
+        if match is None :
+            return None
+        self.pos = match.end()
+        return match.group()
+
+    def ident(self):
+        name = self.regex(_id)
+        if name is None :
+            raise NoMatch()
+        return name
+
+    def number(self):
+        # NUMBER: STRICTFLOAT | INT
+        value = self.regex(_strictFloat)
+        if value is not None :
+            return float(value)
+        value = self.regex(_int)
+        return None if value is None else int(value)
+
+    def header(self):
+        self.expect('Model')
+        name = self.ident()
+        paramGroups = []
+        while self.literal('Params') :
+            paramGroups.append( self.parametersDeclaration() )
+        self.expect('Convention')
+        self.expect('=')
+        if self.literal('currentFrame') :
+            convention = 'currentFrame'
+        elif self.literal('fixedFrame') :
+            convention = 'fixedFrame'
+        else :
+            raise NoMatch()
+        return _Node(name=name, paramGroups=paramGroups, convention=convention)
+
+    def model(self):
+        model = self.header()
+        model.motions = []
+        while not self.atEnd() :
+            model.motions.append( self.motion() )
+        return model
+
+    def atEnd(self):
+        self.skip()
+        return self.pos == len(self.text)
+
+    def parametersDeclaration(self):
+        # note that in textX `attr += Rule` means one or more `Rule`, thus the
+        # declaration is actually: "{" ID* ("," ID+)* "}"
+        name = self.ident()
+        self.expect('{')
+        params = []
+        self.parameterLiterals(params)
+        while self.literal(',') :
+            if self.parameterLiterals(params) == 0 :
+                raise NoMatch()
+        self.expect('}')
+        return _Node(name=name, params=params)
+
+    def parameterLiterals(self, params):
+        count = 0
+        param = self.regex(_id)
+        while param is not None :
+            params.append( _Node(name=param) )
+            count += 1
+            param = self.regex(_id)
+        return count
+
+    def motion(self):
+        start = self.ident()
+        self.expect('->')
+        end = self.ident()
+        self.expect(':')
+        steps = []
+        while True :
+            before = self.pos
+            keyword = self.regex(_primitive)
+            if keyword is None :
+                break
+            if not self.literal('(') :
+                self.pos = before
+                break
+            expr = self.expr()
+            self.expect(')')
+            steps.append( self.processors[_primitiveRules[keyword]](_Node(expr=expr)) )
+        userName = None
+        if self.literal('[') :
+            userName = self.ident()
+            self.expect(']')
+        return _Node(start=_Node(name=start), end=_Node(name=end),
+                     primitiveMotions=steps, userName=userName)
+
+    def expr(self):
+        # Expr: MultExpr | DivExpr | PlainExpr
+        start = self.pos
+        mult = self.number()
+        if mult is not None and self.literal('*') :
+            arg = self.value()
+            if arg is not None :
+                return self.processors['MultExpr'](_Node(mult=mult, arg=arg))
+        self.pos = start
+        # DivExpr and PlainExpr share the prefix `minus?="-"? arg=Value`
+        minus = self.literal('-')
+        arg = self.value()
+        if arg is None :
+            raise NoMatch()
+        afterArg = self.pos
+        if self.literal('/') :
+            div = self.number()
+            if div is not None :
+                return self.processors['DivExpr'](_Node(minus=minus, arg=arg, div=div))
+        self.pos = afterArg
+        return self.processors['PlainExpr'](_Node(minus=minus, arg=arg))
+
+    def value(self):
+        # Value: Constant | Parameter | Variable
+        # Constant: FLOAT | PILiteral | UserConstant | RefToConstant
+        self.skip()
+        text, start = self.text, self.pos
+        match = _float.match(text, start)
+        if match is not None :
+            self.pos = match.end()
+            return float(match.group())
+        match = _pi.match(text, start)
+        if match is not None :
+            self.pos = match.end()
+            return self.processors['PILiteral'](match.group())
+        if text.startswith('c:', start) :
+            self.pos = start + 2
+            name = self.regex(_id)
+            if name is not None :
+                afterName = self.pos
+                if self.literal(':') :
+                    value = self.regex(_float)
+                    if value is not None :
+                        return self.userConstant(name, float(value))
+                self.pos = afterName
+                return self.refToConstant(name)
+            self.pos = start
+        if text.startswith('p:', start) :
+            self.pos = start + 2
+            name = self.regex(_id)
+            if name is not None :
+                defvalue = None
+                afterName = self.pos
+                if self.literal('[') :
+                    defvalue = self.number()
+                    if defvalue is None or not self.literal(']') :
+                        defvalue = None
+                        self.pos = afterName
+                return self.processors['Parameter'](_Node(name=name, defvalue=defvalue))
+            self.pos = start
+        match = _id.match(text, start)
+        if match is not None :
+            self.pos = match.end()
+            return self.processors['Variable'](_Node(name=match.group()))
+        return None
+
+    def userConstant(self, name, value):
+        # the position tells a second definition from a second parse of the
+        # same definition, by iterParse()
+        position = self.offset + self.pos
+        if self.constants.setdefault(name, (value, position))[1] != position :
+            if name in self.references :
+                raise NoMatch()
+            self.duplicates.add(name)
+        return self.processors['UserConstant'](_Node(name=name, value=value))
+
+    def refToConstant(self, name):
+        # textX resolves the reference after parsing the whole document, thus
+        # it may refer to a constant defined later; that case is left to textX
+        if name not in self.constants or name in self.duplicates :
+            raise NoMatch()
+        self.references.add(name)
+        actual = _Node(name=name, value=self.constants[name][0])
+        return self.processors['RefToConstant'](_Node(actual=actual))
+
+
+def parse(text, processors):
+    '''
+    The model of the given MotionDSL document.
+
+    Arguments:
+      - `text`: the content of the document
+      - `processors`: the textX object processors, keyed by grammar rule name
+
+    Raises `NoMatch` if the document is not handled by this parser.
+    '''
+    return _Parser(text, processors).model()
+
+
+class _StreamParser(_Parser):
+    def __init__(self, stream, processors, chunkSize):
+        super().__init__('', processors, final=False)
+        self.stream    = stream
+        self.chunkSize = chunkSize
+        self.pending   = '' # the last, incomplete line read from the stream
+        self.line      = 1  # the line number of the start of `text`
+
+    def more(self):
+        # Drop the text already parsed, and append the next complete lines
+        self.line   += self.text.count('\n', 0, self.pos)
+        self.offset += self.pos
+        text = self.text[self.pos:]
+        self.pos = 0
+        while True :
+            chunk = self.stream.read(self.chunkSize)
+            if not chunk :
+                self.text  = text + self.pending
+                self.final = True
+                self.pending = ''
+                return
+            chunk = self.pending + chunk
+            end = chunk.rfind('\n') + 1
+            self.pending = chunk[end:]
+            if end > 0 :
+                self.text = text + chunk[:end]
+                return
+
+    def parse(self, rule):
+        # Parse with the given method, reading more text whenever it runs out.
+        # The retries repeat the same calls of the object processors, which
+        # must have idempotent side effects (as _instantiateParameter() has)
+        while True :
+            start = self.pos
+            try :
+                return rule()
+            except _NeedMore :
+                self.pos = start
+                self.more()
+
+
+def iterParse(stream, processors, chunkSize=1<<16):
+    '''
+    Parse incrementally the MotionDSL document read from the given text stream.
+
+    This generator yields first a model object with the attributes of the
+    header of the document (`name`, `paramGroups` and `convention`), and then
+    one object for each motion, as soon as it is parsed. Only the `read(size)`
+    method of the stream is used; the text is read in chunks of `chunkSize`
+    characters, and the memory used by the parser is bounded by the size of
+    the chunks, of the longest motion and of the set of the names of the
+    constants.
+
+    Raises `NoMatch` at the first input it does not handle, with the attribute
+    `line`. Unlike textX, the parser detects the errors only when it gets to
+    them, after yielding the preceding motions.
+    '''
+    parser = _StreamParser(stream, processors, chunkSize)
+    try :
+        yield parser.parse(parser.header)
+        while not parser.parse(parser.atEnd) :
+            yield parser.parse(parser.motion)
+    except NoMatch as error :
+        error.line = parser.line + parser.text.count('\n', 0, parser.pos)
+        raise
@@ -3,8 +3,9 @@ The actual implementation of the MotionDSL (`motiondsl`), using
 [textX](https://github.com/textX/textX).
 
 The module-level member `dsl` is the default instance of the `MotionDSL` class.
-Normally, you will only need this preallocated instance to load a document in
-the MotionDSL format.
+Normally, you will only need this instance to load a document in the MotionDSL
+format. The instance, and the textX metamodel of the language, are created on
+first use, so that importing this module is cheap.
 
 For example:
 
@@ -27,12 +28,36 @@ def main():
     posesModel = motdsl.toPosesSpecification(motionsModel)
 ```
 
+Two parsers are available, see `Parser`. The default one is based on textX;
+the `fast` one is a hand-written parser for large documents, which yields the
+same `kgprim.motions.PosesSpec` through `toPosesSpecification()`:
+
+```python
+fastdsl = motdsl.MotionDSL(parser=motdsl.Parser.fast)
+posesModel = motdsl.toPosesSpecification( fastdsl.modelFromFile(ifile) )
+```
+
+`MotionDSL.poseSpecsFromFile()` and `MotionDSL.poseSpecsFromStream()` load a
+document incrementally, yielding each `kgprim.motions.PoseSpec` as soon as it
+is parsed, with bounded memory:
+
+```python
+for poseSpec in motdsl.dsl.poseSpecsFromFile(ifile) :
+    inspector.addPoseSpec(poseSpec)
+```
+
+`posesSpecsFromFiles()` loads many documents in parallel, with a pool of
+processes, and optionally merges them into one `kgprim.motions.PosesSpec`:
+
+```python
+posesModel = motdsl.posesSpecsFromFiles(files, merge=True, name='robot')
+```
+
 See also the files in the `sample/motiondsl` folder.
 '''
 
-import sympy as sp
-import os
-import textx
+import os, weakref
+from enum import Enum
 import kgprim.core as primitives
 from kgprim.values import Variable
 from kgprim.values import Parameter
@@ -52,14 +77,26 @@ def _argValue(arg):
     else:
         return Expression(arg)
 
-class MotionDSL:
-    def __init__(self):
-        here = os.path.dirname(os.path.abspath(__file__))
-        self.mm = textx.metamodel_from_file(here+"/motiondsl.tx", auto_init_attributes=False)
-        # disable auto-init so that optional attributes (like the default value
-        # of a parameter) will be 'None' when not specified in the input model
+class Parser(Enum):
+    '''
+    The parsers of MotionDSL documents.
+
+    `textX` builds the model with the textX metamodel of the language; the
+    model objects are textX objects. `fast` is the hand-written parser of
+    `motiondsl.fastparser`, which builds plain objects with the same attributes
+    and is much faster on large documents. For any input it does not
+    recognize, the `fast` parser resorts to textX, which also reports the
+    errors.
+    '''
+    textX = 0
+    fast  = 1
+
 
-        obj_processors = {
+class MotionDSL:
+    def __init__(self, parser=Parser.textX):
+        self.parser = parser
+        self._mm = None
+        self._processors = {
             'PILiteral': lambda _ : MyPI.instance(),
             'Variable' : lambda x : Variable(name=x.name),
             'Parameter': lambda x : self._instantiateParameter(x),
@@ -78,9 +115,26 @@ class MotionDSL:
             'Roty': lambda m : MotionStep(MotionStep.Kind.Rotation,    Axis.Y, m.expr),
             'Rotz': lambda m : MotionStep(MotionStep.Kind.Rotation,    Axis.Z, m.expr)
         }
-        self.mm.register_obj_processors( obj_processors )
+        # the object processors are shared by both parsers, so that they
+        # produce the same objects
         self._resetState()
 
+    @property
+    def mm(self):
+        '''The textX metamodel of the language, built on first access'''
+        if self._mm is None :
+            self._mm = self._buildMetamodel()
+        return self._mm
+
+    def _buildMetamodel(self):
+        import textx
+        here = os.path.dirname(os.path.abspath(__file__))
+        mm = textx.metamodel_from_file(here+"/motiondsl.tx", auto_init_attributes=False)
+        # disable auto-init so that optional attributes (like the default value
+        # of a parameter) will be 'None' when not specified in the input model
+        mm.register_obj_processors( self._processors )
+        return mm
+
     def _resetState(self):
         self.paramInstances = {}
         self.paramDefValues = {}
@@ -88,18 +142,22 @@ class MotionDSL:
     def _instantiateParameter(self, paramFromModel):
         # all the parameters with the same name (i.e. references to the same
         #  model parameter) get the default value which was encountered first
+        # Only the instances still without a default value are tracked, weakly
+        #  (by id, as equal parameters are distinct instances), so that the
+        #  memory does not grow with the size of a streamed document
 
         name     = paramFromModel.name
-        plist    = self.paramInstances.setdefault(name, [])
         defvalue = self.paramDefValues.get(name)
         if defvalue is None and paramFromModel.defvalue is not None:
             defvalue = paramFromModel.defvalue
             self.paramDefValues[name] = defvalue
-            for p in plist:
+            for p in self.paramInstances.pop(name, {}).values():
                 p.dvalue_ = defvalue
 
         newp = Parameter(name=name, defValue=defvalue)
-        plist.append(newp)
+        if defvalue is None:
+            plist = self.paramInstances.setdefault(name, weakref.WeakValueDictionary())
+            plist[id(newp)] = newp
         return newp
 
 
@@ -111,15 +169,111 @@ class MotionDSL:
           - `file`: path of a MotionDSL document (i.e. a text file)
         '''
         self._resetState()
+        if self.parser == Parser.fast :
+            with open(file, encoding='utf-8') as f :
+                model = self._fastModel( f.read() )
+            if model is not None :
+                return model
         return self.mm.model_from_file(file)
 
 
     def modelFromText(self, text):
         self._resetState()
+        if self.parser == Parser.fast :
+            model = self._fastModel(text)
+            if model is not None :
+                return model
         return self.mm.model_from_str(text)
 
 
-dsl = MotionDSL()
+    def poseSpecsFromFile(self, file):
+        '''
+        Generator of the `kgprim.motions.PoseSpec` objects of the given
+        MotionDSL document, in the same order as in the document.
+
+        The file is read and parsed incrementally, and each `PoseSpec` is
+        yielded as soon as the corresponding motion is parsed; see
+        `poseSpecsFromStream()`.
+
+        For an invalid document, the error is reported by textX, after all the
+        `PoseSpec` objects preceding the error have been yielded.
+        '''
+        with open(file, encoding='utf-8') as stream :
+            try :
+                yield from _iterPoseSpecs( self._streamNodes(stream) )
+            except _StreamError as error :
+                self._resetState()
+                self.mm.model_from_file(file) # raises the actual error, if any
+                raise RuntimeError("Line {0} of '{1}': {2}".format(error.line, file, _unsupported)) from None
+
+    def poseSpecsFromStream(self, stream):
+        '''
+        Generator of the `kgprim.motions.PoseSpec` objects of the MotionDSL
+        document read from the given text stream (e.g. an open file), in the
+        same order as in the document.
+
+        The document is read in chunks, and each `PoseSpec` is yielded as soon
+        as the corresponding motion is parsed; thus the processing of the poses
+        can start before the whole document is read, and the memory used by
+        the loader does not grow with the size of the document. The default
+        value of a parameter is unified as in `modelFromFile()`; since it may
+        come from a later occurrence of the same parameter, it is final only at
+        the end of the document.
+
+        The streaming loader always uses the `Parser.fast` parser, and it does
+        not support a reference to a constant defined later in the document.
+        Errors are detected when the parser gets to them, and are reported
+        with a `RuntimeError`.
+        '''
+        try :
+            yield from _iterPoseSpecs( self._streamNodes(stream) )
+        except _StreamError as error :
+            raise RuntimeError("Line {0} of the MotionDSL stream: {1}".format(error.line, _unsupported)) from None
+
+    def _streamNodes(self, stream):
+        from motiondsl import fastparser
+        self._resetState()
+        try :
+            yield from fastparser.iterParse(stream, self._processors)
+        except fastparser.NoMatch as error :
+            raise _StreamError(error.line)
+
+
+    def _fastModel(self, text):
+        # The model parsed by the fast parser, or None if the text must be
+        # handled by textX (in which case the state is reset, as the fast
+        # parser might have instantiated some parameters already).
+        # Any error, including one raised by an object processor, is left to
+        # textX, which reports syntax errors first, as it runs the processors
+        # only after parsing the whole document
+        from motiondsl import fastparser
+        try :
+            return fastparser.parse(text, self._processors)
+        except Exception :
+            self._resetState()
+            return None
+
+
+class _StreamError(Exception):
+    def __init__(self, line):
+        self.line = line
+
+_unsupported = "syntax error, or a construct not supported by the streaming loader (such as a reference to a constant defined later)"
+
+
+_dsl = None
+
+def _defaultDSL():
+    global _dsl
+    if _dsl is None :
+        _dsl = MotionDSL()
+    return _dsl
+
+def __getattr__(name):
+    # Module-level access to the default instance `dsl`, created lazily
+    if name == 'dsl' :
+        return _defaultDSL()
+    raise AttributeError("module '{0}' has no attribute '{1}'".format(__name__, name))
 
 __mode_map = {
     "currentFrame" : MotionSequence.Mode.currentFrame,
@@ -135,17 +289,100 @@ def toPosesSpecification(dslmodel):
     see `MotionDSL.modelFromFile()`
     '''
     mode = __mode_map[ dslmodel.convention ]
-    poses = []
-    for m in dslmodel.motions :
-        ref  = primitives.Frame(m.start.name)
-        tgt  = primitives.Frame(m.end.name)
-        pose = primitives.Pose(target=tgt, reference=ref)
-        motSeq = MotionSequence( m.primitiveMotions, mode)
-        poses.append( PoseSpec(pose=pose, motion=motSeq, name=m.userName) )
-
+    poses = [ _poseSpec(m, mode) for m in dslmodel.motions ]
     return PosesSpec(name=dslmodel.name, poses=poses)
 
 
+def _iterPoseSpecs(nodes):
+    # The PoseSpec objects of the header and motion objects yielded by
+    # fastparser.iterParse()
+    mode = __mode_map[ next(nodes).convention ]
+    for m in nodes :
+        yield _poseSpec(m, mode)
+
+
+def _poseSpec(motion, mode):
+    ref  = primitives.Frame.get(motion.start.name)
+    tgt  = primitives.Frame.get(motion.end.name)
+    pose = primitives.Pose(target=tgt, reference=ref)
+    motSeq = MotionSequence( motion.primitiveMotions, mode)
+    return PoseSpec(pose=pose, motion=motSeq, name=motion.userName)
+
+
+def posesSpecsFromFiles(files, merge=False, name=None, parser=Parser.fast, maxWorkers=None):
+    '''
+    Load many MotionDSL documents in parallel, with a pool of processes.
+
+    Each document is loaded by a worker process, like with
+    `MotionDSL.modelFromFile()` and `toPosesSpecification()`, and the
+    resulting `kgprim.motions.PosesSpec` is sent back pickled.
+
+    Arguments:
+      - `files`: the paths of the MotionDSL documents
+      - `merge`: whether to merge all the models into one, as with
+        `PosesSpec.mergeModel()`
+      - `name`: the name of the merged model; by default, the names of all the
+        models joined by '_', as `mergeModel()` does
+      - `parser`: the parser used by the workers, see `Parser`
+      - `maxWorkers`: the maximum number of processes; by default, the number
+        of processors. With only one worker, the files are loaded in the
+        calling process, without a pool.
+
+    Returns the list of the `PosesSpec` of the files, in the same order, or
+    the merged `PosesSpec`. An error in any document is raised again in the
+    calling process.
+
+    The pool uses the default start method of `multiprocessing`; where this
+    is 'spawn' or 'forkserver', the main module of the program must be
+    importable without side effects (i.e. guarded by
+    `if __name__ == '__main__'`).
+    '''
+    files = list(files)
+    if maxWorkers is None :
+        maxWorkers = os.cpu_count() or 1
+    workers = min(maxWorkers, len(files))
+    if workers <= 1 :
+        dsl = MotionDSL(parser)
+        models = [ toPosesSpecification(dsl.modelFromFile(f)) for f in files ]
+    else :
+        from concurrent.futures import ProcessPoolExecutor
+        # a few chunks per worker, to balance the load and to limit the
+        # communication with the pool
+        chunkSize = max(1, len(files) // (4*workers))
+        with ProcessPoolExecutor(max_workers=workers) as pool :
+            models = list( pool.map(_poolLoad, files, [parser]*len(files), chunksize=chunkSize) )
+    if not merge :
+        return models
+    return _mergeModels(models, name)
+
+
+_poolDSL = None
+
+def _poolLoad(file, parser):
+    # The task of a worker process of posesSpecsFromFiles(). The MotionDSL
+    # instance is kept for the next files, as it may build the textX metamodel
+    global _poolDSL
+    if _poolDSL is None or _poolDSL.parser != parser :
+        _poolDSL = MotionDSL(parser)
+    return toPosesSpecification( _poolDSL.modelFromFile(file) )
+
+
+def _mergeModels(models, name):
+    # Merge pairwise, so that each pose is copied only log(n) times rather
+    # than n times; the order of the poses, and the default name, are the same
+    # as with sequential calls of mergeModel()
+    if len(models) == 0 :
+        return PosesSpec(name, [])
+    while len(models) > 1 :
+        merged = [ a.mergeModel(b) for a, b in zip(models[0::2], models[1::2]) ]
+        if len(models) % 2 == 1 :
+            merged.append( models[-1] )
+        models = merged
+    if name is not None :
+        return PosesSpec(name, models[0].poses)
+    return models[0]
+
+
 
 __ser_map = {
     MotionStep.Kind.Translation : {
@@ -162,6 +399,8 @@ __ser_map = {
 
 
 def _isIdentity(expr):
+    if expr.coefficient is not None :
+        return expr.coefficient == 1
     return expr.expr == expr.arg.symbol
 
 def expressionToMotionDSLSnippet(expr):
@@ -200,5 +439,5 @@ def poseSpecToMotionDSLSnippet(poseSpec):
 def snippetToPoseSpec(text):
     preable = '''Model __tmp__\nConvention = currentFrame\n\n'''
     model_text = preable + text
-    poses = toPosesSpecification( dsl.modelFromText(model_text) )
+    poses = toPosesSpecification( _defaultDSL().modelFromText(model_text) )
     return poses.poses[0]
@@ -0,0 +1,65 @@
+import unittest
+import gc, pickle, sys, subprocess
+
+from kgprim.core import Frame, Pose
+import kgprim.motions as motions
+from kgprim.motions import MotionStep
+
+
+class FrameTests(unittest.TestCase):
+    def test_interning(self):
+        f1 = Frame.get('interned')
+        f2 = Frame.get('interned')
+        self.assertIs(f1, f2)
+        self.assertEqual(f1, Frame('interned'))
+        self.assertEqual(hash(f1), hash(Frame('interned')))
+        self.assertNotEqual(f1, Frame.get('other'))
+
+    def test_registry_is_weak(self):
+        Frame.get('temporary')
+        gc.collect()
+        self.assertNotIn('temporary', Frame._registry)
+
+    def test_pickle(self):
+        frame = Frame.get('pickled')
+        self.assertIs( pickle.loads(pickle.dumps(frame)), frame )
+        pose = Pose(target=frame, reference=Frame('ref'))
+        copy = pickle.loads(pickle.dumps(pose))
+        self.assertEqual( copy, pose )
+        self.assertEqual( hash(copy), hash(pose) )
+
+    def test_immutable_pose(self):
+        pose = Pose(target=Frame('a'), reference=Frame('b'))
+        with self.assertRaises(AttributeError) :
+            pose.target = Frame('c')
+
+    def test_slots(self):
+        objects = [ Frame('f'), Pose(target=Frame('a'), reference=Frame('b')),
+                    MotionStep(MotionStep.Kind.Rotation, motions.Axis.X, 0.1) ]
+        for obj in objects :
+            self.assertFalse( hasattr(obj, '__dict__') )
+
+
+class ImportTests(unittest.TestCase):
+    def test_lazy_dependencies(self):
+        '''The numeric functors can be used without loading Sympy and NetworkX'''
+        script = '''
+import sys
+import kgprim.values as numeric_argument
+import kgprim.motions as motions
+from kgprim.core import Frame, Pose
+from kgprim.ct.frommotions import toCoordinateTransform
+import kgprim.ct.repr.mxrepr as mxrepr
+steps = [motions.MotionStep(motions.MotionStep.Kind.Rotation, motions.Axis.Z, numeric_argument.Expression(numeric_argument.Variable('q')))]
+pose = Pose(target=Frame('a'), reference=Frame('b'))
+ct = toCoordinateTransform(motions.PoseSpec(pose=pose, motion=motions.MotionSequence(steps)))
+mxrepr.hCoordinatesNumeric.batch_matrix_repr(ct, {ct.primitives[0].amount.arg : 0.5})
+print('sympy' in sys.modules, 'networkx' in sys.modules)
+'''
+        out = subprocess.run([sys.executable, '-c', script], check=True,
+                             capture_output=True, text=True).stdout.split()
+        self.assertEqual(out, ['False', 'False'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+'''
+Helpers shared by the tests of the `kgprim.ct` package: random transforms,
+and the derivatives of a transform by finite differences.
+'''
+
+import random, string
+import numpy as np
+
+import kgprim.core    as primitives
+import kgprim.motions as motions
+import kgprim.values  as numeric_argument
+from kgprim.motions import MotionSequence, MotionStep
+from kgprim.ct.frommotions import toCoordinateTransform
+import kgprim.ct.repr.mxrepr as ctrepr
+
+pBA = primitives.Pose(reference=primitives.Frame("A"), target=primitives.Frame("B"))
+
+
+def randomVariables(count=3):
+    return [numeric_argument.Variable(name=n) for n in random.sample(string.ascii_lowercase, count)]
+
+def randomAmount(arguments):
+    '''Either a random float, or a multiple of an expression of one of the
+    given arguments'''
+    if random.random() > 0.5 :
+        return random.random()
+    return random.choice([-2, 1, 0.5]) * numeric_argument.Expression( random.choice(arguments) )
+
+def randomTransform(arguments, stepsCount=6, amount=randomAmount, extraSteps=(),
+                    mode=MotionSequence.Mode.currentFrame, polarity=None):
+    '''
+    A random transform for the pose `pBA`, with `stepsCount` steps of random
+    kind and axis, whose amount is given by `amount(arguments)`.
+
+    The `extraSteps` are inserted at random positions. The `polarity`, if
+    given, is passed to `toCoordinateTransform()`.
+    '''
+    steps = [ MotionStep(random.choice(list(MotionStep.Kind)), random.choice(list(motions.Axis)), amount(arguments))
+              for _ in range(stepsCount) ]
+    for step in extraSteps :
+        steps.insert( random.randrange(len(steps) + 1), step )
+    pose = motions.PoseSpec(pose=pBA, motion=MotionSequence(steps, mode))
+    if polarity is None :
+        return toCoordinateTransform(pose)
+    return toCoordinateTransform(pose, primitives_polarity=polarity)
+
+
+h = 1e-6
+
+def finiteDifferences(ct, variables, q, reprKind=ctrepr.MatrixRepresentation.homogeneous, values=None):
+    '''
+    The partial derivatives of the numeric matrix of `ct` with respect to
+    `variables`, at the point `q`, by central differences; `values` may give
+    the value of other arguments of the transform.
+    '''
+    functor = ctrepr.numeric[reprKind]
+    derivatives = []
+    for i, v in enumerate(variables) :
+        plus  = dict(values or {})
+        minus = dict(values or {})
+        plus.update ( { v2 : q[j] + (h if j == i else 0) for j, v2 in enumerate(variables) } )
+        minus.update( { v2 : q[j] - (h if j == i else 0) for j, v2 in enumerate(variables) } )
+        derivatives.append( (functor.batch_matrix_repr(ct, plus)[0] - functor.batch_matrix_repr(ct, minus)[0]) / (2*h) )
+    n = functor.matrixSize
+    return np.array(derivatives).reshape( (len(variables), n, n) )
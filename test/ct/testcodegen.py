@@ -0,0 +1,114 @@
+'''
+Tests for the code generators of the `kgprim.ct.repr` package.
+'''
+
+import os, shutil, types, unittest
+import numpy as np
+
+import motiondsl.motiondsl as motiondsl
+import kgprim.ct.frommotions as frommotions
+import kgprim.ct.metadata as ctmetadata
+import kgprim.ct.repr.mxrepr as ctrepr
+import kgprim.ct.repr.codegen as codegen
+import kgprim.ct.repr.ccode as ccode
+
+sampleModelFile = os.path.join(os.path.dirname(__file__), '..', '..', 'sample', 'motiondsl', 'model.motdsl')
+
+def sampleModel():
+    poses = motiondsl.toPosesSpecification( motiondsl.dsl.modelFromFile(sampleModelFile) )
+    return frommotions.motionsToCoordinateTransforms(poses)
+
+
+class PythonCodegenTests(unittest.TestCase):
+    def _load(self, ctModel, reprKind):
+        text = codegen.pythonModule(ctModel, reprKind=reprKind)
+        self.assertNotIn('sympy', text)
+        module = types.ModuleType('generated')
+        exec(compile(text, 'generated', 'exec'), module.__dict__)
+        return module
+
+    def _check(self, reprKind):
+        ctModel = sampleModel()
+        module  = self._load(ctModel, reprKind)
+        metadata = ctmetadata.TransformsModelMetadata(ctModel)
+        count = 5
+        for tfinfo in metadata.transformsMetadata :
+            function = module.transforms[tfinfo.name]
+            mx = ctrepr.symbolic[reprKind](tfinfo.ct)
+            qs = np.random.uniform(-3, 3, (count, len(mx.variables)))
+
+            batch = function( *qs.T )
+            self.assertEqual(batch.shape[:-2], (count,) if len(mx.variables)>0 else ())
+            expected = mx.setVariablesValue(valueslist=qs)
+            self.assertTrue( np.allclose(batch, expected) )
+
+            # scalar arguments
+            actual = function( *qs[0] )
+            self.assertEqual(actual.shape, (mx.rows, mx.cols))
+            self.assertTrue( np.allclose(actual, expected[0]) )
+
+            # non default parameters
+            pvalues = { p : np.random.random() for p in mx.parameters }
+            mx.setParametersValue(pvalues)
+            kwds = { codegen.identifier(p.name) : v for p, v in pvalues.items() }
+            self.assertTrue( np.allclose(function(*qs[0], **kwds), mx.setVariablesValue(valueslist=qs[0])) )
+
+    def test_homogeneous(self):
+        self._check(ctrepr.MatrixRepresentation.homogeneous)
+
+    def test_spatial(self):
+        self._check(ctrepr.MatrixRepresentation.spatial_motion)
+
+    def test_symbolic_constant_entries(self):
+        '''Entries like sin(q)**2 + cos(q)**2, constant but with free symbols'''
+        poses = motiondsl.toPosesSpecification( motiondsl.dsl.modelFromText(
+                    'Model m Convention = currentFrame a -> b : rotz(q) rotz(-q) trx(q)') )
+        module = self._load(frommotions.motionsToCoordinateTransforms(poses), ctrepr.MatrixRepresentation.homogeneous)
+        expected = np.identity(4)
+        expected[0, 3] = 0.3
+        self.assertTrue( np.allclose(module.transforms['a_X_b'](0.3), expected) )
+
+    def test_name_clashes(self):
+        texts = [ 'a -> b : rotx(mx)', 'a -> b : rotx(numpy)', 'a -> b : trz(sin)', 'a -> b : rotx(_s0)',
+                  'a -> b : rotx(q) trx(p:q)',     # a variable and a parameter
+                  'a -> b : rotx(q) a -> b : roty(q)' ] # two transforms
+        for text in texts :
+            poses = motiondsl.toPosesSpecification( motiondsl.dsl.modelFromText('Model m Convention = currentFrame ' + text) )
+            ctModel = frommotions.motionsToCoordinateTransforms(poses)
+            self.assertRaises(ValueError, codegen.pythonModule, ctModel)
+
+
+@unittest.skipUnless(shutil.which(os.environ.get('CC', 'cc')), "no C compiler available")
+class CCodegenTests(unittest.TestCase):
+    def test_against_numeric(self):
+        for reprKind in [ctrepr.MatrixRepresentation.homogeneous, ctrepr.MatrixRepresentation.spatial_force] :
+            harness = ccode.CHarness(sampleModel(), reprKind)
+            self.addCleanup(harness.close)
+            for name, result in harness.check(samples=50, repeat=1).items() :
+                self.assertLess(result['error'], 1e-12, name)
+
+    def test_symbolic_constant_entries(self):
+        poses = motiondsl.toPosesSpecification( motiondsl.dsl.modelFromText(
+                    'Model m Convention = currentFrame a -> b : rotz(q) rotz(-q) trx(q)') )
+        with ccode.CHarness( frommotions.motionsToCoordinateTransforms(poses) ) as harness :
+            for name, result in harness.check(samples=10, repeat=1).items() :
+                self.assertLess(result['error'], 1e-12, name)
+
+    def test_temporary_directory(self):
+        with ccode.CHarness(sampleModel()) as harness :
+            directory = harness.directory
+            self.assertTrue(os.path.isdir(directory))
+            name = next(iter(harness.codes))
+            self.assertEqual(harness.evaluate(name, np.zeros((3, len(harness.codes[name].arguments)))).shape[0], 3)
+        self.assertFalse(os.path.exists(directory))
+
+    def test_duplicate_names(self):
+        poses = motiondsl.toPosesSpecification( motiondsl.dsl.modelFromText(
+                    'Model m Convention = currentFrame a -> b : rotx(q) a -> b : roty(q)') )
+        ctModel = frommotions.motionsToCoordinateTransforms(poses)
+        self.assertRaises(ValueError, ccode.cSources, ctModel)
+        self.assertRaises(ValueError, ccode.CHarness, ctModel)
+
+
+if __name__ == '__main__':
+    unittest.main()
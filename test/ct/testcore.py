@@ -4,7 +4,7 @@ These test cases really address the combined working of `kgprim.motions` and
 independently, without resorting to numerical representations.
 '''
 
-import random, math, unittest, string, logging
+import random, math, unittest, string, logging, pickle
 import numpy as np
 import sympy as sp
 
@@ -429,6 +429,28 @@ class TestSymbolicHomogeneous(unittest.TestCase, SymbolicBackendTests):
 class TestTransformMetadata(unittest.TestCase, TransformMetadataTests): pass
 
 
+class TestTransformModels(unittest.TestCase):
+    def randomTransform(self):
+        gen = RandomMotionGenerator(symbolsGenerator)
+        steps = [ gen.randomMotionStep() for _ in range(5) ]
+        return toCoordinateTransform(poseSpec=motions.PoseSpec(pose=pBA, motion=MotionSequence(steps)))
+
+    def test_immutable(self):
+        ct = self.randomTransform()
+        self.assertIsInstance( ct.primitives, tuple )
+        self.assertRaises(AttributeError, setattr, ct, 'leftF', frC)
+        self.assertRaises(AttributeError, setattr, ct.primitives[0], 'polarity_', R_ct_T)
+        self.assertRaises(AttributeError, setattr, pBA, 'target', frC)
+
+    def test_hash(self):
+        ct = self.randomTransform()
+        copy = ctmodels.CoordinateTransform(ct.leftFrame, ct.rightFrame, list(ct.primitives))
+        self.assertEqual( copy, ct )
+        self.assertEqual( hash(copy), hash(ct) )
+        self.assertEqual( pickle.loads(pickle.dumps(ct)), ct )
+        self.assertNotEqual( ctmodels.CoordinateTransform(frB, frA, ct.primitives), ct )
+
+
 def getDebugSample(numMixin, reprMixin):
     class Mixin(numMixin, reprMixin): pass
 
@@ -0,0 +1,98 @@
+'''
+Tests of the forward-mode differentiation backend, `kgprim.ct.backend.dual`.
+'''
+
+import unittest
+import numpy as np
+
+import kgprim.values as numeric_argument
+import kgprim.motions as motions
+from kgprim.motions import MotionSequence, MotionStep
+from kgprim.ct.frommotions import toCoordinateTransform
+from kgprim.ct.partialeval import foldConstants
+import kgprim.ct.repr.mxrepr as ctrepr
+import kgprim.ct.repr.spatial as reprSpatial
+import kgprim.ct.backend.dual as dual
+from test.ct.common import randomTransform, randomVariables, finiteDifferences, pBA
+
+MR = ctrepr.MatrixRepresentation
+
+
+class DualTests(unittest.TestCase):
+
+    def test_derivatives(self):
+        '''Value and partial derivatives match the numeric backend and finite differences'''
+        functors = list(ctrepr.dual.items()) + [
+            (MR.spatial_force, ctrepr.SpatialForceDual(spatialCoordinatesConvention=reprSpatial.CoordinatesConvention.translationOnTop)) ]
+        for reprKind, functor in functors :
+            variables = randomVariables()
+            ct = randomTransform(variables, 10)
+            seeds = functor.defaultSeeds(ct)
+            order = list(seeds)
+            q = np.random.uniform(-2, 2, len(order))
+            values = dict(zip(order, q))
+            D = functor(ct, values)
+            numeric = ctrepr.numeric[reprKind]
+            if hasattr(functor, 'coordinatesConvention') :
+                numeric = numeric.__class__(spatialCoordinatesConvention=functor.coordinatesConvention)
+            self.assertEqual( D.derivatives.shape, (len(order), functor.matrixSize, functor.matrixSize) )
+            self.assertTrue( np.allclose(D.value, numeric.batch_matrix_repr(ct, values)[0]) )
+            if numeric is ctrepr.numeric[reprKind] :
+                self.assertTrue( np.allclose(D.derivatives, finiteDifferences(ct, order, q, reprKind), atol=1e-6) )
+
+    def test_seeds(self):
+        '''A directional derivative is the combination of the partial ones'''
+        variables = randomVariables()
+        ct = foldConstants( randomTransform(variables, 12) )
+        functor = ctrepr.hCoordinatesDual
+        order = list(functor.defaultSeeds(ct))
+        values = dict(zip(order, np.random.uniform(-2, 2, len(order))))
+        partial = functor(ct, values).derivatives
+        directions = np.random.uniform(-1, 1, (2, len(order)))
+        seeds = { v : directions[:, i] for i, v in enumerate(order) }
+        D = functor(ct, values, seeds)
+        self.assertEqual( D.derivatives.shape, (2, 4, 4) )
+        self.assertTrue( np.allclose(D.derivatives, np.einsum('ki,imn->kmn', directions, partial)) )
+
+    def test_parameters(self):
+        q = numeric_argument.Variable('q')
+        p = numeric_argument.Parameter('p', defValue=0.5)
+        E = numeric_argument.Expression
+        steps = [ MotionStep(MotionStep.Kind.Rotation, motions.Axis.Y, E(p)),
+                  MotionStep(MotionStep.Kind.Rotation, motions.Axis.X, 2*E(q)),
+                  MotionStep(MotionStep.Kind.Translation, motions.Axis.Y, -E(p)) ]
+        ct = toCoordinateTransform( motions.PoseSpec(pose=pBA, motion=MotionSequence(steps)) )
+        functor = ctrepr.hCoordinatesDual
+        D = functor(ct, {q : 0.7}) # p takes the default value
+        self.assertTrue( np.allclose(D.derivatives, finiteDifferences(ct, [q], [0.7])) )
+        D = functor(ct, {q : 0.7}, {p : [1.0]})
+        self.assertTrue( np.allclose(D.derivatives, finiteDifferences(ct, [p], [0.5], values={q : 0.7})) )
+        self.assertRaises(RuntimeError, functor, ct, {})
+
+    def test_nonlinear(self):
+        '''The derivatives of non-linear amounts are computed with Sympy, and cached'''
+        q = numeric_argument.Variable('q')
+        E = numeric_argument.Expression
+        steps = [ MotionStep(MotionStep.Kind.Rotation, motions.Axis.Z, E(q, q.symbol**2)),
+                  MotionStep(MotionStep.Kind.Translation, motions.Axis.X, E(q, q.symbol**3 / 2)) ]
+        ct = toCoordinateTransform( motions.PoseSpec(pose=pBA, motion=MotionSequence(steps)) )
+        D = ctrepr.hCoordinatesDual(ct, {q : 0.7})
+        self.assertTrue( np.allclose(D.derivatives, finiteDifferences(ct, [q], [0.7])) )
+        info = dual._derivative.cache_info()
+        self.assertIsNotNone( info.maxsize )
+        self.assertGreaterEqual( info.currsize, 2 )
+
+    def test_cache(self):
+        '''The memoization of the functor does not interfere with the extra arguments'''
+        variables = randomVariables(1)
+        ct = randomTransform(variables)
+        functor = ctrepr.HCoordinatesDual(cache=ctrepr.MatrixReprCache())
+        D1 = functor(ct, {variables[0] : 0.1})
+        D2 = functor(ct, {variables[0] : 0.2})
+        self.assertEqual( len(functor.cache), 0 )
+        self.assertTrue( np.allclose(D1.value, ctrepr.hCoordinatesNumeric.batch_matrix_repr(ct, {variables[0] : 0.1})[0]) )
+        self.assertTrue( np.allclose(D2.value, ctrepr.hCoordinatesNumeric.batch_matrix_repr(ct, {variables[0] : 0.2})[0]) )
+
+
+if __name__ == '__main__':
+    unittest.main()
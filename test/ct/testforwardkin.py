@@ -0,0 +1,85 @@
+'''
+Tests of the numeric forward kinematics, `kgprim.ct.forwardkin`.
+'''
+
+import os, random, unittest
+import numpy as np
+
+import motiondsl.motiondsl as motiondsl
+from kgprim.core import Frame
+import kgprim.motions as motions
+from kgprim.ct.frommotions import toCoordinateTransform
+from kgprim.ct.forwardkin import ForwardKinematics
+import kgprim.ct.repr.mxrepr as ctrepr
+
+sampleModelFile = os.path.join(os.path.dirname(__file__), '..', '..', 'sample', 'motiondsl', 'model.motdsl')
+
+def samplePoses():
+    return motiondsl.toPosesSpecification( motiondsl.dsl.modelFromFile(sampleModelFile) )
+
+
+class ForwardKinematicsTests(unittest.TestCase):
+    def setUp(self):
+        self.poses = samplePoses()
+        self.inspector = motions.ConnectedFramesInspector(self.poses)
+
+    def setParameters(self, fk):
+        values = { p : random.uniform(-1, 1) for p in fk.parameters }
+        fk.setParametersValue(values)
+        return values
+
+    def expected(self, fk, frame, values):
+        poseSpec = self.inspector.getPoseSpec(targetFrame=frame, referenceFrame=fk.root)
+        return ctrepr.hCoordinatesNumeric.batch_matrix_repr(toCoordinateTransform(poseSpec), values)
+
+    def test_order(self):
+        fk = ForwardKinematics(self.poses, Frame('fD'))
+        self.assertEqual( set(fk.frames), set(self.inspector.graph.nodes) )
+        self.assertEqual( fk.parents[0], -1 )
+        for i, parent in enumerate(fk.parents[1:], start=1) :
+            self.assertLess( parent, i )
+        self.assertEqual( [v.name for v in fk.variables], ['q0', 'q1'] )
+
+    def test_single(self):
+        for root in [Frame('fA'), Frame('fE')] :
+            fk = ForwardKinematics(self.poses, root)
+            values = self.setParameters(fk)
+            qs = np.random.uniform(-3, 3, len(fk.variables))
+            poses = fk.compute(qs)
+            values.update( { v : qs[i] for i, v in enumerate(fk.variables) } )
+            for frame in fk.frames :
+                self.assertEqual( poses[frame].shape, (4,4) )
+                self.assertTrue( np.allclose(poses[frame], self.expected(fk, frame, values)[0]) )
+            self.assertTrue( np.allclose(poses[root], np.identity(4)) )
+
+    def test_batch(self):
+        fk = ForwardKinematics(self.poses, Frame('fA'))
+        params = self.setParameters(fk)
+        count = 7
+        qs = np.random.uniform(-3, 3, (count, len(fk.variables)))
+        poses = fk.compute(qs)
+        values = { v : qs[:, i] for i, v in enumerate(fk.variables) }
+        self.assertEqual( [p.shape for p in fk.compute(values).values()], [(count,4,4)] * len(fk.frames) )
+        values.update(params)
+        for frame in fk.frames :
+            self.assertEqual( poses[frame].shape, (count,4,4) )
+            self.assertTrue( np.allclose(poses[frame], self.expected(fk, frame, values)) )
+
+    def test_parameters(self):
+        fk = ForwardKinematics(self.poses, Frame('fA'))
+        param = { p.name : p for p in fk.parameters }
+        self.assertRaises(RuntimeError, fk.compute, [0.5, -0.1]) # my_rot has no default
+        fk.setParametersValue( { param['my_rot'] : 0.3 } )
+        qs = [0.5, -0.1]
+        poses = fk.compute(qs)
+        values = dict(zip(fk.variables, qs))
+        values.update( { param['my_rot'] : 0.3, param['my_tr'] : 0.1 } ) # my_tr defaults to 0.1
+        for frame in fk.frames :
+            self.assertTrue( np.allclose(poses[frame], self.expected(fk, frame, values)[0]) )
+
+        self.assertRaises(ValueError, fk.compute, [0.5])
+        self.assertRaises(RuntimeError, ForwardKinematics, self.poses, Frame('unknown'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+'''
+Tests of the analytic derivatives of transforms, `kgprim.ct.jacobian`.
+'''
+
+import unittest
+import numpy as np
+
+import kgprim.values as numeric_argument
+import kgprim.motions as motions
+from kgprim.motions import MotionSequence, MotionStep
+from kgprim.ct.frommotions import toCoordinateTransform
+from kgprim.ct.jacobian import TransformDerivatives
+import kgprim.ct.repr.mxrepr as ctrepr
+from test.ct.common import randomTransform, randomVariables, finiteDifferences, pBA
+
+MR = ctrepr.MatrixRepresentation
+
+
+class DerivativesTests(unittest.TestCase):
+
+    def test_derivatives(self):
+        for reprKind in MR :
+            variables = randomVariables()
+            ct = randomTransform(variables)
+            d = TransformDerivatives(ct, reprKind)
+            q = np.random.uniform(-2, 2, len(d.variables))
+            mx, dmx = d.evaluate(q)
+            values = dict(zip(d.variables, q))
+            self.assertTrue( np.allclose(mx, ctrepr.numeric[reprKind].batch_matrix_repr(ct, values)[0]) )
+            self.assertEqual( dmx.shape, (len(d.variables),) + mx.shape )
+            self.assertTrue( np.allclose(dmx, finiteDifferences(ct, d.variables, q, reprKind), atol=1e-6) )
+
+    def test_batch(self):
+        variables = randomVariables()
+        ct = randomTransform(variables, 8)
+        d = TransformDerivatives(ct)
+        qs = np.random.uniform(-2, 2, (5, len(d.variables)))
+        mx, dmx = d.evaluate(qs)
+        J = d.geometricJacobian(qs)
+        self.assertEqual( mx.shape, (5, 4, 4) )
+        self.assertEqual( dmx.shape, (5, len(d.variables), 4, 4) )
+        self.assertEqual( J.shape, (5, 6, len(d.variables)) )
+        for i in range(5) :
+            single = d.evaluate(qs[i])
+            self.assertTrue( np.allclose(mx[i], single[0]) )
+            self.assertTrue( np.allclose(dmx[i], single[1]) )
+            self.assertTrue( np.allclose(J[i], d.geometricJacobian(qs[i])) )
+        self.assertRaises(ValueError, d.evaluate, qs[:, :-1])
+
+    def test_geometric_jacobian(self):
+        '''Twist of a rotation about Z followed by a translation along X'''
+        q = numeric_argument.Variable('q')
+        r = numeric_argument.Variable('r')
+        steps = [ MotionStep(MotionStep.Kind.Rotation, motions.Axis.Z, numeric_argument.Expression(q)),
+                  MotionStep(MotionStep.Kind.Translation, motions.Axis.X, numeric_argument.Expression(r)) ]
+        ct = toCoordinateTransform( motions.PoseSpec(pose=pBA, motion=MotionSequence(steps)) )
+        d = TransformDerivatives(ct)
+        qv, rv = 0.3, 2.0
+        J = d.geometricJacobian([qv, rv])
+        expected = np.array([
+            [0, 0], [0, 0], [1, 0],
+            [-rv*np.sin(qv), np.cos(qv)], [rv*np.cos(qv), np.sin(qv)], [0, 0] ])
+        self.assertTrue( np.allclose(J, expected) )
+        self.assertRaises(RuntimeError, TransformDerivatives(ct, MR.spatial_motion).geometricJacobian, [qv, rv])
+
+    def test_parameters(self):
+        q = numeric_argument.Variable('q')
+        p = numeric_argument.Parameter('p', defValue=0.5)
+        c = numeric_argument.Constant('c', 0.25)
+        E = numeric_argument.Expression
+        steps = [ MotionStep(MotionStep.Kind.Rotation, motions.Axis.Y, E(p)),
+                  MotionStep(MotionStep.Kind.Rotation, motions.Axis.X, 2*E(q)),
+                  MotionStep(MotionStep.Kind.Translation, motions.Axis.Z, E(c)),
+                  MotionStep(MotionStep.Kind.Translation, motions.Axis.Y, E(p)) ]
+        ct = toCoordinateTransform( motions.PoseSpec(pose=pBA, motion=MotionSequence(steps)) )
+        d = TransformDerivatives(ct)
+        self.assertEqual( d.parameters, [p] )
+        for pv in [0.5, -1.2] :
+            if pv != 0.5 :
+                d.setParametersValue({p : pv})
+            _, dmx = d.evaluate([0.7])
+            self.assertTrue( np.allclose(dmx, finiteDifferences(ct, [q], [0.7], values={p : pv}), atol=1e-6) )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+'''
+Tests specific to the numeric backend, `kgprim.ct.backend.numeric`.
+'''
+
+import random, unittest
+import numpy as np
+
+import kgprim.motions as motions
+import kgprim.values  as numeric_argument
+from kgprim.motions import MotionSequence, MotionStep
+from kgprim.ct.frommotions import toCoordinateTransform
+import kgprim.ct.models as ctmodels
+import kgprim.ct.repr.mxrepr as ctrepr
+import kgprim.ct.repr.spatial as reprSpatial
+from test.ct.common import randomTransform, randomVariables, pBA
+
+numericFunctors = [
+    ctrepr.rotationMatrixNumeric,
+    ctrepr.hCoordinatesNumeric,
+    ctrepr.spatialMotionNumeric,
+    ctrepr.spatialForceNumeric,
+    ctrepr.SpatialMotionNumeric(spatialCoordinatesConvention=reprSpatial.CoordinatesConvention.translationOnTop)
+]
+
+
+class BatchTests(unittest.TestCase):
+    def _check_against_symbolic(self, functor, ct, values, count):
+        batch = functor.batch_matrix_repr(ct, values)
+        self.assertEqual(batch.shape, (count, functor.matrixSize, functor.matrixSize))
+
+        symbolic = {
+            ctrepr.RotationMatrixNumeric : ctrepr.RotationMatrixSymbolic,
+            ctrepr.HCoordinatesNumeric   : ctrepr.HCoordinatesSymbolic,
+            ctrepr.SpatialMotionNumeric  : ctrepr.SpatialMotionSymbolic,
+            ctrepr.SpatialForceNumeric   : ctrepr.SpatialForceSymbolic
+        }[functor.__class__]
+        kwds = {}
+        if hasattr(functor, 'coordinatesConvention') :
+            kwds['spatialCoordinatesConvention'] = functor.coordinatesConvention
+        mx = symbolic(**kwds)(ct)
+        for i in range(count) :
+            sample = { v : np.broadcast_to(values[v], (count,))[i] for v in mx.variables }
+            expected = mx.setVariablesValue(valuesdict=sample) if len(sample)>0 else mx.setVariablesValue(valueslist=[])
+            self.assertTrue( np.allclose(batch[i], expected) )
+
+    def test_batch_matches_symbolic(self):
+        count = 7
+        variables = randomVariables()
+        for functor in numericFunctors :
+            ct = randomTransform(variables)
+            values = { v : np.random.uniform(-3, 3, count) for v in variables }
+            self._check_against_symbolic(functor, ct, values, count)
+
+    def test_batch_scalar_broadcast(self):
+        count = 4
+        variables = randomVariables(2)
+        ct = randomTransform(variables)
+        values = { variables[0] : np.random.uniform(-3, 3, count), variables[1] : 0.3 }
+        self._check_against_symbolic(ctrepr.hCoordinatesNumeric, ct, values, count)
+
+    def test_batch_constant_transform(self):
+        '''A constant transform gives the same matrix for all the samples'''
+        ct = randomTransform([numeric_argument.Constant(name="c", value=0.7)])
+        batch = ctrepr.hCoordinatesNumeric.batch_matrix_repr(ct, {numeric_argument.Variable('unused') : np.zeros(3)})
+        for mx in batch :
+            self.assertTrue( np.allclose(mx, ctrepr.hCoordinatesNumeric(ct)) )
+
+    def test_batch_parameter_default(self):
+        p = numeric_argument.Parameter(name="p", defValue=0.25)
+        v = numeric_argument.Variable(name="v")
+        steps = [
+            MotionStep(MotionStep.Kind.Rotation,    motions.Axis.Z, numeric_argument.Expression(v)),
+            MotionStep(MotionStep.Kind.Translation, motions.Axis.X, numeric_argument.Expression(p)),
+        ]
+        ct = toCoordinateTransform( motions.PoseSpec(pose=pBA, motion=MotionSequence(steps)) )
+        qs = np.array([0.0, 0.5])
+        batch = ctrepr.hCoordinatesNumeric.batch_matrix_repr(ct, {v : qs})
+        for i, q in enumerate(qs) :
+            self.assertTrue( np.allclose(batch[i][0:2,3], [0.25*np.cos(q), 0.25*np.sin(q)]) )
+
+        missing = numeric_argument.Parameter(name="p2")
+        steps[1] = MotionStep(MotionStep.Kind.Translation, motions.Axis.X, numeric_argument.Expression(missing))
+        ct = toCoordinateTransform( motions.PoseSpec(pose=pBA, motion=MotionSequence(steps)) )
+        self.assertRaises(RuntimeError, ctrepr.hCoordinatesNumeric.batch_matrix_repr, ct, {v : qs})
+
+
+class ClosedFormTests(unittest.TestCase):
+    conventions = list(reprSpatial.CoordinatesConvention)
+    pairs = [
+        (ctrepr.RotationMatrixNumeric, ctrepr.RotationMatrixClosedForm, {}),
+        (ctrepr.HCoordinatesNumeric  , ctrepr.HCoordinatesClosedForm  , {}),
+    ] + [
+        (ctrepr.SpatialMotionNumeric, ctrepr.SpatialMotionClosedForm, {'spatialCoordinatesConvention':c}) for c in conventions
+    ] + [
+        (ctrepr.SpatialForceNumeric , ctrepr.SpatialForceClosedForm , {'spatialCoordinatesConvention':c}) for c in conventions
+    ]
+
+    def test_same_as_numeric(self):
+        for numeric, closedForm, kwds in self.pairs :
+            for polarity in list(ctmodels.TransformPolarity) :
+                ct = randomTransform([numeric_argument.Constant(name="c", value=random.random())], stepsCount=10)
+                ct = toCoordinateTransform( motions.PoseSpec(pose=pBA, motion=MotionSequence([p.motion for p in ct.primitives])),
+                        primitives_polarity=polarity )
+                self.assertTrue( np.allclose(numeric(**kwds)(ct), closedForm(**kwds)(ct), rtol=0, atol=1e-12) )
+
+    def test_batch_same_as_numeric(self):
+        count = 5
+        variables = randomVariables()
+        for numeric, closedForm, kwds in self.pairs :
+            ct = randomTransform(variables, stepsCount=10)
+            values = { v : np.random.uniform(-3, 3, count) for v in variables }
+            M1 = numeric(**kwds).batch_matrix_repr(ct, values)
+            M2 = closedForm(**kwds).batch_matrix_repr(ct, values)
+            self.assertTrue( np.allclose(M1, M2, rtol=0, atol=1e-12) )
+
+
+if __name__ == '__main__':
+    unittest.main()
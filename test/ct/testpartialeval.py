@@ -0,0 +1,110 @@
+'''
+Tests of the partial evaluation of coordinate transforms,
+`kgprim.ct.partialeval`.
+'''
+
+import math, random, unittest
+import numpy as np
+import sympy as sym
+
+import kgprim.motions as motions
+import kgprim.values  as numeric_argument
+from kgprim.motions import MotionSequence, MotionStep
+from kgprim.ct.frommotions import toCoordinateTransform, ctOnLeft
+from kgprim.ct.metadata import symbolicArgumentsOf
+import kgprim.ct.models as ctmodels
+import kgprim.ct.partialeval as partialeval
+import kgprim.ct.repr.mxrepr as ctrepr
+import kgprim.ct.repr.spatial as reprSpatial
+from test.ct.common import randomTransform, pBA
+
+q  = numeric_argument.Variable(name="q")
+c1 = numeric_argument.Constant(name="c1", value=0.7)
+pi = numeric_argument.MyPI.instance()
+
+def foldableAmount(arguments):
+    '''Mostly constant amounts, including named constants and pi'''
+    E = numeric_argument.Expression
+    if random.random() < 0.8 :
+        return random.choice([ random.uniform(-1,1), E(c1), E(pi, pi.symbol/2), -E(c1) ])
+    return random.choice([1, -2]) * E(random.choice(arguments))
+
+# at least one step depends on q
+rotationQ = MotionStep(MotionStep.Kind.Rotation, motions.Axis.Z, numeric_argument.Expression(q))
+
+
+functors = [
+    (ctrepr.rotationMatrixNumeric, ctrepr.rotationMatrixClosedForm, ctrepr.rotationMatrixSymbolic),
+    (ctrepr.hCoordinatesNumeric,   ctrepr.hCoordinatesClosedForm,   ctrepr.hCoordinatesSymbolic),
+    (ctrepr.spatialMotionNumeric,  ctrepr.spatialMotionClosedForm,  ctrepr.spatialMotionSymbolic),
+    (ctrepr.SpatialForceNumeric(spatialCoordinatesConvention=reprSpatial.CoordinatesConvention.translationOnTop),
+     ctrepr.SpatialForceClosedForm(spatialCoordinatesConvention=reprSpatial.CoordinatesConvention.translationOnTop),
+     ctrepr.SpatialForceSymbolic(spatialCoordinatesConvention=reprSpatial.CoordinatesConvention.translationOnTop))
+]
+
+
+class FoldingTests(unittest.TestCase):
+
+    def test_structure(self):
+        ct = randomTransform([q], 12, foldableAmount, [rotationQ], random.choice(list(MotionSequence.Mode)))
+        folded = partialeval.foldConstants(ct)
+        self.assertEqual( (folded.leftFrame, folded.rightFrame), (ct.leftFrame, ct.rightFrame) )
+        self.assertLessEqual( len(folded.primitives), len(ct.primitives) )
+        unfolded = []
+        for p in folded.primitives :
+            unfolded.extend( p.folded if isinstance(p, ctmodels.ConstantCTransform) else [p] )
+        self.assertEqual( tuple(unfolded), ct.primitives )
+        # no two adjacent constant elements
+        for p1, p2 in zip(folded.primitives, folded.primitives[1:]) :
+            self.assertFalse( partialeval.isConstant(p1) and partialeval.isConstant(p2) )
+
+    def test_backends(self):
+        '''All the backends give the same results with and without folding'''
+        values = np.random.uniform(-math.pi, math.pi, 5)
+        for polarity in [None, ctOnLeft] :
+            ct = randomTransform([q], 12, foldableAmount, [rotationQ], random.choice(list(MotionSequence.Mode)), polarity)
+            folded = partialeval.foldConstants(ct)
+            for numeric, closedForm, symbolic in functors :
+                expected = numeric.batch_matrix_repr(ct, {q : values})
+                for functor in [numeric, closedForm] :
+                    self.assertTrue( np.allclose(functor.batch_matrix_repr(folded, {q : values}), expected) )
+                mx = symbolic(folded).mx
+                for value, exp in zip(values[:2], expected) :
+                    actual = np.array( mx.subs(q.symbol, value).evalf(), dtype=np.float64 )
+                    self.assertTrue( np.allclose(actual, exp) )
+
+    def test_constant_transform(self):
+        '''A constant transform becomes a single element'''
+        E = numeric_argument.Expression
+        steps = [ MotionStep(MotionStep.Kind.Rotation, motions.Axis.X, E(pi, pi.symbol/2)),
+                  MotionStep(MotionStep.Kind.Translation, motions.Axis.Y, E(c1)),
+                  MotionStep(MotionStep.Kind.Rotation, motions.Axis.Z, -E(pi, pi.symbol/2)),
+                  MotionStep(MotionStep.Kind.Translation, motions.Axis.X, 0.5) ]
+        ct = toCoordinateTransform( motions.PoseSpec(pose=pBA, motion=MotionSequence(steps)) )
+        folded = partialeval.foldConstants(ct)
+        self.assertEqual( len(folded.primitives), 1 )
+        for numeric, closedForm, symbolic in functors :
+            expected = numeric(ct)
+            self.assertTrue( np.allclose(numeric(folded), expected) )
+            self.assertTrue( np.allclose(closedForm(folded), expected) )
+        # rotations of pi/2 give exact coefficients
+        mx = ctrepr.rotationMatrixSymbolic(folded).mx
+        self.assertTrue( all(isinstance(x, sym.Integer) for x in mx) )
+        self.assertEqual( symbolicArgumentsOf(folded), ({}, {}, {}) )
+
+    def test_min_length(self):
+        E = numeric_argument.Expression
+        steps = [ MotionStep(MotionStep.Kind.Rotation, motions.Axis.X, 0.3),
+                  MotionStep(MotionStep.Kind.Rotation, motions.Axis.Y, E(q)),
+                  MotionStep(MotionStep.Kind.Rotation, motions.Axis.Z, 0.3),
+                  MotionStep(MotionStep.Kind.Translation, motions.Axis.Z, 0.3) ]
+        ct = toCoordinateTransform( motions.PoseSpec(pose=pBA, motion=MotionSequence(steps)) )
+        folded = partialeval.foldConstants(ct)
+        self.assertEqual( folded.primitives[:2], ct.primitives[:2] )
+        self.assertEqual( len(folded.primitives), 3 )
+        self.assertEqual( partialeval.foldConstants(ct, minLength=1).primitives[1], ct.primitives[1] )
+        self.assertIsInstance( partialeval.foldConstants(ct, minLength=1).primitives[0], ctmodels.ConstantCTransform )
+
+
+if __name__ == '__main__':
+    unittest.main()
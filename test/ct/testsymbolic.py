@@ -0,0 +1,163 @@
+'''
+Tests specific to the symbolic backend, `kgprim.ct.backend.symbolic`.
+'''
+
+import random, unittest
+import numpy as np
+
+import kgprim.core    as primitives
+import kgprim.motions as motions
+import kgprim.values  as numeric_argument
+from kgprim.motions import MotionSequence, MotionStep
+from kgprim.ct.frommotions import toCoordinateTransform
+import kgprim.ct.repr.mxrepr as ctrepr
+import kgprim.ct.repr.spatial as reprSpatial
+
+pBA = primitives.Pose(reference=primitives.Frame("A"), target=primitives.Frame("B"))
+
+v1 = numeric_argument.Variable(name="v1")
+v2 = numeric_argument.Variable(name="v2")
+p1 = numeric_argument.Parameter(name="p1", defValue=0.2)
+p2 = numeric_argument.Parameter(name="p2")
+c1 = numeric_argument.Constant(name="c1", value=1.3)
+
+def sampleTransform():
+    E = numeric_argument.Expression
+    steps = [
+        MotionStep(MotionStep.Kind.Rotation,    motions.Axis.X, E(v1)),
+        MotionStep(MotionStep.Kind.Translation, motions.Axis.Y, E(p1)),
+        MotionStep(MotionStep.Kind.Rotation,    motions.Axis.Z, 2*E(v2)),
+        MotionStep(MotionStep.Kind.Translation, motions.Axis.Z, E(c1)/2),
+        MotionStep(MotionStep.Kind.Rotation,    motions.Axis.Y, -E(p2)),
+        MotionStep(MotionStep.Kind.Translation, motions.Axis.X, 0.4),
+    ]
+    return toCoordinateTransform( motions.PoseSpec(pose=pBA, motion=MotionSequence(steps)) )
+
+
+class MyMxTests(unittest.TestCase):
+    def setUp(self):
+        self.ct = sampleTransform()
+        self.mx = ctrepr.hCoordinatesSymbolic(self.ct)
+
+    def _expected(self, q1, q2, parameters):
+        values = {v1 : q1, v2 : q2}
+        values.update(parameters)
+        return ctrepr.hCoordinatesNumeric.batch_matrix_repr(self.ct, values)[0]
+
+    def test_default_parameters(self):
+        '''Parameters without default value are set to zero'''
+        q1, q2 = random.random(), random.random()
+        actual = self.mx.setVariablesValue(valueslist=[q1, q2])
+        self.assertTrue( np.allclose(actual, self._expected(q1, q2, {p2 : 0.0})) )
+
+    def test_parameters_update(self):
+        q1, q2 = random.random(), random.random()
+        for i in range(3) :
+            pvalues = {p1 : random.random(), p2 : random.random()}
+            self.mx.setParametersValue(pvalues)
+            expected = self._expected(q1, q2, pvalues)
+            self.assertTrue( np.allclose(self.mx.setVariablesValue(valueslist=[q1, q2]), expected) )
+            self.assertTrue( np.allclose(self.mx.setVariablesValue(valuesdict={v1:q1, v2:q2}), expected) )
+
+    def test_partial_parameters_update(self):
+        '''Parameters not given to setParametersValue() keep their value'''
+        self.mx.setParametersValue({p1 : 0.7, p2 : 0.1})
+        self.mx.setParametersValue({p2 : 0.3})
+        self.assertEqual( self.mx.parametersValue, {p1 : 0.7, p2 : 0.3} )
+
+    def test_vectorized_evaluation(self):
+        count = 6
+        qs = np.random.uniform(-3, 3, (count, 2))
+        self.mx.setParametersValue({p1 : 0.3, p2 : -0.5})
+        fromList = self.mx.setVariablesValue(valueslist=qs)
+        fromDict = self.mx.setVariablesValue(valuesdict={v1 : qs[:,0], v2 : qs[:,1]})
+        self.assertEqual(fromList.shape, (count,4,4))
+        self.assertEqual(fromDict.shape, (count,4,4))
+        for i in range(count) :
+            single = self.mx.setVariablesValue(valueslist=qs[i])
+            self.assertEqual(single.shape, (4,4))
+            self.assertTrue( np.allclose(fromList[i], single) )
+            self.assertTrue( np.allclose(fromDict[i], single) )
+
+    def test_vectorized_scalar_broadcast(self):
+        qs = np.random.uniform(-3, 3, 5)
+        batch = self.mx.setVariablesValue(valuesdict={v1 : qs, v2 : 0.1})
+        for i, q in enumerate(qs) :
+            self.assertTrue( np.allclose(batch[i], self.mx.setVariablesValue(valueslist=[q, 0.1])) )
+
+    def test_symbolic_constant_entries(self):
+        '''Entries like sin(q)**2 + cos(q)**2, constant but with free symbols'''
+        E = numeric_argument.Expression
+        steps = [ MotionStep(MotionStep.Kind.Rotation, motions.Axis.Z, E(v1)),
+                  MotionStep(MotionStep.Kind.Rotation, motions.Axis.Z, -E(v1)) ]
+        mx = ctrepr.hCoordinatesSymbolic( toCoordinateTransform(motions.PoseSpec(pose=pBA, motion=MotionSequence(steps))) )
+        self.assertTrue( np.allclose(mx.setVariablesValue(valueslist=[0.3]), np.identity(4)) )
+        batch = mx.setVariablesValue(valueslist=np.array([[0.3], [-1.2]]))
+        self.assertTrue( np.allclose(batch, np.identity(4)) )
+
+
+class CacheTests(unittest.TestCase):
+    def test_hits_and_misses(self):
+        cache = ctrepr.MatrixReprCache(maxsize=4)
+        functor = ctrepr.HCoordinatesSymbolic(cache=cache)
+        ct = sampleTransform()
+        mx1 = functor(ct)
+        mx2 = functor(sampleTransform()) # equal, not the same instance
+        self.assertIs(mx1, mx2)
+        self.assertEqual(cache.info(), {'hits':1, 'misses':1, 'size':1, 'maxsize':4})
+
+    def test_key(self):
+        '''Different representations and conventions are cached separately'''
+        cache = ctrepr.MatrixReprCache()
+        ct = sampleTransform()
+        conventions = list(reprSpatial.CoordinatesConvention)
+        functors = [ctrepr.HCoordinatesSymbolic(cache=cache), ctrepr.SpatialMotionSymbolic(cache=cache)]
+        functors+= [ctrepr.SpatialForceSymbolic(cache=cache, spatialCoordinatesConvention=c) for c in conventions]
+        matrices = [f(ct) for f in functors]
+        self.assertEqual(cache.misses, len(functors))
+        self.assertEqual(len(set(id(m) for m in matrices)), len(functors))
+        self.assertIs( functors[-1](ct), matrices[-1] )
+
+    def test_parameter_defaults(self):
+        '''Transforms that differ only in the default value of the parameters are cached separately'''
+        functor = ctrepr.HCoordinatesSymbolic(cache=ctrepr.MatrixReprCache())
+        transforms = [ toCoordinateTransform( motions.PoseSpec(pose=pBA, motion=MotionSequence(
+                           [MotionStep(MotionStep.Kind.Translation, motions.Axis.X, numeric_argument.Expression(
+                               numeric_argument.Parameter(name='p', defValue=d)))] )) )
+                       for d in [0.1, 0.2, 0.2] ]
+        self.assertEqual( transforms[0], transforms[1] )
+        mxs = [ functor(ct) for ct in transforms ]
+        self.assertIsNot( mxs[0], mxs[1] )
+        self.assertIs( mxs[1], mxs[2] )
+        self.assertEqual( [mx.setVariablesValue(valueslist=[])[0, 3] for mx in mxs[:2]], [0.1, 0.2] )
+
+    def test_lru_eviction(self):
+        cache = ctrepr.MatrixReprCache(maxsize=2)
+        functor = ctrepr.RotationMatrixSymbolic(cache=cache)
+        transforms = [toCoordinateTransform( motions.PoseSpec(pose=pBA,
+                        motion=MotionSequence([MotionStep(MotionStep.Kind.Rotation, axis, numeric_argument.Expression(v1))]) ))
+                      for axis in motions.Axis]
+        functor(transforms[0])
+        functor(transforms[1])
+        functor(transforms[0])  # now transforms[1] is the least recently used
+        functor(transforms[2])
+        self.assertEqual(len(cache), 2)
+        hits = cache.hits
+        functor(transforms[0])
+        self.assertEqual(cache.hits, hits+1)
+        functor(transforms[1])
+        self.assertEqual(cache.hits, hits+1)
+
+    def test_module_functors(self):
+        cache = ctrepr.enableSymbolicCache(8)
+        try:
+            ct = sampleTransform()
+            self.assertIs( ctrepr.hCoordinatesSymbolic(ct), ctrepr.hCoordinatesSymbolic(ct) )
+            self.assertEqual(cache.hits, 1)
+        finally:
+            ctrepr.disableSymbolicCache()
+        self.assertIsNot( ctrepr.hCoordinatesSymbolic(ct), ctrepr.hCoordinatesSymbolic(ct) )
+
+
+if __name__ == '__main__':
+    unittest.main()
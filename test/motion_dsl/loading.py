@@ -0,0 +1,214 @@
+import unittest
+import io, os, re, sys, pickle, subprocess, tempfile
+
+import kgprim.values as numeric_argument
+import motiondsl.motiondsl as motiondsl
+from motiondsl import fastparser
+from kgprim.motions import PosesSpec
+
+sampleModelFile = os.path.join(os.path.dirname(__file__), '..', '..', 'sample', 'motiondsl', 'model.motdsl')
+
+constructs = """// leading comment
+Model constructs
+Params lengths { a b, c }
+Params empty { }
+Convention = fixedFrame // trailing comment
+fA -> fB : rotx(0.2) try(-3) trz( - 1e-1 ) roty(2 * q0) rotz(-2.5*q1) trx(q0/2) try(-q1 / 4.)
+fB->fC:rotz( c:rz : -0.6 ) roty( pi /2 ) rotx(-PI) trx(2*Pi) [named]
+fC -> fD : trz(p:tr/2) trx(p:tr[0.5]) roty( p:rot ) rotx(3 * c:rz) rotz(-c:rz/3)
+fD -> fE
+  : trx(p:rot[2])
+    try(0.5 * p:tr[1.5]) // a different default value, ignored
+fE -> fF : [empty]
+"""
+
+def _amount(amount):
+    if not isinstance(amount, numeric_argument.Expression) :
+        return (repr(amount), type(amount))
+    arg = amount.arg
+    return (repr(amount.coefficient), type(amount.coefficient), str(amount),
+            type(arg), arg.name, getattr(arg, 'defaultValue', None), getattr(arg, 'value', None))
+
+def _signature(posesSpec):
+    # a summary of the given PosesSpec, with all the information which must
+    # be the same regardless of the parser, including the types of the values
+    return [ (p.name, p.pose.reference.name, p.pose.target.name,
+              [ (seq.mode, [(s.kind, s.axis, _amount(s.amount)) for s in seq.steps])
+                for seq in p.motion.sequences ])
+             for p in posesSpec.poses ]
+
+
+class LoadingTests(unittest.TestCase):
+    def test_lazy_metamodel(self):
+        '''Importing the module does not load textX nor build the metamodel'''
+        script = '''
+import sys
+import motiondsl.motiondsl as motiondsl
+print('textx' in sys.modules, motiondsl._dsl is None)
+'''
+        out = subprocess.run([sys.executable, '-c', script], check=True,
+                             capture_output=True, text=True).stdout.split()
+        self.assertEqual(out, ['False', 'True'])
+
+    def test_default_instance(self):
+        self.assertIs(motiondsl.dsl, motiondsl.dsl)
+        mm = motiondsl.dsl.mm
+        self.assertIs(motiondsl.dsl.mm, mm)
+        model = motiondsl.dsl.modelFromText("Model m\nConvention = currentFrame\n\nfA -> fB : rotx(q)\n")
+        self.assertEqual(model.name, 'm')
+        self.assertRaises(AttributeError, getattr, motiondsl, 'nosuchmember')
+
+
+class FastParserTests(unittest.TestCase):
+    def setUp(self):
+        self.textx = motiondsl.MotionDSL()
+        self.fast  = motiondsl.MotionDSL(parser=motiondsl.Parser.fast)
+
+    def _compare(self, textModel, fastModel):
+        self.assertIsInstance(fastModel, fastparser._Node)
+        self.assertEqual(fastModel.name, textModel.name)
+        self.assertEqual([(g.name, [p.name for p in g.params]) for g in fastModel.paramGroups],
+                         [(g.name, [p.name for p in g.params]) for g in textModel.paramGroups])
+        self.assertEqual(_signature(motiondsl.toPosesSpecification(fastModel)),
+                         _signature(motiondsl.toPosesSpecification(textModel)))
+
+    def test_sample(self):
+        self._compare(self.textx.modelFromFile(sampleModelFile), self.fast.modelFromFile(sampleModelFile))
+
+    def test_constructs(self):
+        self._compare(self.textx.modelFromText(constructs), self.fast.modelFromText(constructs))
+        poses = motiondsl.toPosesSpecification( self.fast.modelFromText(constructs) )
+        tr = poses.poses[2].motion.sequences[0].steps[0].amount.arg
+        self.assertEqual(tr.defaultValue, 0.5)
+
+    def test_fallback(self):
+        # a reference to a constant defined later is left to textX
+        text = "Model m Convention = currentFrame a -> b : rotx(c:r) b -> c : roty(c:r:0.1)"
+        model = self.fast.modelFromText(text)
+        self.assertNotIsInstance(model, fastparser._Node)
+        self.assertEqual(_signature(motiondsl.toPosesSpecification(model)),
+                         _signature(motiondsl.toPosesSpecification(self.textx.modelFromText(text))))
+        # errors are reported by textX
+        for text in [ "Model m Convention = currentFrame a -> b : rotx(pitch)",
+                      "Model m Convention = currentFrame a -> b : rotx(c:r:1) roty(c:r:2) rotz(c:r)",
+                      "Model m Convention = currentFrame a -> b : rotx(q/0) roty(" ] :
+            with self.assertRaises(Exception) as expected :
+                self.textx.modelFromText(text)
+            self.assertRaises(type(expected.exception), self.fast.modelFromText, text)
+
+
+class TrickleStream(io.StringIO):
+    '''A text stream which returns at most `size` characters at a time'''
+    def __init__(self, text, size=7):
+        super().__init__(text)
+        self.size = size
+    def read(self, size=-1):
+        return super().read(self.size)
+
+
+class StreamingTests(unittest.TestCase):
+    def setUp(self):
+        self.dsl = motiondsl.MotionDSL(parser=motiondsl.Parser.fast)
+
+    def _batch(self, text):
+        return _signature( motiondsl.toPosesSpecification(self.dsl.modelFromText(text)) )
+
+    def _streamed(self, poseSpecs):
+        return _signature( PosesSpec('streamed', list(poseSpecs)) )
+
+    def test_same_poses(self):
+        expected = self._batch(constructs)
+        self.assertEqual(self._streamed(self.dsl.poseSpecsFromStream(io.StringIO(constructs))), expected)
+        for size in [1, 5, 13] :
+            self.assertEqual(self._streamed(self.dsl.poseSpecsFromStream(TrickleStream(constructs, size))), expected)
+        with open(sampleModelFile) as f :
+            expected = self._batch(f.read())
+        self.assertEqual(self._streamed(self.dsl.poseSpecsFromFile(sampleModelFile)), expected)
+
+    def test_incremental(self):
+        text = "Model m Convention = currentFrame\n" + "".join(
+            "f{0} -> f{1} : rotx(q{0}) trz(p:p[0.1])\n".format(i, i+1) for i in range(100))
+        stream = TrickleStream(text)
+        poseSpecs = self.dsl.poseSpecsFromStream(stream)
+        first = next(poseSpecs)
+        self.assertEqual(first.pose.target.name, 'f1')
+        self.assertLess(stream.tell(), len(text) / 10)
+        self.assertEqual(len(list(poseSpecs)), 99)
+
+    def test_parameter_default_value(self):
+        text = """Model m Convention = currentFrame
+        a -> b : rotx(p:r)
+        b -> c : roty(p:r[0.3]) rotz(p:s)
+        c -> d : rotz(2 * p:r[0.7])"""
+        poseSpecs = list(self.dsl.poseSpecsFromStream(TrickleStream(text)))
+        for ps in poseSpecs :
+            self.assertEqual(ps.motion.sequences[0].steps[0].amount.arg.defaultValue, 0.3)
+        self.assertIsNone(poseSpecs[1].motion.sequences[0].steps[1].amount.arg.defaultValue)
+
+    def test_errors(self):
+        text = "Model m Convention = currentFrame\na -> b : rotx(q)\nb -> c : roty(q / x)"
+        poseSpecs = self.dsl.poseSpecsFromStream(io.StringIO(text))
+        self.assertEqual(next(poseSpecs).pose.target.name, 'b')
+        with self.assertRaisesRegex(RuntimeError, 'Line 3') :
+            next(poseSpecs)
+        with tempfile.TemporaryDirectory() as folder :
+            file = os.path.join(folder, 'model.motdsl')
+            with open(file, 'w') as f :
+                f.write(text)
+            with self.assertRaises(Exception) as expected :
+                motiondsl.MotionDSL().modelFromFile(file)
+            self.assertRaises(type(expected.exception), list, self.dsl.poseSpecsFromFile(file))
+            # valid, but not supported by the streaming loader
+            with open(file, 'w') as f :
+                f.write("Model m Convention = currentFrame a -> b : rotx(c:r) b -> c : roty(c:r:0.1)")
+            self.assertRaises(RuntimeError, list, self.dsl.poseSpecsFromFile(file))
+
+
+class BulkLoadingTests(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.files  = [sampleModelFile]
+        for i in range(5) :
+            file = os.path.join(self.folder.name, 'm{0}.motdsl'.format(i))
+            with open(file, 'w') as f :
+                f.write( re.sub(r'\bf([A-F])\b', r'f{0}\1'.format(i), constructs.replace('constructs', 'part' + str(i))) )
+            self.files.append(file)
+        self.sequential = [ motiondsl.toPosesSpecification(motiondsl.MotionDSL().modelFromFile(f)) for f in self.files ]
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_pickle(self):
+        for model in self.sequential :
+            copy = pickle.loads(pickle.dumps(model))
+            self.assertEqual(copy.name, model.name)
+            self.assertEqual(_signature(copy), _signature(model))
+
+    def test_same_models(self):
+        for workers in [1, 2] :
+            models = motiondsl.posesSpecsFromFiles(self.files, maxWorkers=workers)
+            self.assertEqual([m.name for m in models], [m.name for m in self.sequential])
+            self.assertEqual([_signature(m) for m in models], [_signature(m) for m in self.sequential])
+
+    def test_merge(self):
+        expected = self.sequential[0]
+        for model in self.sequential[1:] :
+            expected = expected.mergeModel(model)
+        merged = motiondsl.posesSpecsFromFiles(self.files, merge=True, maxWorkers=2)
+        self.assertEqual(merged.name, expected.name)
+        self.assertEqual(_signature(merged), _signature(expected))
+        merged = motiondsl.posesSpecsFromFiles(self.files[:3], merge=True, name='all', maxWorkers=1)
+        self.assertEqual(merged.name, 'all')
+        self.assertEqual(len(merged.poses), sum(len(m.poses) for m in self.sequential[:3]))
+
+    def test_errors(self):
+        file = os.path.join(self.folder.name, 'bad.motdsl')
+        with open(file, 'w') as f :
+            f.write("Model m Convention = currentFrame a -> b : rotx(pitch)")
+        with self.assertRaises(Exception) as expected :
+            motiondsl.MotionDSL().modelFromFile(file)
+        self.assertRaises(type(expected.exception), motiondsl.posesSpecsFromFiles, self.files + [file], maxWorkers=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,256 @@
+import unittest
+import random
+import networkx as nx
+import numpy as np
+
+from kgprim.core import Frame, Pose
+import kgprim.motions as motions
+from kgprim.motions import MotionStep, MotionSequence, PoseSpec, PosesSpec
+from kgprim.ct.frommotions import toCoordinateTransform, motionsToCoordinateTransforms
+from kgprim.ct.models import CoordinateTransformPlaceholder
+import kgprim.ct.repr.mxrepr as ctrepr
+
+
+def randomMotion():
+    kind = random.choice( list(MotionStep.Kind) )
+    axis = random.choice( list(motions.Axis) )
+    step = MotionStep(kind, axis, random.uniform(-1.0, 1.0))
+    return MotionSequence([step], MotionSequence.Mode.currentFrame)
+
+def randomTree(framesCount, name='tree'):
+    '''A model whose frames form a random tree'''
+    frames = [ Frame('f' + str(i)) for i in range(framesCount) ]
+    poses = []
+    for i in range(1, framesCount) :
+        ref = frames[ random.randrange(i) ]
+        tgt = frames[i]
+        if random.random() < 0.5 : # random edge directions
+            ref, tgt = tgt, ref
+        poses.append( PoseSpec(pose=Pose(target=tgt, reference=ref), motion=randomMotion()) )
+    return frames, PosesSpec(name, poses)
+
+
+class ConnectedFramesInspectorTests(unittest.TestCase):
+
+    def checkPath(self, inspector, target, reference):
+        '''The motions of the pose spec are the ones along the shortest path'''
+        posespec = inspector.getPoseSpec(targetFrame=target, referenceFrame=reference)
+        self.assertEqual( posespec.pose, Pose(target=target, reference=reference) )
+        path = nx.shortest_path(inspector.graph, source=reference, target=target)
+        expected = []
+        for v1, v2 in zip(path, path[1:]) :
+            expected.extend( inspector.edgeMotion(v1, v2).sequences )
+        self.assertEqual( len(posespec.motion.sequences), len(expected) )
+        for actual, exp in zip(posespec.motion.sequences, expected) :
+            self.assertIs(actual, exp)
+
+    def test_tree(self):
+        frames, model = randomTree(60)
+        inspector = motions.ConnectedFramesInspector(model)
+        for _ in range(100) :
+            f1, f2 = random.sample(frames, 2)
+            self.assertTrue( inspector.hasRelativePose(f1, f2) )
+            self.checkPath(inspector, f1, f2)
+
+    def test_lazy_reverse(self):
+        '''Reverse motions are computed only when needed, and only once'''
+        frames = [ Frame('a'), Frame('b') ]
+        spec = PoseSpec(pose=Pose(target=frames[1], reference=frames[0]), motion=randomMotion())
+        inspector = motions.ConnectedFramesInspector( PosesSpec('pair', [spec]) )
+        self.assertNotIn( 'motion', inspector.graph.edges[frames[1], frames[0]] )
+        self.assertIs( inspector.getPoseSpec(frames[1], frames[0]).motion.sequences[0], spec.motion.sequences[0] )
+        self.assertNotIn( 'motion', inspector.graph.edges[frames[1], frames[0]] )
+
+        back = inspector.graph.edges[frames[1], frames[0]]['motion']
+        self.assertIs( inspector.edgeMotion(frames[1], frames[0]), back )
+        self.assertEqual( back.sequences[0].steps[0].amount, -spec.motion.sequences[0].steps[0].amount )
+        self.assertIs( inspector.getPoseSpec(frames[0], frames[1]).motion.sequences[0], back.sequences[0] )
+
+    def test_same_frame(self):
+        frames, model = randomTree(5)
+        inspector = motions.ConnectedFramesInspector(model)
+        posespec = inspector.getPoseSpec(targetFrame=frames[3], referenceFrame=frames[3])
+        self.assertEqual( posespec.motion.sequences, [] )
+
+    def test_disconnected(self):
+        frames1, model1 = randomTree(10)
+        frames2 = [ Frame('g' + str(i)) for i in range(3) ]
+        model2 = PosesSpec('other', [
+            PoseSpec(pose=Pose(target=frames2[1], reference=frames2[0]), motion=randomMotion()),
+            PoseSpec(pose=Pose(target=frames2[2], reference=frames2[0]), motion=randomMotion())])
+        inspector = motions.ConnectedFramesInspector( model1.mergeModel(model2) )
+        self.assertFalse( inspector.hasRelativePose(frames1[4], frames2[2]) )
+        self.assertIsNone( inspector.getPoseSpec(targetFrame=frames2[1], referenceFrame=frames1[0]) )
+        self.assertIsNone( inspector.getPoseSpec(targetFrame=Frame('unknown'), referenceFrame=frames1[0]) )
+        self.checkPath(inspector, frames2[1], frames2[2])
+
+    def test_cycles(self):
+        '''Graphs with cycles are still handled, with a graph search'''
+        frames, model = randomTree(30)
+        extra = [ PoseSpec(pose=Pose(target=frames[29], reference=frames[0]), motion=randomMotion()),
+                  PoseSpec(pose=Pose(target=frames[15], reference=frames[7]), motion=randomMotion()) ]
+        inspector = motions.ConnectedFramesInspector( PosesSpec('cyclic', model.poses + extra) )
+        for _ in range(50) :
+            f1, f2 = random.sample(frames, 2)
+            self.assertTrue( inspector.hasRelativePose(f1, f2) )
+            self.checkPath(inspector, f1, f2)
+
+    def test_many_targets(self):
+        '''getPoseSpecs() is equivalent to many calls of getPoseSpec()'''
+        frames, model = randomTree(30)
+        # a consistent cycle: paths between two frames are equivalent
+        shortcut = motions.ConnectedFramesInspector(model).getPoseSpec(frames[29], frames[0])
+        extra = [ PoseSpec(pose=shortcut.pose, motion=shortcut.motion) ]
+        other = PoseSpec(pose=Pose(target=Frame('x'), reference=Frame('y')), motion=randomMotion())
+        targets = frames + [Frame('x'), Frame('unknown')]
+        for poses in [model.poses, model.poses + extra] :
+            inspector = motions.ConnectedFramesInspector( PosesSpec('m', poses + [other]) )
+            reference = random.choice(frames)
+            specs = inspector.getPoseSpecs(targets, reference)
+            self.assertEqual( len(specs), len(targets) )
+            for target, spec in zip(targets, specs) :
+                expected = inspector.getPoseSpec(target, reference)
+                if expected is None :
+                    self.assertIsNone(spec)
+                    continue
+                self.assertEqual( spec.pose, expected.pose )
+                mx1 = ctrepr.hCoordinatesClosedForm( toCoordinateTransform(spec) )
+                mx2 = ctrepr.hCoordinatesClosedForm( toCoordinateTransform(expected) )
+                self.assertTrue( np.allclose(mx1, mx2) )
+
+    def test_requested_transforms(self):
+        '''Requested transforms keep their order, and missing ones are reported'''
+        frames, model = randomTree(12)
+        requests = [ CoordinateTransformPlaceholder(random.choice(frames), random.choice(frames[:3])) for _ in range(20) ]
+        requests.insert(7, CoordinateTransformPlaceholder(Frame('missing'), frames[0]))
+        with self.assertLogs('kgprim.ct.frommotions', level='WARNING') as logs :
+            ctModel = motionsToCoordinateTransforms(model, whichTransforms=iter(requests))
+        self.assertEqual( len(logs.output), 1 )
+        self.assertIn( 'missing', logs.output[0] )
+        del requests[7]
+        self.assertEqual( [(t.leftFrame, t.rightFrame) for t in ctModel.transforms],
+                          [(r.leftFrame, r.rightFrame) for r in requests] )
+
+        simpler = motionsToCoordinateTransforms(model, whichTransforms=requests, simplifyMotions=True)
+        for t1, t2 in zip(ctModel.transforms, simpler.transforms) :
+            self.assertLessEqual( len(t2.primitives), len(t1.primitives) )
+            self.assertTrue( np.allclose(ctrepr.hCoordinatesClosedForm(t1), ctrepr.hCoordinatesClosedForm(t2)) )
+
+
+class SimplifyTests(unittest.TestCase):
+
+    def assertEquivalent(self, motion1, motion2):
+        pose = Pose(target=Frame('b'), reference=Frame('a'))
+        mx1 = ctrepr.hCoordinatesClosedForm( toCoordinateTransform(PoseSpec(pose, motion1)) )
+        mx2 = ctrepr.hCoordinatesClosedForm( toCoordinateTransform(PoseSpec(pose, motion2)) )
+        self.assertTrue( np.allclose(mx1, mx2) )
+
+    def test_equivalence(self):
+        '''Random motions, with many foldable steps, in both modes'''
+        for _ in range(20) :
+            sequences = []
+            for _ in range(4) :
+                steps = [ MotionStep(random.choice(list(MotionStep.Kind)),
+                                     random.choice([motions.Axis.X, motions.Axis.Z]),
+                                     random.choice([0.0, 1.0, -1.0, random.uniform(-1,1)]))
+                          for _ in range(random.randint(0, 6)) ]
+                sequences.append( MotionSequence(steps, random.choice(list(MotionSequence.Mode))) )
+            motion = motions.MotionPath(sequences)
+            simple = motions.simplify(motion)
+            self.assertEqual( len(simple.sequences), 1 )
+            self.assertEqual( simple.sequences[0].mode, MotionSequence.Mode.currentFrame )
+            self.assertLessEqual( len(simple.sequences[0].steps), sum(len(s.steps) for s in sequences) )
+            self.assertEquivalent(motion, simple)
+            self.assertEquivalent(motions.reverse(motion), motions.simplify(motions.reverse(motion)))
+
+    def test_folding(self):
+        X, Y, Z = motions.Axis.X, motions.Axis.Y, motions.Axis.Z
+        motion = motions.MotionPath([
+            MotionSequence([motions.translation(X, 1.0), motions.rotation(Z, 0.5), motions.translation(Y, 0.0)]),
+            MotionSequence([motions.rotation(Z, -0.5), motions.translation(Y, 2.0), motions.translation(X, -1.0)]),
+            MotionSequence([motions.translation(Z, 3.0), motions.rotation(Z, 0.25), motions.rotation(Z, 0.25)]) ])
+        steps = motions.simplify(motion).sequences[0].steps
+        self.assertEqual( steps, [motions.translation(Y, 2.0), motions.translation(Z, 3.0), motions.rotation(Z, 0.5)] )
+
+    def test_expressions(self):
+        '''Expressions are summed only if they have the same argument'''
+        from kgprim.values import Variable, Parameter, Expression
+        q = Expression( Variable('q') )
+        p = Expression( Parameter('p') )
+        motion = motions.MotionPath([ MotionSequence([
+            motions.rotation(motions.Axis.Z, q), motions.rotation(motions.Axis.Z, 2*q),
+            motions.rotation(motions.Axis.Z, p), motions.rotation(motions.Axis.Z, 1.0),
+            motions.rotation(motions.Axis.Z, -p) ]) ])
+        steps = motions.simplify(motion).sequences[0].steps
+        self.assertEqual( [s.amount for s in steps], [3*q, p, 1.0, -p] )
+        motion = MotionSequence([ motions.translation(motions.Axis.X, q), motions.translation(motions.Axis.X, -q) ])
+        self.assertEqual( motions.simplify(motion).sequences[0].steps, [] )
+
+
+class InspectorEditingTests(unittest.TestCase):
+
+    def checkConsistent(self, inspector, frames):
+        '''The edited inspector behaves like one built from scratch'''
+        fresh = motions.ConnectedFramesInspector(inspector.posesModel)
+        self.assertEqual( set(inspector.graph.nodes), set(fresh.graph.nodes) )
+        self.assertEqual( set(inspector.graph.edges), set(fresh.graph.edges) )
+        for _ in range(40) :
+            f1, f2 = random.sample(frames, 2)
+            connected = fresh.hasRelativePose(f1, f2)
+            self.assertEqual( inspector.hasRelativePose(f1, f2), connected )
+            if connected :
+                ConnectedFramesInspectorTests.checkPath(self, inspector, f1, f2)
+
+    def test_add_remove(self):
+        frames, model = randomTree(40)
+        original = list(model.poses)
+        inspector = motions.ConnectedFramesInspector(model)
+        inspector.getPoseSpec(frames[0], frames[1]) # builds the index
+        more = [ Frame('new' + str(i)) for i in range(10) ]
+        allFrames = frames + more
+        for _ in range(60) :
+            if random.random() < 0.5 :
+                f1, f2 = random.sample(allFrames, 2)
+                inspector.addPoseSpec( PoseSpec(pose=Pose(target=f1, reference=f2), motion=randomMotion()) )
+            else :
+                inspector.removePoseSpec( random.choice(inspector.posesModel.poses) )
+            self.checkConsistent(inspector, allFrames)
+        self.assertEqual( model.poses, original ) # not modified
+
+    def test_split_and_rejoin(self):
+        frames = [ Frame('f' + str(i)) for i in range(4) ]
+        specs = [ PoseSpec(pose=Pose(target=frames[i+1], reference=frames[i]), motion=randomMotion()) for i in range(3) ]
+        inspector = motions.ConnectedFramesInspector( PosesSpec('chain', specs) )
+        self.assertTrue( inspector.hasRelativePose(frames[0], frames[3]) )
+
+        inspector.removePoseSpec( specs[1] )
+        self.assertFalse( inspector.hasRelativePose(frames[0], frames[3]) )
+        self.assertTrue ( inspector.hasRelativePose(frames[2], frames[3]) )
+
+        inspector.addPoseSpec( PoseSpec(pose=Pose(target=frames[0], reference=frames[3]), motion=randomMotion()) )
+        self.assertTrue( inspector.hasRelativePose(frames[1], frames[2]) )
+        self.checkConsistent(inspector, frames)
+
+        inspector.removePoseSpec( specs[0] )
+        self.assertNotIn( frames[1], inspector.graph )
+        self.assertFalse( inspector.hasRelativePose(frames[1], frames[2]) )
+
+        self.assertRaises(RuntimeError, inspector.removePoseSpec, specs[0])
+
+    def test_merge(self):
+        frames1, model1 = randomTree(20, 'one')
+        model2 = PosesSpec('two', [
+            PoseSpec(pose=Pose(target=Frame('g0'), reference=frames1[5]), motion=randomMotion()),
+            PoseSpec(pose=Pose(target=Frame('g1'), reference=Frame('g0')), motion=randomMotion())])
+        inspector = motions.ConnectedFramesInspector(model1)
+        self.assertFalse( inspector.hasRelativePose(frames1[0], Frame('g1')) )
+        inspector.mergeModel(model2)
+        self.assertEqual( inspector.posesModel.name, 'one_two' )
+        self.assertEqual( len(inspector.posesModel.poses), 21 )
+        self.assertEqual( len(model1.poses), 19 )
+        self.assertTrue( inspector.hasRelativePose(frames1[0], Frame('g1')) )
+        self.checkConsistent(inspector, frames1 + [Frame('g0'), Frame('g1')])
+
+
+if __name__ == '__main__':
+    unittest.main()
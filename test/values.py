@@ -1,5 +1,7 @@
 import unittest
-import math, sympy, random
+import math, sympy, random, pickle
+from fractions import Fraction
+import numpy as np
 import kgprim.values as values
 
 
@@ -54,5 +56,65 @@ class ValuesTests(unittest.TestCase):
         self.assertTrue( e2.argument.symbol == s1 )
         self.assertTrue( e2.expr == 3*s1 )
 
+    def test_coefficient(self):
+        '''Expressions like `c * arg` are stored as the coefficient and the argument'''
+        x  = values.Variable('x')
+        pi = values.MyPI.instance()
+        half_pi = values.Expression(pi) / 2
+        self.assertEqual( half_pi.coefficient, Fraction(1, 2) )
+        self.assertEqual( half_pi.expr, sympy.pi/2 )
+        self.assertEqual( half_pi, values.Expression(pi, pi.symbol/2) )
+        self.assertEqual( hash(half_pi), hash(values.Expression(pi, pi.symbol/2)) )
+        self.assertEqual( half_pi.evalf(), math.pi/2 )
+
+        e = -2.5 * values.Expression(x)
+        self.assertEqual( e.coefficient, -2.5 )
+        self.assertEqual( e.expr, -2.5*x.symbol )
+        self.assertEqual( e, values.Expression(x, -2.5*x.symbol) )
+        self.assertTrue( np.allclose(e.evaluate(np.array([1.0, 2.0])), [-2.5, -5.0]) )
+
+    def test_to_float(self):
+        c = values.Constant(name="c", value=0.25)
+        pi = values.MyPI.instance()
+        self.assertIsInstance( pi.value, float )
+        self.assertEqual( values.toFloat(values.Expression(pi) / 4), math.pi/4 )
+        self.assertEqual( values.toFloat(-2 * values.Expression(c)), -0.5 )
+        for number in [3, 0.5, np.float32(0.5), np.int64(2)] :
+            self.assertIs( type(values.toFloat(number)), float )
+            self.assertEqual( values.toFloat(number), float(number) )
+        self.assertRaises(RuntimeError, values.toFloat, values.Expression(values.Variable('v')))
+
+    def test_general_expression(self):
+        '''Other expressions are kept as Sympy expressions'''
+        x = values.Variable('x')
+        e = values.Expression(x, x.symbol**2)
+        self.assertIsNone( e.coefficient )
+        self.assertEqual( e.evaluate(3.0), 9.0 )
+        self.assertNotEqual( e, values.Expression(x) )
+        self.assertEqual( (-e).expr, -x.symbol**2 )
+
+    def test_pickle(self):
+        '''Arguments and expressions survive a pickling round-trip'''
+        roundTrip = lambda obj : pickle.loads(pickle.dumps(obj))
+        c = values.Constant('c', 0.1)
+        p = values.Parameter('p', defValue=2.0)
+        x = values.Variable('x')
+        c.symbol # the lazily created Sympy symbol must be picklable, too
+        self.assertIs( roundTrip(values.MyPI.instance()), values.MyPI.instance() )
+        self.assertEqual( roundTrip(c.symbol), c.symbol )
+        self.assertEqual( roundTrip(c), c )
+        self.assertEqual( roundTrip(p).defaultValue, 2.0 )
+        exprs = [ values.Expression(values.MyPI.instance()) / 2,
+                  values.Expression(c, c.symbol**2),
+                  values.Expression(p) * 3, values.Expression(x, sympy.sin(x.symbol)) ]
+        for e in exprs :
+            e.evaluate(0.5) if not e.constant() else e.evalf()
+            copy = roundTrip(e)
+            self.assertEqual( copy, e )
+            self.assertEqual( copy.coefficient, e.coefficient )
+            self.assertEqual( hash(copy), hash(e) )
+        self.assertEqual( roundTrip(exprs[1]).evalf(), 0.1**2 )
+        self.assertEqual( roundTrip(exprs[3]).evaluate(0.5), math.sin(0.5) )
+
 if __name__ == '__main__':
     unittest.main()